@@ -1,11 +1,10 @@
+import importlib.util
 import numpy as np
 import pandas as pd
-try:
-    from sklearn.ensemble import IsolationForest
-    from sklearn.preprocessing import StandardScaler
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False # Si sklearn non installé
+
+# sklearn est lourd à importer : on vérifie seulement sa présence ici,
+# l'import réel a lieu au premier entraînement.
+SKLEARN_AVAILABLE = importlib.util.find_spec("sklearn") is not None
 
 class AnomalyDetector:
     """
@@ -15,18 +14,21 @@ class AnomalyDetector:
 
     def __init__(self):
         self.model = None
-        self.scaler = StandardScaler() if SKLEARN_AVAILABLE else None
+        self.scaler = None # Créé à l'entraînement (import sklearn différé)
         self.is_trained = False
 
     def train_model(self, clients_data):
         """
         Entraîne le modèle sur l'ensemble des données actuelles.
+        clients_data : liste de dicts clients, ou colonnes {nom: ndarray} (instantané colonnaire).
         """
         if not SKLEARN_AVAILABLE or not clients_data:
             return
 
         # Conversion en DataFrame
         df = pd.DataFrame(clients_data)
+        if df.empty:
+            return
         
         # Sélection des features numériques pertinentes pour la fraude
         features = ['solde', 'age', 'revenu', 'score']
@@ -35,10 +37,14 @@ class AnomalyDetector:
         
         if len(available_features) < 2:
             return 
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
         # Préparation des données (Gestion des NaN par 0)
         X = df[available_features].fillna(0)
         
         # Normalisation (Important pour l'Isolation Forest)
+        self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         
         # Initialisation et Entraînement
@@ -85,4 +91,23 @@ class AnomalyDetector:
         except Exception as e:
             print(f"Erreur Prédiction IA: {e}")
             return (False, 0)
+
+    def predict_batch(self, clients):
+        """
+        Version vectorisée de predict_risk pour un lot de clients (une fenêtre de grille).
+        Retourne la liste des indicateurs d'anomalie (bool), dans l'ordre des clients.
+        """
+        if not clients:
+            return []
+        if not self.is_trained:
+            return [self.predict_risk(c)[0] for c in clients]
+
+        try:
+            X = np.array([[c.get(f, 0) if c.get(f) is not None else 0 for f in self.features_used]
+                          for c in clients], dtype=float)
+            preds = self.model.predict(self.scaler.transform(X))
+            return [p == -1 for p in preds]
+        except Exception as e:
+            print(f"Erreur Prédiction IA: {e}")
+            return [False] * len(clients)
         
@@ -0,0 +1,174 @@
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_END = object() # Fin d'un générateur itéré dans son thread (voir iterate)
+
+
+class AsyncDataManager:
+    """
+    Façade asyncio du DataManager : chaque appel s'exécute dans un pool de threads dédié
+    et retourne un awaitable (ou un concurrent.futures.Future via submit, hors asyncio).
+    Destinée aux scripts et services asyncio (imports planifiés, exports, API) : l'interface
+    Tk n'a pas de boucle asyncio et passe par le TaskRunner, qui livre ses résultats sur la
+    boucle Tk ; les deux appellent les mêmes méthodes du DataManager.
+
+    - Méthodes du DataManager : await adb.get_client(5), await adb.add_transactions_bulk(df)...
+      Elles ouvrent leur propre connexion, comme depuis le reste de l'application.
+      Les méthodes qui acceptent 'cancel' (recherches, fenêtres, pages) reçoivent un
+      threading.Event levé si la tâche asyncio est annulée : SQLite abandonne la requête.
+      Un Future retourné par la méthode (submit_transaction) est attendu à son tour.
+    - Générateurs du DataManager (iter_clients...) : async for lot in adb.iter_clients(),
+      voir iterate ; le générateur ne tourne jamais sur la boucle asyncio.
+    - SQL direct (fetchall / execute / executemany) : seuls ces appels utilisent une connexion
+      persistante par thread du pool, interrompue de la même façon à l'annulation.
+      Les écritures sont validées puis signalées sur le bus si 'tables' est fourni.
+    """
+
+    def __init__(self, data_manager, max_workers=4):
+        self.db = data_manager
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="DataManager-async")
+        self._local = threading.local()
+        self._connections = [] # Toutes les connexions du pool (fermées par close)
+        self._connections_lock = threading.Lock()
+        self._closed = False
+
+    # --- APPELS DU DATAMANAGER ---
+
+    def __getattr__(self, name):
+        method = getattr(self.db, name)
+        if not callable(method) or name.startswith("_"):
+            return method
+
+        if inspect.isgeneratorfunction(inspect.unwrap(method)):
+            @functools.wraps(method)
+            def iterate(*args, **kwargs):
+                return self.iterate(method, *args, **kwargs)
+            return iterate
+
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            return self.run(method, *args, **kwargs)
+        return call
+
+    async def run(self, fn, *args, **kwargs):
+        """Exécute fn(*args, **kwargs) dans le pool ; l'annulation lève l'Event 'cancel' de fn s'il en a un."""
+        cancel = None
+        if "cancel" not in kwargs and self._accepts_cancel(fn):
+            cancel = kwargs["cancel"] = threading.Event()
+        result = await self._await(self.executor.submit(fn, *args, **kwargs), cancel)
+        if isinstance(result, Future):
+            result = await asyncio.wrap_future(result)
+        return result
+
+    async def iterate(self, fn, *args, **kwargs):
+        """
+        Générateur asynchrone sur un générateur du DataManager. Le générateur (et sa connexion
+        SQLite, liée à son thread) vit dans un thread dédié : chaque élément y est produit puis
+        remis à la boucle. Sortie anticipée ou annulation : 'cancel' levé, générateur fermé.
+        """
+        cancel = None
+        if "cancel" not in kwargs and self._accepts_cancel(fn):
+            cancel = kwargs["cancel"] = threading.Event()
+        thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DataManager-iter")
+        generator = None
+        try:
+            generator = await self._await(thread.submit(fn, *args, **kwargs), cancel)
+            while True:
+                item = await self._await(thread.submit(next, generator, _END), cancel)
+                if item is _END:
+                    return
+                yield item
+        finally:
+            if cancel is not None:
+                cancel.set()
+            if generator is not None:
+                thread.submit(generator.close) # Libère la connexion dans son thread
+            thread.shutdown(wait=False)
+
+    def submit(self, fn, *args, **kwargs):
+        """Version sans asyncio de run : concurrent.futures.Future (ex : TaskRunner, scripts)."""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    # --- SQL DIRECT (connexion persistante par thread) ---
+
+    async def fetchall(self, sql, params=()):
+        """Lignes (sqlite3.Row) d'une requête de lecture."""
+        cancel = threading.Event()
+        return await self._await(self.executor.submit(self._fetchall, sql, params, cancel), cancel)
+
+    async def execute(self, sql, params=(), tables=None, ids=None):
+        """Écriture validée (COMMIT) ; publie ChangeEvent(tables, ids) si 'tables'. Retourne rowcount."""
+        cancel = threading.Event()
+        return await self._await(self.executor.submit(self._write, "execute", sql, params, tables, ids, cancel),
+                                 cancel)
+
+    async def executemany(self, sql, rows, tables=None, ids=None):
+        """Écriture en masse dans UNE transaction (tout ou rien) ; même règle de publication qu'execute."""
+        cancel = threading.Event()
+        return await self._await(self.executor.submit(self._write, "executemany", sql, rows, tables, ids, cancel),
+                                 cancel)
+
+    def close(self):
+        """Attend les appels en cours puis ferme les connexions du pool."""
+        self._closed = True
+        self.executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+    # --- INTERNE ---
+
+    async def _await(self, future, cancel=None):
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Pas encore démarré : retiré de la file ; en cours : requête SQLite interrompue
+            future.cancel()
+            if cancel is not None:
+                cancel.set()
+            raise
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _accepts_cancel(fn):
+        try:
+            return "cancel" in inspect.signature(fn).parameters
+        except (TypeError, ValueError):
+            return False
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise RuntimeError("AsyncDataManager fermé")
+            conn = self._local.conn = self.db.connect(check_same_thread=False)
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _fetchall(self, sql, params, cancel):
+        conn = self._connection()
+        conn.set_progress_handler(lambda: 1 if cancel.is_set() else 0, 10000)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def _write(self, how, sql, params, tables, ids, cancel):
+        conn = self._connection()
+        conn.set_progress_handler(lambda: 1 if cancel.is_set() else 0, 10000)
+        try:
+            cur = getattr(conn, how)(sql, params)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+        if tables:
+            self.db.publish(tables, ids)
+        return cur.rowcount
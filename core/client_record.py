@@ -0,0 +1,86 @@
+import sys
+from collections.abc import Mapping
+
+# Colonnes d'une ligne client (vue 'clients' + score), dans l'ordre des requêtes du DataManager
+CLIENT_FIELDS = ("id_client", "nom", "age", "sexe", "solde", "region", "anciennete", "segment",
+                 "revenu", "score_initial", "date_creation", "solde_ouverture", "score", "niveau_risque")
+
+# Colonnes à peu de valeurs distinctes : une seule chaîne (internée) partagée par libellé
+SHARED_FIELDS = ("sexe", "region", "segment", "date_creation", "niveau_risque")
+
+
+class ClientRecord(Mapping):
+    """
+    Ligne client compacte : attributs en __slots__ (pas de dict par ligne), libellés partagés.
+    Se lit comme un dict (client['nom'], client.get('age'), dict(client)) pour le code existant.
+    'anomalie' est le seul champ ajoutable après coup (annotation de l'IA dans la grille).
+    """
+
+    __slots__ = CLIENT_FIELDS + ("anomalie",)
+    _KEYS = frozenset(__slots__)
+
+    def __init__(self, *values):
+        for name, value in zip(CLIENT_FIELDS, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_cursor(cls, cursor, batch=None):
+        """
+        Enregistrements des lignes d'un curseur (row_factory à None), ou du lot 'batch'
+        déjà lu sur ce curseur. Les colonnes absentes valent None.
+        """
+        names = [d[0] for d in cursor.description]
+        rows = cursor.fetchall() if batch is None else batch
+        if names[:len(CLIENT_FIELDS)] != list(CLIENT_FIELDS):
+            index = {name: i for i, name in enumerate(names)}
+            rows = [tuple(row[index[f]] if f in index else None for f in CLIENT_FIELDS) for row in rows]
+
+        shared = [(i, f) for i, f in enumerate(CLIENT_FIELDS) if f in SHARED_FIELDS]
+        records = []
+        for row in rows:
+            record = cls(*row)
+            for i, name in shared:
+                if type(row[i]) is str:
+                    setattr(record, name, sys.intern(row[i]))
+            records.append(record)
+        return records
+
+    # --- Interface dict ---
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        yield from CLIENT_FIELDS
+        if hasattr(self, "anomalie"):
+            yield "anomalie"
+
+    def __len__(self):
+        return len(CLIENT_FIELDS) + hasattr(self, "anomalie")
+
+    def __repr__(self):
+        return f"ClientRecord({dict(self)!r})"
+
+    # --- Affichage ---
+
+    def display_row(self):
+        """Cellules texte de la grille clients (ID, nom, âge, région, revenu, risque, score)."""
+        return (
+            str(self.id_client),
+            self.nom,
+            f"{self.age} ans" if self.age else "N/A",
+            self.region if self.region else "-",
+            f"{self.revenu:.2f} €" if self.revenu else "0 €",
+            self.niveau_risque if self.niveau_risque else "N/A",
+            str(int(self.score)) if self.score else "-",
+        )
@@ -0,0 +1,275 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from core.data_manager import DIMENSIONS
+from core.query_profiler import profiled
+
+# Colonnes de l'instantané : numériques (float64, NaN = NULL) et catégorielles (codes int32, -1 = NULL)
+NUMERIC_COLUMNS = ("id_client", "age", "solde", "revenu", "anciennete", "score_initial", "score")
+CATEGORICAL_COLUMNS = ("region", "segment", "sexe", "niveau_risque")
+
+SNAPSHOT_QUERY = """
+    SELECT c.id_client, c.age, c.solde, c.revenu, c.anciennete, c.score_initial, s.score_final,
+           c.region_id, c.segment_id, c.sexe_id, s.risque_id
+    FROM clients_base c
+    LEFT JOIN scoring_base s ON c.id_client = s.id_client
+"""
+
+
+class ColumnarSnapshot:
+    """
+    Instantané colonnaire des clients et de leurs scores, sur disque :
+    un fichier .npy par colonne (ouvert en mémoire mappée, sans copie) + meta.json.
+    - Les colonnes texte sont codées en dictionnaire : codes de la base (tables dim_*)
+      convertis en positions dans la liste des libellés (ordre des codes, copiée dans meta.json).
+    - L'instantané est daté par DataManager.data_stamp() : encore valable au redémarrage
+      s'il n'y a pas eu d'écriture, il est alors prêt en quelques millisecondes.
+    - Mis à jour au fil des ChangeEvent : seuls les clients modifiés sont relus en SQL.
+      Une version publiée n'est jamais modifiée (tableaux déjà remis aux lecteurs, fichiers
+      mappés par d'autres processus) : chaque mise à jour écrit une nouvelle version, où les
+      colonnes inchangées sont des liens physiques vers la précédente.
+    Sans data_manager, l'instantané est en lecture seule (ex : processus d'un pool).
+    """
+
+    BATCH_SIZE = 50000
+
+    def __init__(self, directory, data_manager=None):
+        self.directory = directory
+        self.db = data_manager
+        self.meta = None
+        self._columns = {}
+        self._lock = threading.RLock()        # Mise à jour et lecture des fichiers
+        self._state_lock = threading.Lock()   # Changements en attente (court : appelé par l'écrivain)
+        self._pending = set()   # id_client modifiés depuis l'état de l'instantané
+        self._full = True       # Changement non ciblé (ou suivi incomplet) : reconstruction
+        self._load()
+        if self.db is not None:
+            self.db.subscribe(self._on_change)
+
+    # --- LECTURE ---
+
+    def columns(self):
+        """Colonnes à jour {nom: ndarray en lecture seule} ; les catégorielles sont des codes."""
+        self.refresh()
+        with self._lock:
+            return dict(self._columns)
+
+    def labels(self, column):
+        """Libellés d'une colonne catégorielle (le code i correspond à labels[i])."""
+        with self._lock:
+            return list(self.meta["labels"][column]) if self.meta else []
+
+    def __len__(self):
+        with self._lock:
+            return self.meta["rows"] if self.meta else 0
+
+    def to_dataframe(self):
+        """DataFrame pandas sans copie des colonnes numériques ; catégorielles en pandas.Categorical."""
+        import pandas as pd
+        columns = self.columns()
+        if not columns or not len(columns["id_client"]):
+            return pd.DataFrame()
+        data = {name: columns[name] for name in NUMERIC_COLUMNS}
+        for name in CATEGORICAL_COLUMNS:
+            data[name] = pd.Categorical.from_codes(columns[name], categories=self.labels(name))
+        df = pd.DataFrame(data, copy=False)
+        df["id_client"] = df["id_client"].astype("int64")
+        return df
+
+    def sample(self, limit=5000, seed=42):
+        """Échantillon aléatoire (reproductible) d'au plus 'limit' clients : {colonne: ndarray}."""
+        columns = self.columns()
+        n = len(columns.get("id_client", ()))
+        if n <= limit:
+            return {name: np.asarray(values) for name, values in columns.items()}
+        idx = np.sort(np.random.default_rng(seed).choice(n, size=limit, replace=False))
+        return {name: values[idx] for name, values in columns.items()}
+
+    # --- MISE À JOUR ---
+
+    @profiled
+    def refresh(self):
+        """Met l'instantané en phase avec la base (sans effet s'il est à jour ou en lecture seule)."""
+        if self.db is None:
+            return
+        with self._lock:
+            with self._state_lock:
+                full, ids = self._full or self.meta is None, self._pending
+                self._full, self._pending = False, set()
+            conn = self.db.connect()
+            try:
+                if full:
+                    self._rebuild(conn)
+                elif ids:
+                    self._apply(conn, ids)
+                elif self.meta["stamp"] != self.db.data_stamp(conn):
+                    # Écriture non signalée (autre processus) : on repart de zéro
+                    self._rebuild(conn)
+            finally:
+                conn.close()
+
+    def _on_change(self, event):
+        if not event.tables & {"clients", "scoring"}:
+            return
+        with self._state_lock:
+            if event.ids is None:
+                self._full = True
+            else:
+                self._pending.update(event.ids)
+
+    def _rebuild(self, conn):
+        """Relecture complète (une seule transaction de lecture : données et empreinte cohérentes)."""
+        conn.row_factory = None
+        conn.execute("BEGIN")
+        try:
+            stamp = self.db.data_stamp(conn)
+            labels, lookups = self._dimensions(conn)
+            parts = []
+            cur = conn.execute(SNAPSHOT_QUERY + " ORDER BY c.id_client")
+            while True:
+                batch = cur.fetchmany(self.BATCH_SIZE)
+                if not batch:
+                    break
+                parts.append(self._from_rows(batch, lookups))
+        finally:
+            conn.rollback()
+
+        parts = parts or [self._from_rows([], lookups)]
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        self._write(columns, labels, stamp)
+
+    def _apply(self, conn, ids):
+        """Relit seulement les clients modifiés ; nouvelle version où seules les colonnes touchées sont réécrites."""
+        conn.row_factory = None
+        conn.execute("BEGIN")
+        try:
+            stamp = self.db.data_stamp(conn)
+            labels, lookups = self._dimensions(conn)
+            rows = []
+            ids = sorted(ids)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows += conn.execute(SNAPSHOT_QUERY + f" WHERE c.id_client IN ({','.join('?' * len(chunk))})",
+                                     chunk).fetchall()
+        finally:
+            conn.rollback()
+
+        current = self._columns["id_client"]
+        wanted = np.asarray(ids, dtype=float)
+        pos = np.searchsorted(current, wanted)
+        present = (pos < len(current)) & (current[np.minimum(pos, len(current) - 1)] == wanted) \
+            if len(current) else np.zeros(len(wanted), dtype=bool)
+        found = {row[0] for row in rows}
+        if any(labels[name][:len(self.meta["labels"][name])] != self.meta["labels"][name]
+               for name in CATEGORICAL_COLUMNS):
+            # Libellés renumérotés (ne devrait pas arriver hors vidage) : positions caduques
+            self._rebuild(conn)
+            return
+
+        if present.all() and len(found) == len(ids):
+            # Mêmes clients : copie + patch des colonnes dont une valeur change, les autres sont reprises
+            by_id = {row[0]: row for row in rows}
+            patch = self._from_rows([by_id[i] for i in ids], lookups)
+            columns, unchanged = {}, []
+            for name, values in patch.items():
+                old = self._columns[name]
+                if np.array_equal(old[pos], values, equal_nan=old.dtype.kind == "f"):
+                    columns[name] = old
+                    unchanged.append(name)
+                else:
+                    columns[name] = np.array(old)
+                    columns[name][pos] = values
+            self._write(columns, labels, stamp, reuse=unchanged)
+            return
+
+        # Insertions / suppressions : nouvelles colonnes = anciennes - touchées + relues, triées par id
+        keep = np.ones(len(current), dtype=bool)
+        keep[pos[present]] = False
+        fresh = self._from_rows(rows, lookups)
+        merged = {name: np.concatenate([self._columns[name][keep], fresh[name]]) for name in fresh}
+        order = np.argsort(merged["id_client"], kind="stable")
+        self._write({name: values[order] for name, values in merged.items()}, labels, stamp)
+
+    def _dimensions(self, conn):
+        """
+        Libellés de chaque colonne catégorielle (ordre des codes : un nouveau libellé s'ajoute
+        en fin de liste) et table de conversion code base -> position (-1 = NULL ou inconnu).
+        """
+        labels, lookups = {}, {}
+        for name in CATEGORICAL_COLUMNS:
+            table, _ = DIMENSIONS[name]
+            rows = conn.execute(f"SELECT id, libelle FROM {table} ORDER BY id").fetchall()
+            labels[name] = [row[1] for row in rows]
+            lookup = np.full(max((row[0] for row in rows), default=0) + 1, -1, dtype=np.int32)
+            lookup[[row[0] for row in rows]] = np.arange(len(rows), dtype=np.int32)
+            lookups[name] = lookup
+        return labels, lookups
+
+    def _from_rows(self, rows, lookups):
+        """Colonnes d'un lot de tuples SQL ; les codes de la base sont convertis via 'lookups'."""
+        values = list(zip(*rows)) or [()] * (len(NUMERIC_COLUMNS) + len(CATEGORICAL_COLUMNS))
+        columns = {name: np.array(col, dtype=float) for name, col in zip(NUMERIC_COLUMNS, values)}
+        for name, col in zip(CATEGORICAL_COLUMNS, values[len(NUMERIC_COLUMNS):]):
+            lookup = lookups[name]
+            # NULL -> 0 (aucun libellé n'a le code 0) ; code hors table (écrit après la lecture) -> 0
+            ids = np.array([0 if v is None else v for v in col], dtype=np.int64)
+            columns[name] = lookup[np.where(ids < len(lookup), ids, 0)]
+        return columns
+
+    # --- FICHIERS ---
+
+    def _path(self, name, version=None):
+        version = self.meta["version"] if version is None else version
+        return os.path.join(self.directory, f"v{version}", f"{name}.npy")
+
+    def _write(self, columns, labels, stamp, reuse=()):
+        """
+        Nouvelle version dans un sous-dossier, puis bascule de meta.json (les lecteurs gardent l'ancienne).
+        Colonnes de 'reuse' : identiques à la version courante, liées au lieu d'être réécrites.
+        """
+        version = self.meta["version"] + 1 if self.meta else 1
+        target = os.path.join(self.directory, f"v{version}")
+        shutil.rmtree(target, ignore_errors=True) # Reste d'une écriture interrompue
+        os.makedirs(target)
+        for name, values in columns.items():
+            path = self._path(name, version)
+            if name in reuse:
+                try:
+                    os.link(self._path(name), path)
+                    continue
+                except OSError:
+                    pass # Liens physiques non supportés : copie
+            np.save(path, np.ascontiguousarray(values))
+        previous = self.meta["version"] if self.meta else None
+        self._save_meta({"stamp": stamp, "rows": len(columns["id_client"]), "version": version, "labels": labels})
+        self._load()
+        if previous is not None:
+            # Fichiers encore mappés ailleurs (Windows) : supprimés à une prochaine reconstruction
+            shutil.rmtree(os.path.join(self.directory, f"v{previous}"), ignore_errors=True)
+
+    def _save_meta(self, meta):
+        tmp = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.directory, "meta.json"))
+
+    def _load(self):
+        """Ouvre la version courante en mémoire mappée ; marque l'instantané à reconstruire si absent ou périmé."""
+        try:
+            with open(os.path.join(self.directory, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            # Un fichier vide ne peut pas être mappé : colonnes vides en mémoire
+            mode = "r" if meta["rows"] else None
+            columns = {name: np.load(self._path(name, meta["version"]), mmap_mode=mode)
+                       for name in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS}
+        except (OSError, ValueError, KeyError):
+            self.meta, self._columns = None, {}
+            return
+        self.meta, self._columns = meta, columns
+        if self.db is not None and self._full:
+            # Démarrage : valable tel quel si aucune écriture n'a eu lieu depuis
+            stale = meta["stamp"] != self.db.data_stamp()
+            with self._state_lock:
+                self._full = stale
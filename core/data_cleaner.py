@@ -1,3 +1,4 @@
+import gzip
 import pandas as pd
 import numpy as np
 
@@ -10,30 +11,78 @@ class DataCleaner:
     def __init__(self, data_manager):
         self.db = data_manager
 
-    def audit_file(self, file_path):
+    # Colonnes obligatoires selon le type de fichier importé
+    REQUIRED_COLUMN = {"clients": "nom", "transactions": "montant"}
+
+    # Alias acceptés pour les fichiers de transactions (exports bancaires hétérogènes)
+    TRANSACTION_ALIASES = {
+        'id': 'id_client', 'client': 'id_client', 'client_id': 'id_client',
+        'amount': 'montant', 'valeur': 'montant',
+        'date': 'date_trans', 'date_operation': 'date_trans', 'date_transaction': 'date_trans',
+    }
+
+    # En-têtes des exports CSV de l'application (DataManager.EXPORT_LABELS) : réimport direct
+    CLIENT_ALIASES = {
+        'id': 'id_client', 'nom complet': 'nom', 'âge': 'age', 'région': 'region',
+        'solde (€)': 'solde', 'score crédit': 'score', 'risque': 'niveau_risque',
+    }
+
+    def audit_file(self, file_path, kind="clients"):
         """Phase 1 : Lecture sécurisée pour le rapport"""
         try:
-            # On lit tout en string pour éviter que Pandas ne crash sur des types mixtes
-            if file_path.endswith('.csv'):
-                df = pd.read_csv(file_path, dtype=str)
-            else:
-                df = pd.read_excel(file_path, dtype=str)
+            df = self.read_file(file_path)
             
             # Standardisation basique des colonnes pour l'audit
             df.columns = [str(c).lower().strip() for c in df.columns]
+            df = df.rename(columns=self.TRANSACTION_ALIASES if kind == "transactions" else self.CLIENT_ALIASES)
+            required = self.REQUIRED_COLUMN[kind]
             
             report = {
                 "total_rows": len(df),
                 "doublons": df.duplicated().sum(),
                 "valeurs_manquantes": df.isnull().sum().to_dict(),
                 "colonnes_detectees": list(df.columns),
-                # Statut OK seulement si on a au moins un 'nom' ou un 'id'
-                "statut": "OK" if 'nom' in df.columns else "ATTENTION (Colonne 'nom' introuvable)"
+                # Statut OK seulement si la colonne clé du type de fichier est présente
+                "statut": "OK" if required in df.columns else f"ATTENTION (Colonne '{required}' introuvable)"
             }
             return df, report
         except Exception as e:
             return None, str(e)
 
+    # --- LECTURE DES FICHIERS ---
+
+    def read_file(self, file_path):
+        """
+        Lecture complète d'un fichier source.
+        CSV (éventuellement .gz) et Excel sont lus en texte pour éviter que Pandas ne crash
+        sur des types mixtes ; Parquet / Feather sont déjà typés (lecture colonnaire directe).
+        """
+        if file_path.endswith(('.parquet', '.feather')):
+            return pd.read_parquet(file_path) if file_path.endswith('.parquet') else pd.read_feather(file_path)
+        if file_path.endswith(('.csv', '.csv.gz')):
+            return pd.read_csv(file_path, dtype=str, sep=self._csv_separator(file_path))
+        return pd.read_excel(file_path, dtype=str)
+
+    def read_chunks(self, file_path, chunksize=200000):
+        """Lecture par blocs de DataFrames (mémoire bornée) ; Excel ne se lit qu'en entier."""
+        if file_path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            return (batch.to_pandas() for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize))
+        if file_path.endswith('.feather'):
+            import pyarrow as pa
+            reader = pa.ipc.open_file(file_path)
+            return (reader.get_batch(i).to_pandas() for i in range(reader.num_record_batches))
+        if file_path.endswith(('.csv', '.csv.gz')):
+            return pd.read_csv(file_path, dtype=str, sep=self._csv_separator(file_path), chunksize=chunksize)
+        return [pd.read_excel(file_path, dtype=str)]
+
+    def _csv_separator(self, file_path):
+        """';' pour les exports de l'application (Excel FR), ',' sinon : décidé sur l'en-tête."""
+        opener = gzip.open if file_path.endswith('.gz') else open
+        with opener(file_path, 'rt', encoding='utf-8-sig', errors='replace') as f:
+            header = f.readline()
+        return ';' if header.count(';') > header.count(',') else ','
+
     def clean_and_inject(self, df):
         """Phase 2 : Le Pipeline de Nettoyage Ultime"""
         df = df.copy()
@@ -96,10 +145,71 @@ class DataCleaner:
         # 6. INJECTION FINALE
         # On ne garde que les colonnes propres dans l'ordre attendu par la BDD
         final_df = df[list(expected_cols.keys())]
+        # Région, segment, sexe -> codes entiers des tables de libellés (une recherche par valeur distincte)
+        final_df = self.db.encode_dimensions(final_df)
         
         self.db.import_dataframe(final_df)
         return len(final_df)
 
+    # --- PIPELINE TRANSACTIONS ---
+
+    def clean_transactions(self, df):
+        """Normalise un lot de transactions : (id_client, montant, date_trans) typés et valides."""
+        df = df.copy()
+        df.columns = [str(c).lower().strip() for c in df.columns]
+        df = df.rename(columns=self.TRANSACTION_ALIASES)
+
+        for col in ['id_client', 'montant', 'date_trans']:
+            if col not in df.columns:
+                df[col] = None
+
+        # Identifiant client entier (les lignes sans client sont inexploitables)
+        df['id_client'] = pd.to_numeric(df['id_client'], errors='coerce')
+
+        # Montant : mêmes règles monétaires que pour les clients ('1 000 €', '-12,50'...)
+        df['montant'] = pd.to_numeric(
+            df['montant'].astype(str).str.replace(' ', '').str.replace('€', '')
+                         .str.replace('$', '').str.replace(',', '.'),
+            errors='coerce')
+
+        # Date au format BDD (AAAA-MM-JJ)
+        dates = pd.to_datetime(df['date_trans'], errors='coerce')
+        df['date_trans'] = dates.dt.strftime('%Y-%m-%d')
+
+        df = df.dropna(subset=['id_client', 'montant', 'date_trans'])
+        df['id_client'] = df['id_client'].astype(int)
+        return df[['id_client', 'montant', 'date_trans']]
+
+    def clean_and_inject_transactions(self, df):
+        """
+        Nettoie un DataFrame de transactions puis l'injecte en masse (soldes mis à jour).
+        Retourne (nb_inserees, nb_rejetees) : les lignes écartées au nettoyage sont rejetées.
+        """
+        clean = self.clean_transactions(df)
+        inserted, rejected = self.db.add_transactions_bulk(clean)
+        return inserted, rejected + len(df) - len(clean)
+
+    def import_transactions_file(self, file_path, chunksize=200000):
+        """
+        Import direct d'un fichier de transactions, sans le charger entièrement en mémoire.
+        Les CSV sont lus par blocs et nettoyés à la volée ; l'injection reste une seule
+        transaction SQL avec une seule mise à jour groupée des soldes.
+        Retourne (nb_inserees, nb_rejetees) : client inconnu, ou ligne écartée au nettoyage
+        (client, montant ou date illisible). Une erreur SQL est levée (rien n'est écrit).
+        """
+        chunks = self.read_chunks(file_path, chunksize)
+        dropped = 0
+
+        def rows():
+            nonlocal dropped
+            for chunk in chunks:
+                clean = self.clean_transactions(chunk)
+                dropped += len(chunk) - len(clean)
+                yield from clean.itertuples(index=False, name=None)
+
+        inserted, rejected = self.db.add_transactions_bulk(rows())
+        return inserted, rejected + dropped
+
     # --- SOUS-FONCTIONS ROBUSTES ---
 
     def _normalize_gender(self, val):
@@ -1,55 +1,200 @@
 import sqlite3
 import csv
-import pandas as pd # Ajout pour l'import massif optimisé
+import gzip
+import queue
+import threading
+import time
+import calendar
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, InvalidStateError
+from datetime import date, datetime, timedelta
+from core.client_record import ClientRecord
+from core.query_profiler import QueryProfiler, profiled
+
+# Événement publié après chaque écriture validée :
+# tables touchées, id_client concernés (None = potentiellement tous), génération d'écriture.
+ChangeEvent = namedtuple("ChangeEvent", ["tables", "ids", "generation"])
+
+
+# Cube d'agrégats des clients (maintenu par triggers) : dimensions et tranches d'âge
+CUBE_DIMENSIONS = ("region", "segment", "risque", "sexe", "tranche_age")
+TRANCHES_AGE = ((25, "18-24"), (35, "25-34"), (45, "35-44"), (55, "45-54"), (65, "55-64"))
+
+
+# Colonnes texte codées en dictionnaire : colonne -> (table de libellés, colonne de code).
+# Les tables stockent des codes entiers ; les vues 'clients' et 'scoring' exposent les libellés.
+DIMENSIONS = {
+    "region": ("dim_region", "region_id"),
+    "segment": ("dim_segment", "segment_id"),
+    "sexe": ("dim_sexe", "sexe_id"),
+    "niveau_risque": ("dim_risque", "risque_id"),
+}
+
+
+def _tranche_age_sql(age):
+    """Expression SQL de la tranche d'âge (même découpage partout : triggers et reconstruction)."""
+    cases = " ".join(f"WHEN {age} < {limit} THEN '{label}'" for limit, label in TRANCHES_AGE)
+    return f"CASE WHEN {age} IS NULL THEN 'N/A' {cases} ELSE '65+' END"
+
 
 class DataManager:
     """
     Couche DONNÉES : Gère la base SQLite.
     """
 
-    def __init__(self, db_name="clients.db"):
+    # Périodicité des points de contrôle de solde (voir refresh_balance_checkpoints)
+    CHECKPOINT_INTERVALS = ("jour", "semaine", "mois", "trimestre")
+    CLIENT_CACHE_SIZE = 1024 # Fiches client gardées par get_client (LRU)
+
+    def __init__(self, db_name="clients.db", group_commit_delay=0.005, group_commit_size=500,
+                 checkpoint_interval="mois"):
         self.db_name = db_name
+        self.checkpoint_interval = checkpoint_interval
+
+        # File d'écriture groupée (un seul thread écrivain, démarré à la première soumission)
+        self.group_commit_delay = group_commit_delay # Attente max avant COMMIT (secondes)
+        self.group_commit_size = group_commit_size   # Nb max de transactions par COMMIT
+        self._write_queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._closing = False # close() en cours : soumissions refusées
+
+        # Bus de changements : les vues s'abonnent et savent quand leurs données ont changé
+        self.generation = 0 # Incrémentée à chaque écriture validée
+        self._subscribers = []
+        self._bus_lock = threading.Lock()
+
+        # Instantané colonnaire (core.columnar_snapshot), créé à la première demande
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+
+        # Instrumentation des requêtes (enable_profiling) : désactivée par défaut
+        self.profiler = None
+
+        # Cache LRU des fiches client (get_client), invalidé par le bus de changements
+        self._client_cache = OrderedDict()
+        self._client_cache_lock = threading.Lock()
+        self.subscribe(self._invalidate_clients)
+
         self.creer_tables()
 
-    def connect(self):
-        """Établit la connexion avec la BDD et active les clés étrangères."""
-        conn = sqlite3.connect(self.db_name)
+    def connect(self, cancel=None, check_same_thread=True):
+        """
+        Établit la connexion avec la BDD et active les clés étrangères.
+        cancel : threading.Event optionnel ; dès qu'il est levé, la requête en cours est
+        abandonnée (sqlite3.OperationalError 'interrupted'), ex. recherche périmée.
+        check_same_thread=False : connexion fermable depuis un autre thread (pools de connexions).
+        """
+        open_db = self.profiler.connect if self.profiler is not None else sqlite3.connect
+        conn = open_db(self.db_name, check_same_thread=check_same_thread)
         # CRITIQUE : Permet d'accéder aux colonnes par leur nom (ex: row['nom'])
         # Indispensable pour l'interface graphique moderne.
         conn.row_factory = sqlite3.Row  
         conn.execute("PRAGMA foreign_keys = ON;")
+        if cancel is not None:
+            conn.set_progress_handler(lambda: 1 if cancel.is_set() else 0, 10000)
         return conn
 
-    def creer_tables(self):
-        """Création de la structure BDD selon le PDF."""
-        conn = self.connect()
+    def enable_profiling(self, slow_ms=100, explain=True):
+        """
+        Active l'instrumentation des requêtes (core.query_profiler) pour les connexions
+        ouvertes ensuite : durées, lignes, allers-retours par appel, requêtes lentes + plan.
+        """
+        if self.profiler is None:
+            self.profiler = QueryProfiler(slow_ms=slow_ms, explain=explain)
+        return self.profiler
+
+    def disable_profiling(self):
+        """Désactive l'instrumentation ; retourne le profileur (résultats consultables)."""
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    # --- NOTIFICATION DES CHANGEMENTS ---
+
+    def subscribe(self, callback):
+        """
+        Abonne callback(ChangeEvent) aux écritures. Attention : il est appelé dans le
+        thread qui a écrit (thread écrivain, tâche de fond...), pas forcément le thread Tk.
+        """
+        with self._bus_lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._bus_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, tables, ids=None):
+        """Signale une écriture validée (appelé APRÈS le commit)."""
+        with self._bus_lock:
+            self.generation += 1
+            event = ChangeEvent(frozenset(tables), None if ids is None else frozenset(ids), self.generation)
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Erreur abonné changements: {e}")
+        return event
+
+    def creer_tables(self, conn=None):
+        """Création de la structure BDD selon le PDF (sur 'conn' si fournie : base modèle de clear_all)."""
+        own = conn is None
+        if own:
+            conn = self.connect()
         cur = conn.cursor()
+
+        # Base neuve : l'espace libéré pourra être rendu par morceaux (compact), sans VACUUM complet
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Journal WAL : les lectures ne bloquent plus pendant les écritures (et moins de fsync)
+        cur.execute("PRAGMA journal_mode = WAL")
+
+        # 0. Tables de libellés (dimensions codées en dictionnaire, voir DIMENSIONS)
+        for table, _ in DIMENSIONS.values():
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY,
+                    libelle TEXT NOT NULL UNIQUE
+            )""")
+
+        # Bases antérieures aux dimensions : 'clients' est encore une table à colonnes texte
+        objets = dict(cur.execute("SELECT name, type FROM sqlite_master").fetchall())
+        migrer_dimensions = objets.get('clients') == 'table'
+        if migrer_dimensions:
+            self._ecarter_anciennes_tables(cur, objets)
         
-        # 1. Table Clients
+        # 1. Table Clients (stockage : codes entiers ; la vue 'clients' expose les libellés)
         cur.execute("""
-        CREATE TABLE IF NOT EXISTS clients (
+        CREATE TABLE IF NOT EXISTS clients_base (
                 id_client INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL,
                 age INTEGER,
-                sexe TEXT,
+                sexe_id INTEGER,
                 solde REAL,
-                region TEXT,
+                region_id INTEGER,
                 anciennete INTEGER,
-                segment TEXT DEFAULT 'Standard',
+                segment_id INTEGER,
                 revenu REAL DEFAULT 0,
                 score_initial REAL DEFAULT 500,
-                date_creation DATE DEFAULT CURRENT_DATE
+                date_creation DATE DEFAULT CURRENT_DATE,
+                solde_ouverture REAL
         )""")
+        # Bases créées avant l'ajout du solde d'ouverture : migration + reconstitution
+        migrer_ouverture = 'solde_ouverture' not in self._colonnes(cur, 'clients_base')
+        if migrer_ouverture:
+            cur.execute("ALTER TABLE clients_base ADD COLUMN solde_ouverture REAL")
 
         # 2. Table Scoring (Lien avec le module du Membre 2)
         cur.execute("""
-        CREATE TABLE IF NOT EXISTS scoring (
+        CREATE TABLE IF NOT EXISTS scoring_base (
                 id_score INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_client INTEGER,
                 score_final REAL,
-                niveau_risque TEXT,
+                risque_id INTEGER,
                 date_calcul DATE,
-                FOREIGN KEY(id_client) REFERENCES clients(id_client) ON DELETE CASCADE
+                FOREIGN KEY(id_client) REFERENCES clients_base(id_client) ON DELETE CASCADE
         )""")
         
         # 3. Table Transactions (Optionnelle dans le PDF mais requise pour ton IA)
@@ -59,17 +204,521 @@ class DataManager:
                 id_client INTEGER,
                 montant REAL,
                 date_trans DATE,
-                FOREIGN KEY(id_client) REFERENCES clients(id_client) ON DELETE CASCADE
+                FOREIGN KEY(id_client) REFERENCES clients_base(id_client) ON DELETE CASCADE
+        )""")
+
+        # 4. Table Meta (curseurs des traitements incrémentaux, clé -> valeur)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+                cle TEXT PRIMARY KEY,
+                valeur TEXT
+        )""")
+
+        # 5. Cumuls du grand livre par client (maintenus par la réconciliation)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_cumuls (
+                id_client INTEGER PRIMARY KEY,
+                total REAL NOT NULL DEFAULT 0,
+                FOREIGN KEY(id_client) REFERENCES clients_base(id_client) ON DELETE CASCADE
         )""")
+
+        # 6. Points de contrôle de solde : cumul des mouvements de chaque client à une date
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS solde_checkpoints (
+                date_checkpoint DATE NOT NULL,
+                id_client INTEGER NOT NULL,
+                cumul REAL NOT NULL,
+                PRIMARY KEY (date_checkpoint, id_client),
+                FOREIGN KEY(id_client) REFERENCES clients_base(id_client) ON DELETE CASCADE
+        ) WITHOUT ROWID""")
+
+        # 7. Agrégats des transactions (jour / mois x région x segment) pour les séries temporelles
+        for table, periode in (("rollup_jour", "jour"), ("rollup_mois", "mois")):
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                    {periode} TEXT NOT NULL,
+                    region_id INTEGER NOT NULL,
+                    segment_id INTEGER NOT NULL,
+                    nb INTEGER NOT NULL DEFAULT 0,
+                    entrees REAL NOT NULL DEFAULT 0,
+                    sorties REAL NOT NULL DEFAULT 0,
+                    net REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY ({periode}, region_id, segment_id)
+            ) WITHOUT ROWID""")
+
+        # 8. Cube client : région x segment x risque x sexe x tranche d'âge (voir query_cube)
+        creer_cube = 'cube_clients' not in objets or migrer_dimensions
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS cube_clients (
+                region_id INTEGER NOT NULL,
+                segment_id INTEGER NOT NULL,
+                risque_id INTEGER NOT NULL,
+                sexe_id INTEGER NOT NULL,
+                tranche_age TEXT NOT NULL,
+                nb INTEGER NOT NULL DEFAULT 0,
+                somme_solde REAL NOT NULL DEFAULT 0,
+                somme_revenu REAL NOT NULL DEFAULT 0,
+                nb_scores INTEGER NOT NULL DEFAULT 0,
+                somme_score REAL NOT NULL DEFAULT 0,
+                somme_score2 REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (region_id, segment_id, risque_id, sexe_id, tranche_age)
+        ) WITHOUT ROWID""")
+
+        if migrer_dimensions:
+            migrer_ouverture |= self._migrer_dimensions(cur)
+
+        # Vues de compatibilité : les requêtes existantes lisent et écrivent toujours des libellés
+        self._creer_vues(cur)
+        self._creer_triggers_cube(cur)
+        self._creer_triggers_rollup(cur)
+        self._creer_triggers_version(cur)
+        cur.execute(self.SQL_EPOQUE)
+
+        # Index sur les clés de jointure (sinon chaque recherche par client parcourt toute la table)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_client ON transactions(id_client, date_trans)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date_trans)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_scoring_client ON scoring_base(id_client)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_client ON solde_checkpoints(id_client, date_checkpoint)")
+
+        if migrer_ouverture:
+            # On suppose le solde actuel cohérent : ouverture = solde - somme des mouvements
+            cur.execute("""
+                UPDATE clients_base
+                SET solde_ouverture = COALESCE(solde, 0) - COALESCE(
+                    (SELECT SUM(t.montant) FROM transactions t WHERE t.id_client = clients_base.id_client), 0)
+            """)
+
+        if creer_cube:
+            self.rebuild_cube(conn) # Base existante : le cube part de l'état actuel
         
         conn.commit()
-        conn.close()
+        if migrer_dimensions:
+            cur.execute("VACUUM") # Récupère la place des anciennes colonnes texte
+        if own:
+            conn.close()
+
+    def _ecarter_anciennes_tables(self, cur, objets):
+        """
+        Ancien schéma (colonnes texte) : les tables clients / scoring sont mises de côté
+        (*_ancien) pour être recopiées codées par _migrer_dimensions. Les clés étrangères des
+        autres tables suivent le premier renommage (-> clients_base), pas le second (mode legacy).
+        Cube et rollups, dérivés, seront recalculés.
+        """
+        cur.execute("PRAGMA foreign_keys = OFF") # Recopie puis suppression des anciennes tables
+        for name, kind in objets.items():
+            if kind == 'trigger' and name.startswith(('trg_cube_', 'trg_rollup_', 'trg_version_')):
+                cur.execute(f"DROP TRIGGER {name}")
+        for table in ("cube_clients", "rollup_jour", "rollup_mois"):
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+        if 'meta' in objets:
+            cur.execute("DELETE FROM meta WHERE cle = 'rollup_dernier_id_trans'")
+
+        for table in ("clients", "scoring"):
+            if objets.get(table) != 'table':
+                continue
+            cur.execute(f"ALTER TABLE {table} RENAME TO {table}_base")
+            cur.execute("PRAGMA legacy_alter_table = ON")
+            cur.execute(f"ALTER TABLE {table}_base RENAME TO {table}_ancien")
+            cur.execute("PRAGMA legacy_alter_table = OFF")
+
+    def _migrer_dimensions(self, cur):
+        """
+        Recopie des tables mises de côté dans clients_base / scoring_base : libellés -> codes
+        (une jointure par dimension), puis suppression des anciennes tables.
+        Retourne True si le solde d'ouverture n'existait pas encore (à reconstituer).
+        """
+        sans_ouverture = False
+        for ancien, base in (("clients_ancien", "clients_base"), ("scoring_ancien", "scoring_base")):
+            anciennes = self._colonnes(cur, ancien)
+            if not anciennes:
+                continue
+            select, joins = [], []
+            for column in self._colonnes(cur, base):
+                label = next((c for c, (_, code) in DIMENSIONS.items() if code == column), None)
+                if label in anciennes:
+                    table, _ = DIMENSIONS[label]
+                    cur.execute(f"INSERT OR IGNORE INTO {table} (libelle) "
+                                f"SELECT DISTINCT {label} FROM {ancien} WHERE {label} IS NOT NULL")
+                    joins.append(f"LEFT JOIN {table} ON {table}.libelle = a.{label}")
+                    select.append(f"{table}.id")
+                elif column in anciennes:
+                    select.append(f"a.{column}")
+                else:
+                    sans_ouverture |= column == 'solde_ouverture'
+                    select.append("NULL")
+            cur.execute(f"INSERT INTO {base} ({', '.join(self._colonnes(cur, base))}) "
+                        f"SELECT {', '.join(select)} FROM {ancien} a {' '.join(joins)}")
+            cur.execute(f"DROP TABLE {ancien}")
+        return sans_ouverture
+
+    def _creer_vues(self, cur):
+        """
+        Vues 'clients' et 'scoring' (mêmes colonnes que les anciennes tables) et triggers
+        INSTEAD OF qui traduisent libellés -> codes, en créant les libellés inconnus.
+        Les valeurs par défaut des anciennes colonnes sont reproduites (une vue n'en a pas).
+        """
+        def code(column, value):
+            table, _ = DIMENSIONS[column]
+            return (f"INSERT OR IGNORE INTO {table} (libelle) SELECT {value} WHERE {value} IS NOT NULL;",
+                    f"(SELECT id FROM {table} WHERE libelle = {value})")
+
+        cur.execute("""
+        CREATE VIEW IF NOT EXISTS clients AS
+        SELECT b.id_client, b.nom, b.age, x.libelle AS sexe, b.solde, r.libelle AS region, b.anciennete,
+               g.libelle AS segment, b.revenu, b.score_initial, b.date_creation, b.solde_ouverture
+        FROM clients_base b
+        LEFT JOIN dim_sexe x ON x.id = b.sexe_id
+        LEFT JOIN dim_region r ON r.id = b.region_id
+        LEFT JOIN dim_segment g ON g.id = b.segment_id""")
+        cur.execute("""
+        CREATE VIEW IF NOT EXISTS scoring AS
+        SELECT s.id_score, s.id_client, s.score_final, k.libelle AS niveau_risque, s.date_calcul
+        FROM scoring_base s
+        LEFT JOIN dim_risque k ON k.id = s.risque_id""")
+
+        sexe, region, segment = code("sexe", "NEW.sexe"), code("region", "NEW.region"), \
+            code("segment", "COALESCE(NEW.segment, 'Standard')")
+        risque = code("niveau_risque", "NEW.niveau_risque")
+        ensure_client = sexe[0] + region[0] + segment[0]
+        triggers = {
+            "trg_clients_insert": ("INSTEAD OF INSERT ON clients", ensure_client + f"""
+                INSERT INTO clients_base (id_client, nom, age, sexe_id, solde, region_id, anciennete, segment_id,
+                                          revenu, score_initial, date_creation, solde_ouverture)
+                VALUES (NEW.id_client, NEW.nom, NEW.age, {sexe[1]}, NEW.solde, {region[1]}, NEW.anciennete,
+                        {segment[1]}, COALESCE(NEW.revenu, 0), COALESCE(NEW.score_initial, 500),
+                        COALESCE(NEW.date_creation, CURRENT_DATE), NEW.solde_ouverture);"""),
+            "trg_clients_update": ("INSTEAD OF UPDATE ON clients", ensure_client + f"""
+                UPDATE clients_base SET id_client = NEW.id_client, nom = NEW.nom, age = NEW.age, sexe_id = {sexe[1]},
+                       solde = NEW.solde, region_id = {region[1]}, anciennete = NEW.anciennete,
+                       segment_id = {segment[1]}, revenu = NEW.revenu, score_initial = NEW.score_initial,
+                       date_creation = NEW.date_creation, solde_ouverture = NEW.solde_ouverture
+                WHERE id_client = OLD.id_client;"""),
+            "trg_clients_delete": ("INSTEAD OF DELETE ON clients",
+                                   "DELETE FROM clients_base WHERE id_client = OLD.id_client;"),
+            "trg_scoring_insert": ("INSTEAD OF INSERT ON scoring", risque[0] + f"""
+                INSERT INTO scoring_base (id_score, id_client, score_final, risque_id, date_calcul)
+                VALUES (NEW.id_score, NEW.id_client, NEW.score_final, {risque[1]}, NEW.date_calcul);"""),
+            "trg_scoring_update": ("INSTEAD OF UPDATE ON scoring", risque[0] + f"""
+                UPDATE scoring_base SET id_score = NEW.id_score, id_client = NEW.id_client,
+                       score_final = NEW.score_final, risque_id = {risque[1]}, date_calcul = NEW.date_calcul
+                WHERE id_score = OLD.id_score;"""),
+            "trg_scoring_delete": ("INSTEAD OF DELETE ON scoring",
+                                   "DELETE FROM scoring_base WHERE id_score = OLD.id_score;"),
+        }
+        for name, (event, body) in triggers.items():
+            cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    def dimension_codes(self, conn, column, labels=()):
+        """
+        Codes entiers d'une dimension ({libellé: code}), après création des libellés inconnus
+        parmi 'labels'. Les tables de libellés restent petites : on les relit en entier.
+        Le COMMIT reste à la charge de l'appelant.
+        """
+        table, _ = DIMENSIONS[column]
+        conn.executemany(f"INSERT OR IGNORE INTO {table} (libelle) VALUES (?)",
+                         [(label,) for label in set(labels) if label is not None])
+        return {row[0]: row[1] for row in conn.execute(f"SELECT libelle, id FROM {table}")}
+
+    def encode_dimensions(self, df, conn=None):
+        """
+        Remplace les colonnes texte codées (region, segment, sexe, niveau_risque) d'un DataFrame
+        par leurs codes (region_id...) : une recherche par libellé distinct, pas par ligne.
+        """
+        import numpy as np
+        import pandas as pd
+        own = conn is None
+        if own:
+            conn = self.connect()
+        try:
+            df = df.copy()
+            for column, (_, code) in DIMENSIONS.items():
+                if column not in df.columns:
+                    continue
+                values = df[column].astype("category")
+                codes = self.dimension_codes(conn, column, values.cat.categories)
+                lookup = np.array([codes[c] for c in values.cat.categories] + [0], dtype=np.int64)
+                ids = lookup[values.cat.codes.to_numpy()] # Code -1 (NaN) -> dernier élément (0)
+                df[code] = pd.arrays.IntegerArray(ids, ids == 0)
+                df = df.drop(columns=column)
+            if own:
+                conn.commit()
+            return df
+        finally:
+            if own:
+                conn.close()
+
+    def _cube_upsert(self, row, risque, score, sign, source="WHERE true"):
+        """
+        Ajoute (sign=1) ou retire (sign=-1) la contribution d'un client au cube.
+        row : alias de la ligne clients_base (NEW, OLD, c) ; risque (code) / score : expressions SQL.
+        Code 0 = valeur absente.
+        """
+        s = "" if sign > 0 else "-"
+        return f"""
+            INSERT INTO cube_clients (region_id, segment_id, risque_id, sexe_id, tranche_age, nb, somme_solde,
+                                      somme_revenu, nb_scores, somme_score, somme_score2)
+            SELECT COALESCE({row}.region_id, 0), COALESCE({row}.segment_id, 0), COALESCE({risque}, 0),
+                   COALESCE({row}.sexe_id, 0), {_tranche_age_sql(f"{row}.age")},
+                   {s}1, {s}COALESCE({row}.solde, 0), {s}COALESCE({row}.revenu, 0),
+                   {s}({score} IS NOT NULL), {s}COALESCE({score}, 0), {s}COALESCE({score} * {score}, 0)
+            {source}
+            ON CONFLICT(region_id, segment_id, risque_id, sexe_id, tranche_age) DO UPDATE SET
+                nb = nb + excluded.nb,
+                somme_solde = somme_solde + excluded.somme_solde,
+                somme_revenu = somme_revenu + excluded.somme_revenu,
+                nb_scores = nb_scores + excluded.nb_scores,
+                somme_score = somme_score + excluded.somme_score,
+                somme_score2 = somme_score2 + excluded.somme_score2;"""
+
+    def _creer_triggers_cube(self, cur):
+        """
+        Maintenance incrémentale du cube : chaque écriture sur clients ou scoring déplace la
+        contribution du client concerné (retrait de l'ancienne, ajout de la nouvelle).
+        On suppose au plus une ligne de scoring par client (cf. ScoringModel).
+        """
+        def score_of(row):
+            return (f"(SELECT score_final FROM scoring_base WHERE id_client = {row}.id_client LIMIT 1)",
+                    f"(SELECT risque_id FROM scoring_base WHERE id_client = {row}.id_client LIMIT 1)")
+
+        new_score, new_risque = score_of("NEW")
+        old_score, old_risque = score_of("OLD")
+        client_new = "FROM clients_base c WHERE c.id_client = NEW.id_client"
+        client_old = "FROM clients_base c WHERE c.id_client = OLD.id_client"
+        triggers = {
+            "trg_cube_clients_ins": ("AFTER INSERT ON clients_base",
+                                     self._cube_upsert("NEW", new_risque, new_score, 1)),
+            "trg_cube_clients_upd": ("AFTER UPDATE OF region_id, segment_id, sexe_id, age, solde, revenu ON clients_base",
+                                     self._cube_upsert("OLD", old_risque, old_score, -1)
+                                     + self._cube_upsert("NEW", new_risque, new_score, 1)),
+            # BEFORE : le score est encore là (la cascade sur scoring vient après la suppression)
+            "trg_cube_clients_del": ("BEFORE DELETE ON clients_base",
+                                     self._cube_upsert("OLD", old_risque, old_score, -1)),
+            "trg_cube_scoring_ins": ("AFTER INSERT ON scoring_base",
+                                     self._cube_upsert("c", "NULL", "NULL", -1, client_new)
+                                     + self._cube_upsert("c", "NEW.risque_id", "NEW.score_final", 1, client_new)),
+            "trg_cube_scoring_upd": ("AFTER UPDATE OF score_final, risque_id ON scoring_base",
+                                     self._cube_upsert("c", "OLD.risque_id", "OLD.score_final", -1, client_new)
+                                     + self._cube_upsert("c", "NEW.risque_id", "NEW.score_final", 1, client_new)),
+            # Client déjà supprimé (cascade) : sa contribution a été retirée par trg_cube_clients_del
+            "trg_cube_scoring_del": ("AFTER DELETE ON scoring_base",
+                                     self._cube_upsert("c", "OLD.risque_id", "OLD.score_final", -1, client_old)
+                                     + self._cube_upsert("c", "NULL", "NULL", 1, client_old)),
+        }
+        for name, (event, body) in triggers.items():
+            cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    def _creer_triggers_rollup(self, cur):
+        """
+        Les rollups ne font qu'ajouter les nouvelles transactions (refresh_rollups), dans le
+        compartiment région / segment actuel du client. Les triggers les gardent exacts :
+        - suppression d'une transaction déjà agrégée (id_trans <= curseur) : contribution retirée ;
+        - changement de région / segment d'un client : son historique agrégé change de compartiment
+          (sinon une suppression ultérieure le retirerait du mauvais).
+        """
+        watermark = "COALESCE((SELECT CAST(valeur AS INTEGER) FROM meta WHERE cle = 'rollup_dernier_id_trans'), 0)"
+
+        def bucket(region, segment):
+            return (f"COALESCE({region}, (SELECT id FROM dim_region WHERE libelle = 'Inconnue'))",
+                    f"COALESCE({segment}, (SELECT id FROM dim_segment WHERE libelle = 'Standard'))")
+        client = "(SELECT {} FROM clients_base WHERE id_client = OLD.id_client)"
+        history = f"""SELECT date_trans AS jour, montant FROM transactions
+                      WHERE id_client = OLD.id_client AND id_trans <= {watermark}"""
+        defaults = """INSERT OR IGNORE INTO dim_region (libelle) SELECT 'Inconnue' WHERE NEW.region_id IS NULL;
+                      INSERT OR IGNORE INTO dim_segment (libelle) SELECT 'Standard' WHERE NEW.segment_id IS NULL;"""
+
+        triggers = {
+            # BEFORE : les transactions du client (supprimées par la cascade) sont encore lisibles
+            "trg_rollup_clients_del": ("BEFORE DELETE ON clients_base",
+                                       self._rollup_report(history, *bucket("OLD.region_id", "OLD.segment_id"), -1)),
+            "trg_rollup_clients_upd": ("""AFTER UPDATE OF region_id, segment_id ON clients_base
+                                          WHEN OLD.region_id IS NOT NEW.region_id OR OLD.segment_id IS NOT NEW.segment_id""",
+                                       defaults
+                                       + self._rollup_report(history, *bucket("OLD.region_id", "OLD.segment_id"), -1)
+                                       + self._rollup_report(history, *bucket("NEW.region_id", "NEW.segment_id"), 1)),
+            # Suppression directe (client toujours présent) ; en cascade, déjà traitée ci-dessus
+            "trg_rollup_transactions_del": (f"""AFTER DELETE ON transactions
+                                                WHEN OLD.id_trans <= {watermark}
+                                                AND EXISTS (SELECT 1 FROM clients_base WHERE id_client = OLD.id_client)""",
+                                            self._rollup_report("SELECT OLD.date_trans AS jour, OLD.montant AS montant",
+                                                                *bucket(client.format("region_id"),
+                                                                        client.format("segment_id")), -1)),
+        }
+        for name, (event, body) in triggers.items():
+            cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    def _rollup_report(self, source, region, segment, signe):
+        """
+        Instructions ajoutant (signe 1) ou retirant (signe -1) de rollup_jour et rollup_mois les
+        mouvements 'source' (jour, montant) dans un compartiment ; les compartiments vidés disparaissent.
+        """
+        sql = ""
+        for table, periode, cle in (("rollup_jour", "jour", "jour"), ("rollup_mois", "mois", "substr(jour, 1, 7)")):
+            sql += f"""
+                INSERT INTO {table} ({periode}, region_id, segment_id, nb, entrees, sorties, net)
+                SELECT {cle}, {region}, {segment}, {signe} * COUNT(*),
+                       {signe} * SUM(CASE WHEN montant > 0 THEN montant ELSE 0 END),
+                       {signe} * SUM(CASE WHEN montant < 0 THEN -montant ELSE 0 END),
+                       {signe} * SUM(montant)
+                FROM ({source}) WHERE true GROUP BY 1
+                ON CONFLICT DO UPDATE SET
+                    nb = nb + excluded.nb,
+                    entrees = entrees + excluded.entrees,
+                    sorties = sorties + excluded.sorties,
+                    net = net + excluded.net;
+                DELETE FROM {table} WHERE nb <= 0 AND region_id = {region} AND segment_id = {segment};"""
+        return sql
+
+    # Époque de la base : change à chaque vidage, avec 'version_donnees' elle date l'état des données
+    SQL_EPOQUE = "INSERT OR IGNORE INTO meta (cle, valeur) VALUES ('epoque', lower(hex(randomblob(8))))"
+
+    def _creer_triggers_version(self, cur):
+        """
+        Compteur persistant 'version_donnees' (table meta), incrémenté par toute écriture sur
+        clients ou scoring : permet aux caches disque (instantané colonnaire) de savoir,
+        même après un redémarrage, s'ils sont encore à jour.
+        """
+        bump = """INSERT INTO meta (cle, valeur) VALUES ('version_donnees', 1)
+                  ON CONFLICT(cle) DO UPDATE SET valeur = valeur + 1;"""
+        for table in ("clients", "scoring"):
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} "
+                            f"AFTER {event} ON {table}_base BEGIN {bump} END")
+
+    def data_stamp(self, conn=None):
+        """Empreinte 'époque:version' de l'état des tables clients et scoring (voir _creer_triggers_version)."""
+        own = conn is None
+        if own:
+            conn = self.connect()
+        try:
+            return f"{self.get_meta(conn, 'epoque', '')}:{self.get_meta(conn, 'version_donnees', 0)}"
+        finally:
+            if own:
+                conn.close()
+
+    def columnar_snapshot(self):
+        """Instantané colonnaire des clients et scores (NumPy mappé en mémoire), créé au premier appel."""
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                from core.columnar_snapshot import ColumnarSnapshot
+                self._snapshot = ColumnarSnapshot(self.db_name + ".snapshot", self)
+            return self._snapshot
+
+    @profiled
+    def rebuild_cube(self, conn=None):
+        """Recalcule tout le cube depuis clients + scoring (migration, contrôle). COMMIT à la charge de l'appelant si conn est fourni."""
+        own = conn is None
+        if own:
+            conn = self.connect()
+        try:
+            conn.execute("DELETE FROM cube_clients")
+            conn.execute(f"""
+                INSERT INTO cube_clients (region_id, segment_id, risque_id, sexe_id, tranche_age, nb, somme_solde,
+                                          somme_revenu, nb_scores, somme_score, somme_score2)
+                SELECT COALESCE(c.region_id, 0), COALESCE(c.segment_id, 0), COALESCE(s.risque_id, 0),
+                       COALESCE(c.sexe_id, 0), {_tranche_age_sql("c.age")},
+                       COUNT(*), COALESCE(SUM(c.solde), 0), COALESCE(SUM(c.revenu), 0),
+                       COUNT(s.score_final), COALESCE(SUM(s.score_final), 0),
+                       COALESCE(SUM(s.score_final * s.score_final), 0)
+                FROM clients_base c
+                LEFT JOIN scoring_base s ON s.id_client = c.id_client
+                GROUP BY 1, 2, 3, 4, 5
+            """)
+            if own:
+                conn.commit()
+        finally:
+            if own:
+                conn.close()
+
+    # --- CUBE (agrégats multidimensionnels) ---
+
+    # Libellé de chaque dimension du cube (codes 0 = valeur absente)
+    CUBE_LABELS = {
+        "region": "COALESCE(r.libelle, '-')", "segment": "COALESCE(g.libelle, '-')",
+        "risque": "COALESCE(k.libelle, 'N/A')", "sexe": "COALESCE(x.libelle, '-')",
+        "tranche_age": "q.tranche_age",
+    }
+
+    @profiled
+    def query_cube(self, dimensions=(), **filters):
+        """
+        Agrégats des clients regroupés par 'dimensions' (sous-ensemble de CUBE_DIMENSIONS),
+        filtrés par dimension=valeur. Lus dans cube_clients : quelques centaines de lignes
+        au plus, quel que soit le nombre de clients.
+        Retourne une liste de dicts : dimensions + nb, solde_total, solde_moyen, revenu_moyen,
+        score_moyen, score_ecart_type (None sans score).
+        """
+        dimensions = tuple(dimensions)
+        unknown = [d for d in dimensions + tuple(filters) if d not in CUBE_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensions inconnues : {unknown}")
+
+        where = " AND ".join(f"{self.CUBE_LABELS[d]} = ?" for d in filters) or "1=1"
+        cols = "".join(f"{self.CUBE_LABELS[d]} AS {d}, " for d in dimensions)
+        group = f"GROUP BY {', '.join(dimensions)} ORDER BY {', '.join(dimensions)}" if dimensions else ""
+        conn = self.connect()
+        try:
+            rows = conn.execute(f"""
+                SELECT {cols} SUM(nb) AS nb, SUM(somme_solde) AS somme_solde, SUM(somme_revenu) AS somme_revenu,
+                       SUM(nb_scores) AS nb_scores, SUM(somme_score) AS somme_score, SUM(somme_score2) AS somme_score2
+                FROM cube_clients q
+                LEFT JOIN dim_region r ON r.id = q.region_id
+                LEFT JOIN dim_segment g ON g.id = q.segment_id
+                LEFT JOIN dim_risque k ON k.id = q.risque_id
+                LEFT JOIN dim_sexe x ON x.id = q.sexe_id
+                WHERE nb > 0 AND {where}
+                {group}
+            """, list(filters.values())).fetchall()
+        finally:
+            conn.close()
+
+        result = []
+        for row in rows:
+            nb, n_scores = row['nb'] or 0, row['nb_scores'] or 0
+            if not nb:
+                continue
+            cell = {d: row[d] for d in dimensions}
+            cell.update(nb=nb, solde_total=row['somme_solde'], solde_moyen=row['somme_solde'] / nb,
+                        revenu_moyen=row['somme_revenu'] / nb, score_moyen=None, score_ecart_type=None)
+            if n_scores:
+                mean = row['somme_score'] / n_scores
+                cell['score_moyen'] = mean
+                cell['score_ecart_type'] = max(row['somme_score2'] / n_scores - mean * mean, 0) ** 0.5
+            result.append(cell)
+        return result
+
+    def get_crosstab(self, rows="region", cols="segment", measure="nb", **filters):
+        """Tableau croisé depuis le cube : (libellés lignes, libellés colonnes, matrice de 'measure')."""
+        cells = self.query_cube((rows, cols), **filters)
+        row_labels = sorted({c[rows] for c in cells})
+        col_labels = sorted({c[cols] for c in cells})
+        matrix = [[0] * len(col_labels) for _ in row_labels]
+        for c in cells:
+            matrix[row_labels.index(c[rows])][col_labels.index(c[cols])] = c[measure] or 0
+        return row_labels, col_labels, matrix
+
+    def _colonnes(self, cur, table):
+        """Noms des colonnes d'une table (pour les migrations de schéma)."""
+        return [row[1] for row in cur.execute(f"PRAGMA table_info({table})").fetchall()]
+
+    def get_meta(self, conn, key, default=None):
+        """Lit une valeur de la table meta (dans la transaction de l'appelant)."""
+        row = conn.execute("SELECT valeur FROM meta WHERE cle = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, conn, key, value):
+        """Écrit une valeur de la table meta (le COMMIT reste à la charge de l'appelant)."""
+        conn.execute("""
+            INSERT INTO meta (cle, valeur) VALUES (?, ?)
+            ON CONFLICT(cle) DO UPDATE SET valeur = excluded.valeur
+        """, (key, str(value)))
 
     # --- CRUD (Create, Read, Update, Delete) ---
 
+    @profiled
     def get_all_clients(self):
-        """Récupère tous les clients avec leur score associé (Jointure)."""
+        """Récupère tous les clients avec leur score associé (Jointure), en ClientRecord."""
         conn = self.connect()
+        conn.row_factory = None
         # On fait un LEFT JOIN pour avoir le client même s'il n'a pas encore de score calculé
         query = """
         SELECT c.*, s.score_final as score, s.niveau_risque 
@@ -77,57 +726,304 @@ class DataManager:
         LEFT JOIN scoring s ON c.id_client = s.id_client
         ORDER BY c.id_client DESC
         """
-        # Conversion explicite en liste de dictionnaires pour le GUI
-        clients = [dict(row) for row in conn.execute(query).fetchall()]
+        # Enregistrements compacts (lisibles comme des dictionnaires par le GUI)
+        clients = ClientRecord.from_cursor(conn.execute(query))
         conn.close()
         return clients
 
-    def filtrer_clients(self, region=None, risque=None, recherche=None):
+    @profiled
+    def get_client(self, id_client):
         """
-        Fonction de recherche avancée pour l'interface graphique.
-        Remplace les fonctions 'clients_par_region' séparées.
+        Fiche d'un client (ClientRecord avec score) ou None : une lecture par clé primaire,
+        puis servie par le cache LRU tant qu'aucune écriture ne la touche.
+        L'enregistrement est partagé : le copier (dict(client)) avant de le modifier.
         """
+        with self._client_cache_lock:
+            client = self._client_cache.get(id_client)
+            if client is not None:
+                self._client_cache.move_to_end(id_client)
+                return client
+            generation = self.generation
+
         conn = self.connect()
-        query = """
-        SELECT c.*, s.score_final as score, s.niveau_risque 
-        FROM clients c 
-        LEFT JOIN scoring s ON c.id_client = s.id_client
-        WHERE 1=1
+        conn.row_factory = None
+        try:
+            found = ClientRecord.from_cursor(conn.execute("""
+            SELECT c.*, s.score_final as score, s.niveau_risque 
+            FROM clients c 
+            LEFT JOIN scoring s ON c.id_client = s.id_client
+            WHERE c.id_client = ?
+            """, (id_client,)))
+        finally:
+            conn.close()
+        if not found:
+            return None
+
+        with self._client_cache_lock:
+            # Écriture publiée pendant la lecture : la fiche lue est peut-être déjà périmée
+            if self.generation == generation:
+                self._client_cache[id_client] = found[0]
+                if len(self._client_cache) > self.CLIENT_CACHE_SIZE:
+                    self._client_cache.popitem(last=False)
+        return found[0]
+
+    def _invalidate_clients(self, event):
+        """Abonné du bus : retire du cache les fiches touchées (toutes si l'écriture n'est pas ciblée)."""
+        if not event.tables & {"clients", "scoring"}:
+            return
+        with self._client_cache_lock:
+            if event.ids is None:
+                self._client_cache.clear()
+            else:
+                for id_client in event.ids:
+                    self._client_cache.pop(id_client, None)
+
+    @profiled
+    def search_clients(self, recherche=None, before=None, limit=50, cancel=None):
         """
+        Sélecteur de client : (id_client, nom) par id décroissant, filtrés sur le nom
+        (ou l'identifiant exact si 'recherche' est un nombre). 'before' = dernier id déjà
+        affiché : pagination par curseur, chaque page est un parcours d'index borné.
+        """
+        conn = self.connect(cancel)
+        conn.row_factory = None
+        query = "SELECT id_client, nom FROM clients_base WHERE 1=1"
+        params = []
+        recherche = (recherche or "").strip()
+        if recherche.isdigit():
+            query += " AND (id_client = ? OR LOWER(nom) LIKE ?)"
+            params += [int(recherche), f"%{recherche.lower()}%"]
+        elif recherche:
+            query += " AND LOWER(nom) LIKE ?"
+            params.append(f"%{recherche.lower()}%")
+        if before is not None:
+            query += " AND id_client < ?"
+            params.append(before)
+        query += " ORDER BY id_client DESC LIMIT ?"
+        try:
+            return conn.execute(query, params + [limit]).fetchall()
+        finally:
+            conn.close()
+
+    def _client_filters(self, region=None, risque=None, recherche=None, risque_column="s.niveau_risque"):
+        """Clause WHERE (et ses paramètres) commune aux recherches de clients."""
+        where = " WHERE 1=1"
         params = []
         
         if region and region != "Toutes":
-            query += " AND c.region = ?"
+            where += " AND c.region = ?"
             params.append(region)
         
         if risque and risque != "Tous":
-            query += " AND s.niveau_risque = ?"
+            where += f" AND {risque_column} = ?"
             params.append(risque)
             
         if recherche:
-            query += " AND LOWER(c.nom) LIKE ?"
+            where += " AND LOWER(c.nom) LIKE ?"
             params.append(f"%{recherche.lower()}%")
 
-        clients = [dict(row) for row in conn.execute(query, params).fetchall()]
+        return where, params
+
+    @profiled
+    def filtrer_clients(self, region=None, risque=None, recherche=None):
+        """
+        Fonction de recherche avancée pour l'interface graphique.
+        Remplace les fonctions 'clients_par_region' séparées.
+        """
+        conn = self.connect()
+        conn.row_factory = None
+        where, params = self._client_filters(region, risque, recherche)
+        query = """
+        SELECT c.*, s.score_final as score, s.niveau_risque 
+        FROM clients c 
+        LEFT JOIN scoring s ON c.id_client = s.id_client
+        """ + where
+
+        clients = ClientRecord.from_cursor(conn.execute(query, params))
         conn.close()
         return clients
 
+    @profiled
+    def count_clients(self, region=None, risque=None, recherche=None, cancel=None):
+        """Nombre de clients correspondant aux filtres (sans charger les lignes)."""
+        conn = self.connect(cancel)
+        where, params = self._client_filters(region, risque, recherche)
+        join = " LEFT JOIN scoring s ON c.id_client = s.id_client" if risque and risque != "Tous" else ""
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM clients c{join}{where}", params).fetchone()[0]
+        finally:
+            conn.close()
+
+    # Jointure des scores pour les lectures par fenêtre : tables de base plutôt que la vue 'scoring',
+    # que SQLite matérialise entièrement à droite d'un LEFT JOIN (coût O(N) à chaque bloc)
+    WINDOW_JOIN = """
+        FROM clients c
+        LEFT JOIN scoring_base s ON c.id_client = s.id_client
+        LEFT JOIN dim_risque k ON k.id = s.risque_id
+    """
+
+    @profiled
+    def get_client_bookmarks(self, step, region=None, risque=None, recherche=None, cancel=None):
+        """
+        Index clairsemé des clients filtrés (même tri que get_all_clients) : (total, ids) où
+        ids[k] est l'id_client de la ligne k * step. Un seul parcours des id (comme count_clients) ;
+        get_clients_window(start=ids[k]) saute ensuite directement au bloc k.
+        """
+        conn = self.connect(cancel)
+        conn.row_factory = None
+        where, params = self._client_filters(region, risque, recherche, risque_column="k.libelle")
+        join = self.WINDOW_JOIN if risque and risque != "Tous" else " FROM clients c"
+        total, ids = 0, []
+        try:
+            cur = conn.execute(f"SELECT c.id_client {join}{where} ORDER BY c.id_client DESC", params)
+            while True:
+                block = cur.fetchmany(step)
+                if not block:
+                    break
+                ids.append(block[0][0])
+                total += len(block)
+        finally:
+            conn.close()
+        return total, ids
+
+    @profiled
+    def get_clients_window(self, offset, limit, region=None, risque=None, recherche=None, start=None, cancel=None):
+        """
+        Fenêtre de clients (même tri que get_all_clients) pour les grilles virtualisées :
+        seules les lignes affichables sont lues.
+        start : id_client de départ (inclus, voir get_client_bookmarks) ; la lecture part alors
+        de ce client par la clé primaire (coût indépendant de la position) et 'offset' compte à partir de lui.
+        """
+        conn = self.connect(cancel)
+        conn.row_factory = None
+        where, params = self._client_filters(region, risque, recherche, risque_column="k.libelle")
+        if start is not None:
+            where += " AND c.id_client <= ?"
+            params.append(start)
+        query = ("SELECT c.*, s.score_final as score, k.libelle as niveau_risque" + self.WINDOW_JOIN
+                 + where + " ORDER BY c.id_client DESC LIMIT ? OFFSET ?")
+
+        try:
+            return ClientRecord.from_cursor(conn.execute(query, params + [limit, offset]))
+        finally:
+            conn.close()
+
+    def iter_clients(self, batch_size=10000, region=None, risque=None, recherche=None, cancel=None, tuples=False):
+        """
+        Parcourt les clients (mêmes colonnes et tri que get_all_clients) par lots de
+        'batch_size' lignes sqlite3.Row : mémoire bornée quel que soit le volume (exports, rapports).
+        tuples=True : lignes en tuples simples (plus rapide pour les exports, colonnes de _export_columns).
+        """
+        conn = self.connect(cancel)
+        if tuples:
+            conn.row_factory = None
+        where, params = self._client_filters(region, risque, recherche)
+        query = """
+        SELECT c.*, s.score_final as score, s.niveau_risque 
+        FROM clients c 
+        LEFT JOIN scoring s ON c.id_client = s.id_client
+        """ + where + " ORDER BY c.id_client DESC"
+
+        try:
+            cur = conn.execute(query, params)
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            conn.close()
+
+    @profiled
+    def sample_clients(self, limit=5000):
+        """Échantillon aléatoire borné (entraînement des modèles sans charger toute la base)."""
+        conn = self.connect()
+        conn.row_factory = None
+        query = """
+        SELECT c.*, s.score_final as score, s.niveau_risque 
+        FROM clients c 
+        LEFT JOIN scoring s ON c.id_client = s.id_client
+        WHERE c.id_client IN (SELECT id_client FROM clients ORDER BY RANDOM() LIMIT ?)
+        """
+        clients = ClientRecord.from_cursor(conn.execute(query, (limit,)))
+        conn.close()
+        return clients
+
+    # Colonnes numériques autorisées pour les nuages de points (noms insérés dans le SQL)
+    SCATTER_COLUMNS = ("age", "revenu", "solde", "anciennete")
+
+    @profiled
+    def get_scatter_points(self, x_col="age", y_col="solde", budget=2000, density_threshold=200000, bins=40):
+        """
+        Nuage de points réduit côté SQL (mêmes stratégies que core.downsampling.reduce_scatter) :
+        tout si le budget suffit, sinon un échantillon aléatoire, et au-delà de density_threshold
+        une grille bins x bins agrégée par GROUP BY (au plus bins² lignes lues).
+        """
+        if x_col not in self.SCATTER_COLUMNS or y_col not in self.SCATTER_COLUMNS:
+            raise ValueError(f"Colonnes non autorisées : {x_col}, {y_col}")
+        import numpy as np
+        from core.downsampling import density_result
+
+        where = f"WHERE {x_col} IS NOT NULL AND {y_col} IS NOT NULL"
+        conn = self.connect()
+        try:
+            total, x0, x1, y0, y1 = conn.execute(
+                f"SELECT COUNT(*), MIN({x_col}), MAX({x_col}), MIN({y_col}), MAX({y_col}) FROM clients {where}"
+            ).fetchone()
+
+            if total > density_threshold:
+                # Largeur de case (1 si la colonne est constante)
+                wx = (x1 - x0) / bins or 1
+                wy = (y1 - y0) / bins or 1
+                cells = conn.execute(f"""
+                    SELECT MIN(CAST(({x_col} - :x0) / :wx AS INTEGER), :last) AS i,
+                           MIN(CAST(({y_col} - :y0) / :wy AS INTEGER), :last) AS j,
+                           COUNT(*)
+                    FROM clients {where}
+                    GROUP BY i, j
+                """, {"x0": x0, "wx": wx, "y0": y0, "wy": wy, "last": bins - 1}).fetchall()
+                counts = np.zeros((bins, bins))
+                for i, j, c in cells:
+                    counts[i, j] = c
+                return density_result(counts, x0 + wx * np.arange(bins + 1), y0 + wy * np.arange(bins + 1), total)
+
+            sample = ""
+            if total > budget:
+                sample = f" ORDER BY RANDOM() LIMIT {int(budget)}"
+            rows = conn.execute(f"SELECT {x_col}, {y_col} FROM clients {where}{sample}").fetchall()
+        finally:
+            conn.close()
+
+        x = np.array([r[0] for r in rows], dtype=float)
+        y = np.array([r[1] for r in rows], dtype=float)
+        if total > budget:
+            label = f"Échantillon {len(x):,} / {total:,} pts".replace(",", " ")
+            return {"strategy": "echantillon", "label": label, "total": total, "x": x, "y": y}
+        return {"strategy": "complet", "label": f"{total:,} pts".replace(",", " "), "total": total, "x": x, "y": y}
+
+    @profiled
     def add_client(self, data):
         """Ajoute un client via un dictionnaire (depuis le formulaire GUI)."""
         conn = self.connect()
         try:
-            conn.execute("""
-                INSERT INTO clients (nom, age, region, revenu, segment, solde, sexe, anciennete)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (data['nom'], data['age'], data.get('region'), data.get('revenu', 0), 
-                  data.get('segment', 'Standard'), data.get('solde', 0), 
-                  data.get('sexe', 'M'), data.get('anciennete', 0)))
+            labels = {"region": data.get('region'), "segment": data.get('segment', 'Standard'),
+                      "sexe": data.get('sexe', 'M')}
+            codes = {col: self.dimension_codes(conn, col, [v]).get(v) for col, v in labels.items()}
+            # Écriture directe dans la table (lastrowid n'est pas fiable à travers la vue)
+            cur = conn.execute("""
+                INSERT INTO clients_base (nom, age, region_id, revenu, segment_id, solde, sexe_id, anciennete, solde_ouverture)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (data['nom'], data['age'], codes['region'], data.get('revenu', 0), 
+                  codes['segment'], data.get('solde', 0), 
+                  codes['sexe'], data.get('anciennete', 0), data.get('solde', 0)))
             conn.commit()
+            self.publish(("clients",), [cur.lastrowid])
         except Exception as e:
             print(f"Erreur SQL lors de l'ajout: {e}")
         finally:
             conn.close()
 
+    @profiled
     def update_client(self, id_client, data):
         """Met à jour un client dynamiquement."""
         conn = self.connect()
@@ -139,20 +1035,24 @@ class DataManager:
         try:
             conn.execute(f"UPDATE clients SET {fields} WHERE id_client=?", values)
             conn.commit()
+            self.publish(("clients",), [id_client])
         except Exception as e:
             print(f"Erreur SQL lors de la mise à jour: {e}")
         finally:
             conn.close()
 
+    @profiled
     def delete_client(self, id_client):
         """Supprime un client (cascade sur score et transactions)."""
         conn = self.connect()
-        conn.execute("DELETE FROM clients WHERE id_client=?", (id_client,))
+        conn.execute("DELETE FROM clients_base WHERE id_client=?", (id_client,))
         conn.commit()
         conn.close()
+        self.publish(("clients", "scoring", "transactions"), [id_client])
         
     # --- IMPORT / EXPORT (Gestion de fichiers) ---
 
+    @profiled
     def import_dataframe(self, df):
         """
         Import optimisé pour le module de nettoyage (DataCleaner).
@@ -160,25 +1060,106 @@ class DataManager:
         """
         conn = self.connect()
         try:
+            # Libellés -> codes (sans effet si le DataFrame est déjà codé par DataCleaner)
+            df = self.encode_dimensions(df, conn)
             # if_exists='append' : ajoute à la suite sans supprimer l'existant
-            df.to_sql('clients', conn, if_exists='append', index=False)
+            df.to_sql('clients_base', conn, if_exists='append', index=False)
+            # Le solde importé sert de solde d'ouverture (référence de la réconciliation)
+            conn.execute("UPDATE clients_base SET solde_ouverture = solde WHERE solde_ouverture IS NULL")
             conn.commit()
+            self.publish(("clients",))
         except Exception as e:
             print(f"Erreur lors de l'import Pandas: {e}")
         finally:
             conn.close()
 
+    # --- EXPORT EN FLUX (CSV, CSV.GZ, PARQUET, FEATHER) ---
+
+    # En-têtes lisibles des exports CSV (destinés à Excel) ; Parquet/Feather gardent les noms bruts
+    EXPORT_LABELS = {
+        "id_client": "ID", "nom": "Nom Complet", "age": "Âge",
+        "region": "Région", "solde": "Solde (€)",
+        "score": "Score Crédit", "niveau_risque": "Risque"
+    }
+    EXPORT_FORMATS = (".csv", ".csv.gz", ".parquet", ".feather")
+    ARROW_TYPES = {"INTEGER": "int64", "REAL": "float64"} # Le reste est exporté en texte
+
+    @profiled
+    def export_clients(self, filepath, region=None, risque=None, recherche=None,
+                       batch_size=50000, progress=None, cancel=None):
+        """
+        Export en flux des clients filtrés, format déduit de l'extension (EXPORT_FORMATS) :
+        - .csv / .csv.gz : séparateur ';' et UTF-8 BOM (compatible Excel FR) ;
+        - .parquet / .feather : colonnes typées pour l'analyse (nécessite pyarrow).
+        Le curseur est lu par lots de 'batch_size' : mémoire bornée quel que soit le volume.
+        progress(lignes écrites) est appelé après chaque lot. Retourne le nombre de lignes.
+        """
+        batches = self.iter_clients(batch_size, region, risque, recherche, cancel, tuples=True)
+        if filepath.endswith((".parquet", ".feather")):
+            return self._export_arrow(filepath, batches, progress)
+        return self._export_csv(filepath, batches, progress)
+
+    def _export_columns(self):
+        """(nom, type SQLite) des colonnes exportées : clients.* puis score et niveau de risque."""
+        conn = self.connect()
+        try:
+            columns = [(row['name'], row['type']) for row in conn.execute("PRAGMA table_info(clients)")]
+        finally:
+            conn.close()
+        return columns + [("score", "REAL"), ("niveau_risque", "TEXT")]
+
+    def _export_csv(self, filepath, batches, progress):
+        header = [self.EXPORT_LABELS.get(name, name) for name, _ in self._export_columns()]
+        if filepath.endswith(".gz"):
+            f = gzip.open(filepath, 'wt', compresslevel=6, newline='', encoding='utf-8-sig')
+        else:
+            f = open(filepath, 'w', newline='', encoding='utf-8-sig')
+
+        written = 0
+        with f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(header)
+            for batch in batches:
+                writer.writerows(batch)
+                written += len(batch)
+                if progress:
+                    progress(written)
+        return written
+
+    def _export_arrow(self, filepath, batches, progress):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("Export Parquet/Feather indisponible : installez pyarrow") from None
+
+        schema = pa.schema([(name, self.ARROW_TYPES.get(sql_type.upper(), "string"))
+                            for name, sql_type in self._export_columns()])
+        if filepath.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(filepath, schema, compression="snappy")
+        else:
+            # Feather v2 = format de fichier Arrow IPC
+            writer = pa.ipc.new_file(filepath, schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+
+        written = 0
+        with writer:
+            for batch in batches:
+                arrays = []
+                for field, values in zip(schema, zip(*batch)):
+                    try:
+                        arrays.append(pa.array(values, type=field.type))
+                    except (pa.ArrowInvalid, pa.ArrowTypeError):
+                        # Affinité SQLite souple (ex : un réel dans une colonne INTEGER)
+                        arrays.append(pa.array(values).cast(field.type, safe=False))
+                writer.write_batch(pa.record_batch(arrays, schema=schema))
+                written += len(batch)
+                if progress:
+                    progress(written)
+        return written
+
     def exporter_csv(self, filepath="export_clients.csv"):
-        """Export simple pour l'utilisateur."""
-        clients = self.get_all_clients()
-        if not clients:
-            return
-            
-        keys = clients[0].keys()
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            dict_writer = csv.DictWriter(f, keys)
-            dict_writer.writeheader()
-            dict_writer.writerows(clients)
+        """Export simple pour l'utilisateur (en flux, voir export_clients)."""
+        return self.export_clients(filepath)
 
     # Fonction d'Export CSV Amélioré
 
@@ -192,6 +1173,8 @@ class DataManager:
             
         try:
             # Conversion en Pandas DataFrame pour un export robuste
+            # (import différé : pandas n'est chargé qu'au premier export, pas au démarrage)
+            import pandas as pd
             df = pd.DataFrame(data_list)
             
             # Renommage des colonnes pour une meilleure lisibilité
@@ -209,28 +1192,60 @@ class DataManager:
             print(f"Erreur Export: {e}")
             return False        
 
-    def clear_all(self):
+    @profiled
+    def clear_all(self, compact=False):
         """
-        Supprime toutes les données des tables (utilisé pour recharger une nouvelle dataset).
-        Cette méthode supprime explicitement les enregistrements puis exécute VACUUM.
+        Supprime toutes les données (utilisé pour recharger une nouvelle dataset).
+        Remise à zéro rapide : une base vide est construite en mémoire (même schéma, nouvelle
+        époque) puis recopiée sur le fichier par l'API de sauvegarde SQLite, qui le tronque.
+        Le coût ne dépend pas de la taille de la base (pas de DELETE ligne à ligne à travers
+        les triggers, pas de VACUUM) et passe par les verrous SQLite : les autres connexions
+        restent valides et voient une base vide.
+        compact=True : VACUUM complet ensuite (inutile en général, le fichier est déjà réduit).
         """
+        self.close() # Écritures groupées en attente appliquées avant la remise à zéro
+        blank = sqlite3.connect(":memory:")
         conn = self.connect()
-        cur = conn.cursor()
         try:
-            # Suppression explicite. ON DELETE CASCADE gère les dépendances.
-            cur.execute("DELETE FROM scoring")
-            cur.execute("DELETE FROM transactions")
-            cur.execute("DELETE FROM clients")
-            conn.commit()
-            cur.execute("VACUUM")
-            conn.commit()
+            blank.row_factory = sqlite3.Row
+            blank.execute(f"PRAGMA page_size = {conn.execute('PRAGMA page_size').fetchone()[0]}")
+            self.creer_tables(blank)
+            blank.backup(conn)
+            # Le WAL contient la copie : on la reporte dans le fichier et on remet le journal à zéro
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if compact:
+                self.compact(conn)
+            self.publish(("clients", "scoring", "transactions"))
         except Exception as e:
             print(f"Erreur lors du vidage de la BDD: {e}")
         finally:
             conn.close()
+            blank.close()
+
+    def compact(self, conn=None, pages=None):
+        """
+        Rend au système l'espace libre du fichier. Base en auto_vacuum INCREMENTAL : au plus
+        'pages' pages (toutes si None) par PRAGMA incremental_vacuum, interruptible et à
+        lancer en tâche de fond ; ancienne base sans auto_vacuum : VACUUM complet.
+        Retourne le nombre de pages libres restantes.
+        """
+        own = conn is None
+        if own:
+            conn = self.connect()
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages or 0)})").fetchall()
+            else:
+                conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            if own:
+                conn.close()
 
     # --- GESTION DES TRANSACTIONS  ---
 
+    @profiled
     def get_all_transactions(self, search_query=None):
         """
         Récupère l'historique complet avec le NOM du client (Jointure).
@@ -255,14 +1270,64 @@ class DataManager:
         conn.close()
         return txs
 
+    @profiled
+    def get_transactions_page(self, search_query=None, before=None, limit=50, cancel=None):
+        """
+        Page de l'historique (plus récent en premier) pour un affichage progressif.
+        'before' = (date_trans, id_trans) de la dernière ligne déjà affichée : pagination par
+        curseur, le coût ne dépend pas de la profondeur de défilement.
+        """
+        conn = self.connect(cancel)
+        query = """
+            SELECT t.id_trans, t.montant, t.date_trans, c.nom, c.id_client
+            FROM transactions t
+            JOIN clients c ON t.id_client = c.id_client
+            WHERE 1=1
+        """
+        params = []
+
+        if search_query:
+            query += " AND LOWER(c.nom) LIKE ?"
+            params.append(f"%{search_query.lower()}%")
+
+        if before:
+            query += " AND (t.date_trans, t.id_trans) < (?, ?)"
+            params.extend(before)
+
+        query += " ORDER BY t.date_trans DESC, t.id_trans DESC LIMIT ?"
+        params.append(limit)
+
+        try:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+        finally:
+            conn.close()
+
+    @profiled
+    def get_transactions_totals(self, search_query=None, cancel=None):
+        """Nombre de transactions et volume absolu échangé, calculés par SQL."""
+        conn = self.connect(cancel)
+        query = "SELECT COUNT(*) AS nb, COALESCE(SUM(ABS(t.montant)), 0) AS volume FROM transactions t"
+        params = []
+
+        if search_query:
+            query += " JOIN clients c ON t.id_client = c.id_client WHERE LOWER(c.nom) LIKE ?"
+            params.append(f"%{search_query.lower()}%")
+
+        try:
+            return dict(conn.execute(query, params).fetchone())
+        finally:
+            conn.close()
+
+    @profiled
     def add_transaction(self, id_client, montant, date_trans):
         """
         Ajoute une transaction ET met à jour le solde du client (Trigger logiciel).
+        Retourne l'id de la transaction (None en cas d'erreur).
         """
         conn = self.connect()
         try:
             # 1. Enregistrer la transaction
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO transactions (id_client, montant, date_trans)
                 VALUES (?, ?, ?)
             """, (id_client, montant, date_trans))
@@ -270,15 +1335,566 @@ class DataManager:
             # 2. Mettre à jour le solde du client (Cohérence des données)
             # Solde = Solde Actuel + Montant (Si montant négatif, le solde baisse)
             conn.execute("""
-                UPDATE clients 
+                UPDATE clients_base 
                 SET solde = solde + ? 
                 WHERE id_client = ?
             """, (montant, id_client))
             
             conn.commit()
             print(f"Transaction de {montant}€ enregistrée pour client {id_client}.")
+            self.publish(("transactions", "clients"), [id_client])
+            return cur.lastrowid
         except Exception as e:
             print(f"Erreur Transaction: {e}")
             conn.rollback() # Annule tout si erreur
+            return None
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    @profiled
+    def add_transactions_bulk(self, transactions, batch_size=50000):
+        """
+        Import massif de transactions (relevés, activité carte d'une journée...).
+        Accepte un DataFrame (id_client, montant, date_trans) ou tout itérable de tuples.
+
+        1. Les lignes sont chargées par lots dans une table temporaire (executemany).
+        2. Un seul INSERT ... SELECT les verse dans le grand livre (clients inconnus rejetés).
+        3. Un seul UPDATE groupé applique la variation de solde de chaque client.
+        Le tout dans UNE transaction : soit tout le fichier passe, soit rien.
+
+        Retourne (nb_inserees, nb_rejetees) ; en cas d'erreur SQL, rien n'est écrit et
+        l'erreur est levée (l'appelant ne doit pas annoncer un import réussi).
+        """
+        if hasattr(transactions, 'itertuples'):
+            transactions = transactions[['id_client', 'montant', 'date_trans']].itertuples(index=False, name=None)
+
+        conn = self.connect()
+        try:
+            conn.execute("""
+                CREATE TEMP TABLE staging_transactions (
+                    id_client INTEGER, montant REAL, date_trans DATE
+                )""")
+
+            # 1. Chargement par lots (mémoire bornée, même pour des millions de lignes)
+            batch = []
+            for row in transactions:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    conn.executemany("INSERT INTO staging_transactions VALUES (?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                conn.executemany("INSERT INTO staging_transactions VALUES (?, ?, ?)", batch)
+
+            total = conn.execute("SELECT COUNT(*) FROM staging_transactions").fetchone()[0]
+
+            # 2. Versement dans le grand livre (la jointure écarte les clients inexistants)
+            cur = conn.execute("""
+                INSERT INTO transactions (id_client, montant, date_trans)
+                SELECT s.id_client, s.montant, s.date_trans
+                FROM staging_transactions s
+                JOIN clients_base c ON c.id_client = s.id_client
+                ORDER BY s.rowid
+            """)
+            inserted = cur.rowcount
+
+            # 3. Mise à jour ensembliste des soldes : une ligne par client, pas par transaction
+            conn.execute("""
+                UPDATE clients_base
+                SET solde = COALESCE(solde, 0) + delta.total
+                FROM (
+                    SELECT id_client, SUM(montant) AS total
+                    FROM staging_transactions
+                    GROUP BY id_client
+                ) AS delta
+                WHERE clients_base.id_client = delta.id_client
+            """)
+
+            conn.commit()
+            print(f"Import transactions : {inserted} enregistrées, {total - inserted} rejetées.")
+            if inserted:
+                self.publish(("transactions", "clients"))
+            return inserted, total - inserted
+        except Exception as e:
+            print(f"Erreur Import Transactions: {e}")
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # --- ÉCRITURE GROUPÉE (GROUP COMMIT) ---
+
+    def submit_transaction(self, id_client, montant, date_trans):
+        """
+        Version haut débit de add_transaction pour la saisie en rafale.
+        La transaction est confiée au thread écrivain, qui regroupe les demandes
+        en un seul COMMIT (un seul fsync) toutes les quelques millisecondes.
+
+        Retourne un Future : result() donne l'id de la transaction une fois durable,
+        ou lève l'erreur SQL propre à CETTE transaction (les autres du lot sont conservées).
+        """
+        future = Future()
+        with self._writer_lock:
+            if self._closing:
+                # Arrêt en cours : la file n'est plus lue après la sentinelle
+                future.set_exception(RuntimeError("Écriture groupée en cours d'arrêt"))
+                return future
+            self._start_writer()
+            self._write_queue.put((id_client, montant, date_trans, future))
+        return future
+
+    def close(self):
+        """
+        Vide la file d'écriture puis arrête le thread écrivain (à appeler en quittant).
+        Les soumissions concurrentes sont refusées pendant l'arrêt ; une soumission ultérieure
+        redémarre l'écrivain (ex : après clear_all).
+        """
+        with self._writer_lock:
+            writer = self._writer
+            if writer is None or not writer.is_alive():
+                self._writer = None
+                return
+            self._closing = True
+            self._write_queue.put(None)
+        try:
+            writer.join()
+        finally:
+            with self._writer_lock:
+                self._closing = False
+                self._writer = None
+
+    def _start_writer(self):
+        """Démarre le thread écrivain s'il ne tourne pas (appelant : détient _writer_lock)."""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writer_loop, name="DataManager-writer", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        batch = []
+        conn = None
+        try:
+            conn = self.connect()
+            conn.isolation_level = None # Contrôle manuel de BEGIN / SAVEPOINT / COMMIT
+            stop = False
+            while not stop:
+                batch = []
+                item = self._write_queue.get()
+                if item is None:
+                    break
+
+                # On accumule jusqu'à N lignes ou jusqu'à l'échéance du lot
+                batch = [item]
+                deadline = time.monotonic() + self.group_commit_delay
+                while len(batch) < self.group_commit_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._write_queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._commit_batch(conn, batch)
+        except BaseException as e:
+            # Écrivain perdu : aucun Future ne doit rester en attente (lot en cours + file)
+            print(f"Erreur écrivain groupé: {e}")
+            with self._writer_lock:
+                pending = [item[-1] for item in batch]
+                while True:
+                    try:
+                        item = self._write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        pending.append(item[-1])
+                for future in pending:
+                    self._fail(future, e)
+                if self._writer is threading.current_thread():
+                    self._writer = None # Prochaine soumission : nouvel écrivain
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if conn is not None:
+                try:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                finally:
+                    conn.close()
+
+    @staticmethod
+    def _fail(future, error):
+        """Échec d'un Future encore en attente (sans effet s'il est déjà terminé ou annulé)."""
+        try:
+            if not future.done():
+                future.set_exception(error)
+        except InvalidStateError:
+            pass # Annulé par l'appelant entre-temps
+
+    def _commit_batch(self, conn, batch):
+        """Écrit un lot dans UNE transaction SQL, chaque opération isolée par un SAVEPOINT."""
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            for *_, future in batch:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        written = set() # Clients touchés (pour le bus de changements)
+        for id_client, montant, date_trans, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue # Annulée par l'appelant avant écriture
+
+            conn.execute("SAVEPOINT tx")
+            try:
+                # Même logique que add_transaction : mouvement + solde, ou rien
+                cur = conn.execute("""
+                    INSERT INTO transactions (id_client, montant, date_trans)
+                    VALUES (?, ?, ?)
+                """, (id_client, montant, date_trans))
+                conn.execute("UPDATE clients_base SET solde = solde + ? WHERE id_client = ?", (montant, id_client))
+                conn.execute("RELEASE tx")
+                done.append((future, cur.lastrowid))
+                written.add(id_client)
+            except Exception as e:
+                conn.execute("ROLLBACK TO tx") # Annule uniquement cette transaction
+                conn.execute("RELEASE tx")
+                future.set_exception(e)
+
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            print(f"Erreur COMMIT groupé: {e}")
+            conn.execute("ROLLBACK")
+            for future, _ in done:
+                future.set_exception(e)
+            return
+
+        if written:
+            self.publish(("transactions", "clients"), written)
+        for future, id_trans in done:
+            future.set_result(id_trans)
+
+    # --- AGRÉGATS TEMPORELS (ROLLUPS) ---
+
+    @profiled
+    def refresh_rollups(self):
+        """
+        Met à jour rollup_jour et rollup_mois avec les seules transactions nouvelles
+        (id_trans au-delà du dernier curseur). Les volumes sont attribués à la région et au
+        segment actuels du client (un changement déplace son historique, voir _creer_triggers_rollup).
+        Retourne le nombre de transactions agrégées.
+        """
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            watermark = int(self.get_meta(conn, "rollup_dernier_id_trans", 0))
+            last_id = conn.execute("SELECT COALESCE(MAX(id_trans), 0) FROM transactions").fetchone()[0]
+            if last_id <= watermark:
+                conn.rollback()
+                return 0
+
+            # Région / segment absents : libellés par défaut (codés comme les autres)
+            inconnue = self.dimension_codes(conn, "region", ["Inconnue"])["Inconnue"]
+            standard = self.dimension_codes(conn, "segment", ["Standard"])["Standard"]
+
+            # Delta journalier calculé une seule fois, puis reporté sur les deux granularités
+            conn.execute("""
+                CREATE TEMP TABLE rollup_delta AS
+                SELECT t.date_trans AS jour,
+                       COALESCE(c.region_id, ?) AS region_id,
+                       COALESCE(c.segment_id, ?) AS segment_id,
+                       COUNT(*) AS nb,
+                       SUM(CASE WHEN t.montant > 0 THEN t.montant ELSE 0 END) AS entrees,
+                       SUM(CASE WHEN t.montant < 0 THEN -t.montant ELSE 0 END) AS sorties,
+                       SUM(t.montant) AS net
+                FROM transactions t
+                JOIN clients_base c ON c.id_client = t.id_client
+                WHERE t.id_trans > ? AND t.id_trans <= ?
+                GROUP BY 1, 2, 3
+            """, (inconnue, standard, watermark, last_id))
+            nb_new = conn.execute("SELECT COALESCE(SUM(nb), 0) FROM rollup_delta").fetchone()[0]
+
+            upsert = """
+                ON CONFLICT DO UPDATE SET
+                    nb = nb + excluded.nb,
+                    entrees = entrees + excluded.entrees,
+                    sorties = sorties + excluded.sorties,
+                    net = net + excluded.net
+            """
+            conn.execute(f"""
+                INSERT INTO rollup_jour (jour, region_id, segment_id, nb, entrees, sorties, net)
+                SELECT jour, region_id, segment_id, nb, entrees, sorties, net FROM rollup_delta WHERE true
+                {upsert}
+            """)
+            conn.execute(f"""
+                INSERT INTO rollup_mois (mois, region_id, segment_id, nb, entrees, sorties, net)
+                SELECT substr(jour, 1, 7), region_id, segment_id, SUM(nb), SUM(entrees), SUM(sorties), SUM(net)
+                FROM rollup_delta
+                GROUP BY 1, 2, 3
+                {upsert}
+            """)
+            conn.execute("DROP TABLE rollup_delta")
+
+            self.set_meta(conn, "rollup_dernier_id_trans", last_id)
+            conn.commit()
+            return nb_new
+        except Exception as e:
+            conn.rollback()
+            print(f"Erreur Rollups: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    @profiled
+    def get_monthly_flows(self, months=12, region=None, segment=None):
+        """
+        Flux mensuels (nb, entrées, sorties, net) des 'months' derniers mois d'activité,
+        lus dans rollup_mois : coût constant quelle que soit la taille du grand livre.
+        Les mois sans activité sont présents avec des valeurs nulles.
+        """
+        self.refresh_rollups()
+
+        conn = self.connect()
+        try:
+            last = conn.execute("SELECT MAX(mois) FROM rollup_mois").fetchone()[0]
+            if not last:
+                return []
+
+            # Fenêtre glissante de N mois se terminant au dernier mois d'activité
+            year, month = int(last[:4]), int(last[5:7])
+            window = []
+            for _ in range(months):
+                window.append(f"{year:04d}-{month:02d}")
+                year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+            window.reverse()
+
+            query = """
+                SELECT mois, SUM(nb) AS nb, SUM(entrees) AS entrees, SUM(sorties) AS sorties, SUM(net) AS net
+                FROM rollup_mois
+                WHERE mois >= ?
+            """
+            params = [window[0]]
+            if region and region != "Toutes":
+                query += " AND region_id = (SELECT id FROM dim_region WHERE libelle = ?)"
+                params.append(region)
+            if segment and segment != "Tous":
+                query += " AND segment_id = (SELECT id FROM dim_segment WHERE libelle = ?)"
+                params.append(segment)
+            query += " GROUP BY mois"
+
+            found = {row['mois']: dict(row) for row in conn.execute(query, params).fetchall()}
+            empty = {"nb": 0, "entrees": 0.0, "sorties": 0.0, "net": 0.0}
+            return [found.get(m, dict(empty, mois=m)) for m in window]
+        finally:
+            conn.close()
+
+    # --- SOLDES HISTORIQUES (POINTS DE CONTRÔLE) ---
+
+    @profiled
+    def refresh_balance_checkpoints(self, interval=None):
+        """
+        Maintient la table 'solde_checkpoints' de façon incrémentale.
+        Pour chaque fin de période révolue (jour, semaine, mois, trimestre), on stocke le cumul
+        des mouvements des seuls clients ayant bougé dans la période : checkpoint = dernier
+        checkpoint du client + mouvements de la période. Le volume est donc proportionnel à
+        l'activité, pas à clients x périodes ; les périodes sans mouvement sont sautées.
+        'checkpoint_fin' (meta) est la dernière fin de période traitée : tout mouvement
+        antérieur ou égal est couvert par le dernier checkpoint de son client.
+
+        Seules les nouvelles transactions sont examinées. Une transaction antidatée (date déjà
+        couverte) invalide les checkpoints à partir de sa période.
+
+        interval : nouvelle périodicité (les checkpoints sont alors recalculés). Par défaut, la
+        périodicité déjà enregistrée en base est conservée ; self.checkpoint_interval ne sert
+        qu'à la première construction.
+        Retourne le nombre de périodes ajoutées.
+        """
+        if interval is not None and interval not in self.CHECKPOINT_INTERVALS:
+            raise ValueError(f"Périodicité inconnue : {interval}")
+
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = self.get_meta(conn, "checkpoint_intervalle")
+            interval = interval or stored or self.checkpoint_interval
+            fin = self.get_meta(conn, "checkpoint_fin")
+
+            # Changement de périodicité (demandé explicitement), ou checkpoints d'un format
+            # antérieur (un par client et par période, sans 'checkpoint_fin') : on repart de zéro
+            if stored != interval or fin is None:
+                conn.execute("DELETE FROM solde_checkpoints")
+                self.set_meta(conn, "checkpoint_intervalle", interval)
+                self.set_meta(conn, "checkpoint_dernier_id_trans", 0)
+                fin = ''
+
+            watermark = int(self.get_meta(conn, "checkpoint_dernier_id_trans", 0))
+            last_id, first_new = conn.execute("""
+                SELECT MAX(id_trans), MIN(date_trans) FROM transactions WHERE id_trans > ?
+            """, (watermark,)).fetchone()
+
+            # Invalidation des checkpoints rendus faux par des transactions antidatées
+            if first_new and first_new <= fin:
+                conn.execute("DELETE FROM solde_checkpoints WHERE date_checkpoint >= ?", (first_new,))
+                fin = self._fin_precedente(first_new, interval)
+
+            # On ne fige que les périodes entièrement écoulées, en sautant celles sans mouvement
+            today = date.today().isoformat()
+            created = 0
+            while True:
+                nxt = conn.execute("SELECT MIN(date_trans) FROM transactions WHERE date_trans > ?",
+                                   (fin,)).fetchone()[0]
+                if not nxt:
+                    break
+                end = self._fin_de_periode(nxt, interval)
+                if end >= today:
+                    break
+                conn.execute("""
+                    INSERT INTO solde_checkpoints (date_checkpoint, id_client, cumul)
+                    SELECT :end, t.id_client,
+                           COALESCE((SELECT p.cumul FROM solde_checkpoints p
+                                     WHERE p.id_client = t.id_client AND p.date_checkpoint <= :fin
+                                     ORDER BY p.date_checkpoint DESC LIMIT 1), 0) + SUM(t.montant)
+                    FROM transactions t
+                    WHERE t.date_trans > :fin AND t.date_trans <= :end
+                    GROUP BY t.id_client
+                """, {"end": end, "fin": fin})
+                fin = end
+                created += 1
+
+            self.set_meta(conn, "checkpoint_fin", fin)
+            if last_id is not None:
+                self.set_meta(conn, "checkpoint_dernier_id_trans", last_id)
+            conn.commit()
+            return created
+        except Exception as e:
+            conn.rollback()
+            print(f"Erreur Checkpoints: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def _borne_checkpoints(self, conn, as_of):
+        """
+        Lecture seule : (date B, à jour). B est la dernière date couverte par les checkpoints
+        utilisable pour 'as_of' : solde = dernier checkpoint du client <= B + mouvements de ]B, as_of].
+        à jour est faux si refresh_balance_checkpoints a du travail (nouvelles transactions,
+        période révolue non figée) : les lectures ne prennent le verrou d'écriture que dans ce cas.
+        """
+        interval = self.get_meta(conn, "checkpoint_intervalle")
+        fin = self.get_meta(conn, "checkpoint_fin")
+        if interval is None or fin is None:
+            return '', False
+        watermark = int(self.get_meta(conn, "checkpoint_dernier_id_trans", 0))
+        a_jour = conn.execute("SELECT COALESCE(MAX(id_trans), 0) FROM transactions").fetchone()[0] <= watermark
+        if a_jour:
+            nxt = conn.execute("SELECT MIN(date_trans) FROM transactions WHERE date_trans > ?", (fin,)).fetchone()[0]
+            a_jour = not nxt or self._fin_de_periode(nxt, interval) >= date.today().isoformat()
+        borne = as_of if self._fin_de_periode(as_of, interval) == as_of else self._fin_precedente(as_of, interval)
+        return min(fin, borne), a_jour
+
+    def _checkpoints_pour(self, as_of):
+        """Borne B (voir _borne_checkpoints), après mise à jour des checkpoints seulement si nécessaire."""
+        conn = self.connect()
+        try:
+            borne, a_jour = self._borne_checkpoints(conn, as_of)
+        finally:
+            conn.close()
+        if a_jour:
+            return borne
+        self.refresh_balance_checkpoints()
+        conn = self.connect()
+        try:
+            return self._borne_checkpoints(conn, as_of)[0]
+        finally:
+            conn.close()
+
+    @profiled
+    def get_balance_as_of(self, as_of, id_client=None):
+        """
+        Solde à une date passée (incluse) : solde d'ouverture + dernier checkpoint du client
+        + rejeu des seules transactions postérieures à la borne des checkpoints (au plus une période).
+        - id_client donné : retourne le solde (float) de ce client, ou None s'il n'existe pas.
+        - sinon : retourne {id_client: solde} pour tous les clients.
+        """
+        as_of = str(as_of)[:10]
+        borne = self._checkpoints_pour(as_of)
+
+        conn = self.connect()
+        try:
+            if id_client is not None:
+                row = conn.execute("""
+                    SELECT COALESCE(c.solde_ouverture, 0)
+                         + COALESCE((SELECT cumul FROM solde_checkpoints
+                                     WHERE id_client = c.id_client AND date_checkpoint <= :b
+                                     ORDER BY date_checkpoint DESC LIMIT 1), 0)
+                         + COALESCE((SELECT SUM(montant) FROM transactions
+                                     WHERE id_client = c.id_client AND date_trans > :b AND date_trans <= :d), 0)
+                    FROM clients_base c WHERE c.id_client = :id
+                """, {"b": borne, "d": as_of, "id": id_client}).fetchone()
+                return row[0] if row else None
+
+            rows = conn.execute("""
+                SELECT c.id_client,
+                       COALESCE(c.solde_ouverture, 0) + COALESCE(cp.cumul, 0) + COALESCE(r.delta, 0)
+                FROM clients_base c
+                LEFT JOIN (
+                    SELECT id_client, MAX(date_checkpoint), cumul FROM solde_checkpoints
+                    WHERE date_checkpoint <= :b
+                    GROUP BY id_client
+                ) cp ON cp.id_client = c.id_client
+                LEFT JOIN (
+                    SELECT id_client, SUM(montant) AS delta FROM transactions
+                    WHERE date_trans > :b AND date_trans <= :d
+                    GROUP BY id_client
+                ) r ON r.id_client = c.id_client
+            """, {"b": borne, "d": as_of}).fetchall()
+            return {row[0]: row[1] for row in rows}
+        finally:
+            conn.close()
+
+    @profiled
+    def get_portfolio_balance_as_of(self, as_of):
+        """Encours global à une date passée, sans matérialiser les soldes par client."""
+        as_of = str(as_of)[:10]
+        borne = self._checkpoints_pour(as_of)
+
+        conn = self.connect()
+        try:
+            return conn.execute("""
+                SELECT (SELECT COALESCE(SUM(solde_ouverture), 0) FROM clients_base)
+                     + (SELECT COALESCE(SUM(cumul), 0) FROM (
+                            SELECT MAX(date_checkpoint), cumul FROM solde_checkpoints
+                            WHERE date_checkpoint <= :b GROUP BY id_client))
+                     + (SELECT COALESCE(SUM(montant), 0) FROM transactions
+                        WHERE date_trans > :b AND date_trans <= :d)
+            """, {"b": borne, "d": as_of}).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _fin_de_periode(self, jour, interval):
+        """Dernier jour (AAAA-MM-JJ) de la période contenant 'jour'."""
+        d = datetime.strptime(jour[:10], "%Y-%m-%d").date()
+        if interval == "semaine":
+            d += timedelta(days=6 - d.weekday())
+        elif interval == "mois":
+            d = d.replace(day=calendar.monthrange(d.year, d.month)[1])
+        elif interval == "trimestre":
+            month = ((d.month - 1) // 3 + 1) * 3
+            d = date(d.year, month, calendar.monthrange(d.year, month)[1])
+        return d.isoformat()
+
+    def _fin_precedente(self, jour, interval):
+        """Dernier jour de la période précédant celle qui contient 'jour'."""
+        d = datetime.strptime(jour[:10], "%Y-%m-%d").date()
+        if interval == "semaine":
+            d -= timedelta(days=d.weekday())
+        elif interval == "mois":
+            d = d.replace(day=1)
+        elif interval == "trimestre":
+            d = date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+        return (d - timedelta(days=1)).isoformat()
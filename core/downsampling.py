@@ -0,0 +1,105 @@
+import numpy as np
+
+# Budget de points par défaut : au-delà, le coût de dessin devient sensible
+POINT_BUDGET = 2000
+# Au-delà de ce nombre de points, un échantillon ne montre plus la densité : agrégation 2D
+DENSITY_THRESHOLD = 200000
+
+
+def sample_points(x, y, budget=POINT_BUDGET, strata=None, seed=42):
+    """
+    Échantillon d'au plus 'budget' points.
+    strata (optionnel, même longueur que x) : échantillonnage stratifié, chaque strate
+    gardant sa part de l'effectif (au moins un point) ; sinon tirage aléatoire simple.
+    Le tirage est reproductible (seed) : le nuage ne « danse » pas d'un rafraîchissement à l'autre.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= budget:
+        return x, y
+
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        idx = rng.choice(n, size=budget, replace=False)
+    else:
+        strata = np.asarray(strata)
+        groups, inverse = np.unique(strata, return_inverse=True)
+        picked = []
+        for g in range(len(groups)):
+            members = np.flatnonzero(inverse == g)
+            quota = max(1, int(round(budget * len(members) / n)))
+            picked.append(rng.choice(members, size=min(quota, len(members)), replace=False))
+        idx = np.concatenate(picked)
+    idx.sort() # Ordre d'origine conservé
+    return x[idx], y[idx]
+
+
+def lttb(x, y, threshold=POINT_BUDGET):
+    """
+    Largest-Triangle-Three-Buckets : réduit une série (x croissant) à 'threshold' points
+    en gardant sa forme visuelle (pics et creux). Premier et dernier points conservés.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    # Les points intérieurs sont répartis en threshold - 2 seaux
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Point « moyen » du seau suivant (dernier point pour le dernier seau)
+        nxt_start, nxt_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_start:nxt_end].mean()
+        avg_y = y[nxt_start:nxt_end].mean()
+
+        # Aire du triangle (point retenu précédent, candidat, moyenne suivante)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+
+    return x[keep], y[keep]
+
+
+def histogram_2d(x, y, bins=40):
+    """Agrégation en grille (effectif par case) : coût de dessin fixe quel que soit le volume."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    mask = ~(np.isnan(x) | np.isnan(y))
+    counts, xedges, yedges = np.histogram2d(x[mask], y[mask], bins=bins)
+    return counts, xedges, yedges
+
+
+def reduce_scatter(x, y, budget=POINT_BUDGET, strata=None, density_threshold=DENSITY_THRESHOLD, bins=40):
+    """
+    Choisit la réduction d'un nuage de points selon son volume :
+    - 'complet'    : tout tient dans le budget ;
+    - 'echantillon': échantillon (stratifié si strata) de 'budget' points ;
+    - 'densite'    : histogramme 2D (trop de points pour qu'un échantillon reste lisible).
+    Retourne un dict {strategy, label, total, x, y} ou {strategy, label, total, counts, xedges, yedges}.
+    """
+    total = len(x)
+    if total <= budget:
+        return {"strategy": "complet", "label": f"{total:,} pts".replace(",", " "),
+                "total": total, "x": np.asarray(x, dtype=float), "y": np.asarray(y, dtype=float)}
+
+    if total <= density_threshold:
+        sx, sy = sample_points(x, y, budget, strata)
+        label = f"Échantillon {len(sx):,} / {total:,} pts".replace(",", " ")
+        return {"strategy": "echantillon", "label": label, "total": total, "x": sx, "y": sy}
+
+    return density_result(*histogram_2d(x, y, bins), total)
+
+
+def density_result(counts, xedges, yedges, total):
+    """Résultat 'densite' de reduce_scatter (grille calculée en NumPy ou en SQL)."""
+    bins_x, bins_y = np.shape(counts)
+    label = f"Densité {bins_x}x{bins_y} ({total:,} pts)".replace(",", " ")
+    return {"strategy": "densite", "label": label, "total": total,
+            "counts": counts, "xedges": xedges, "yedges": yedges}
@@ -0,0 +1,285 @@
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+def _normalize(sql):
+    """Forme canonique d'une requête : espaces réduits, listes IN (?, ?, ...) repliées."""
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return re.sub(r"\?(\s*,\s*\?)+", "?, ...", sql)
+
+
+class QueryProfiler:
+    """
+    Instrumentation optionnelle des requêtes SQLite (DataManager.enable_profiling) :
+    - chaque instruction est chronométrée (exécution + lecture des lignes) et ses lignes comptées,
+      agrégées par requête normalisée ;
+    - chaque appel de haut niveau (@profiled : get_all_clients, calculate_all_scores...) cumule
+      durée, allers-retours SQL et lignes des instructions exécutées pendant l'appel (appel le
+      plus interne, par thread) ;
+    - au-delà de slow_ms, l'instruction est journalisée avec son EXPLAIN QUERY PLAN.
+    Résultats : top(), calls(), slow_queries(), to_dict() / dump(chemin JSON).
+    """
+
+    def __init__(self, slow_ms=100, explain=True, max_slow=200):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self._queries = {}   # requête normalisée -> statistiques
+        self._calls = {}     # appel de haut niveau -> statistiques
+        self._slow = deque(maxlen=max_slow)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started = time.time()
+
+    # --- BRANCHEMENT ---
+
+    def connect(self, *args, **kwargs):
+        """sqlite3.connect avec connexion et curseurs instrumentés."""
+        conn = sqlite3.connect(*args, factory=ProfiledConnection, **kwargs)
+        conn.profiler = self
+        return conn
+
+    def call(self, name):
+        """Contexte d'un appel de haut niveau (voir @profiled)."""
+        return _Call(self, name)
+
+    # --- ENREGISTREMENT ---
+
+    def record(self, conn, sql, params, elapsed, rows, many=False):
+        """Instruction terminée : agrégats, appel en cours, journal des requêtes lentes."""
+        ms = elapsed * 1000
+        key = _normalize(sql)
+        stack = getattr(self._local, "stack", None)
+        call = stack[-1] if stack else None
+
+        with self._lock:
+            q = self._queries.get(key)
+            if q is None:
+                q = self._queries[key] = {"sql": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                          "rows": 0, "calls": set()}
+            q["count"] += 1
+            q["total_ms"] += ms
+            q["max_ms"] = max(q["max_ms"], ms)
+            q["rows"] += rows
+            if call is not None:
+                q["calls"].add(call.name)
+                call.statements += 1
+                call.rows += rows
+                call.sql_ms += ms
+
+        if ms >= self.slow_ms:
+            plan = self._plan(conn, sql, params) if self.explain and not many else None
+            with self._lock:
+                self._slow.append({"sql": key, "ms": round(ms, 2), "rows": rows,
+                                   "call": call.name if call else None, "at": time.time(), "plan": plan})
+
+    def _plan(self, conn, sql, params):
+        """EXPLAIN QUERY PLAN sur un curseur non instrumenté (None si non applicable)."""
+        if not re.match(r"\s*(WITH|SELECT|INSERT|UPDATE|DELETE|REPLACE)\b", sql, re.IGNORECASE):
+            return None
+        try:
+            cur = sqlite3.Cursor(conn)
+            return [row[-1] for row in cur.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+        except sqlite3.Error as e:
+            return [f"(plan indisponible : {e})"]
+
+    def _end_call(self, call, elapsed):
+        with self._lock:
+            c = self._calls.get(call.name)
+            if c is None:
+                c = self._calls[call.name] = {"call": call.name, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                              "sql_ms": 0.0, "statements": 0, "rows": 0}
+            ms = elapsed * 1000
+            c["count"] += 1
+            c["total_ms"] += ms
+            c["max_ms"] = max(c["max_ms"], ms)
+            c["sql_ms"] += call.sql_ms
+            c["statements"] += call.statements
+            c["rows"] += call.rows
+
+    # --- RÉSULTATS ---
+
+    def top(self, n=20, key="total_ms"):
+        """Requêtes les plus coûteuses (total_ms, max_ms, count ou rows)."""
+        with self._lock:
+            queries = [dict(q, calls=sorted(q["calls"])) for q in self._queries.values()]
+        for q in queries:
+            q["avg_ms"] = q["total_ms"] / q["count"]
+        return sorted(queries, key=lambda q: q[key], reverse=True)[:n]
+
+    def calls(self, key="total_ms"):
+        """Appels de haut niveau : nombre, durées, allers-retours SQL et lignes lues."""
+        with self._lock:
+            calls = [dict(c) for c in self._calls.values()]
+        return sorted(calls, key=lambda c: c[key], reverse=True)
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._calls.clear()
+            self._slow.clear()
+            self.started = time.time()
+
+    def to_dict(self, n=50):
+        return {"debut": self.started, "fin": time.time(), "seuil_lent_ms": self.slow_ms,
+                "requetes": self.top(n), "appels": self.calls(), "lentes": self.slow_queries()}
+
+    def dump(self, path="profil_requetes.json", n=50):
+        """Écrit le profil (requêtes les plus coûteuses, appels, requêtes lentes) en JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(n), f, ensure_ascii=False, indent=2)
+        return path
+
+
+class _Call:
+    """Appel de haut niveau en cours (pile par thread : les instructions vont au plus interne)."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.statements = 0
+        self.rows = 0
+        self.sql_ms = 0.0
+
+    def __enter__(self):
+        local = self.profiler._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+        local.stack.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._local.stack.pop()
+        self.profiler._end_call(self, time.perf_counter() - self.t0)
+        return False
+
+
+def profiled(method):
+    """
+    Décorateur des appels de haut niveau : mesuré seulement si un profileur est actif
+    (self.profiler pour le DataManager, self.db.profiler pour les autres modules).
+    """
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = getattr(self, "profiler", None) or getattr(getattr(self, "db", None), "profiler", None)
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        with profiler.call(name):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connexion dont les curseurs (y compris ceux de execute / executemany) sont instrumentés."""
+
+    profiler = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfiledCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Curseur chronométré : une instruction court de execute() jusqu'à l'épuisement du résultat
+    (ou l'instruction suivante, ou close) ; les lectures (fetch*, itération) sont comptées.
+    """
+
+    _pending = None # [sql, paramètres, durée cumulée, lignes, executemany]
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        t0 = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, time.perf_counter() - t0, 0, False]
+        if self.description is None:
+            self._finish() # Écriture / DDL : terminée
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        t0 = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = [sql, (), time.perf_counter() - t0, 0, True]
+        self._finish()
+        return self
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._count(t0, row is not None, exhausted=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count(t0, len(rows), exhausted=not rows)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._count(t0, len(rows), exhausted=True)
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._count(t0, 0, exhausted=True)
+            raise
+        self._count(t0, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass # Fin d'interpréteur, autre thread : la mesure est perdue, pas l'appel
+
+    def _count(self, t0, rows, exhausted=False):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - t0
+            pending[3] += rows
+            if exhausted:
+                self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        sql, params, elapsed, rows, many = pending
+        if many or not rows:
+            rows = max(rows, self.rowcount if not self.description else 0)
+        profiler = getattr(self.connection, "profiler", None)
+        if profiler is not None:
+            try:
+                profiler.record(self.connection, sql, params, elapsed, rows, many)
+            except sqlite3.ProgrammingError:
+                pass # Connexion déjà fermée (curseur libéré après close)
@@ -0,0 +1,126 @@
+import argparse
+from core.query_profiler import profiled
+
+
+class BalanceReconciler:
+    """
+    Module de Réconciliation Solde / Grand Livre.
+    Vérifie que chaque solde client = solde d'ouverture + somme de ses transactions.
+
+    Les cumuls par client sont tenus dans la table 'ledger_cumuls' : une exécution
+    incrémentale n'agrège que les transactions postérieures au dernier point de contrôle.
+    Tout le travail est fait en SQL (GROUP BY ensembliste) : la mémoire reste bornée,
+    quelle que soit la taille du grand livre.
+    """
+
+    CHECKPOINT_KEY = "reconciliation_dernier_id_trans"
+
+    def __init__(self, data_manager, tolerance=0.01):
+        self.db = data_manager
+        self.tolerance = tolerance # Écart toléré (arrondis flottants)
+
+    @profiled
+    def run(self, incremental=True, repair=None, max_report=100):
+        """
+        Lance la réconciliation.
+        - incremental : repart du dernier point de contrôle (sinon recalcul complet).
+        - repair : None (rapport seul), 'solde' (le grand livre fait foi, on corrige le solde)
+                   ou 'ouverture' (le solde fait foi, on recale le solde d'ouverture).
+        - max_report : nombre max d'écarts détaillés dans le rapport (les plus gros).
+        """
+        if repair not in (None, 'solde', 'ouverture'):
+            raise ValueError(f"Mode de réparation inconnu : {repair}")
+
+        conn = self.db.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE") # Instantané cohérent du grand livre
+
+            # 1. Mise à jour des cumuls (seulement le delta depuis le point de contrôle)
+            checkpoint = int(self.db.get_meta(conn, self.CHECKPOINT_KEY, 0)) if incremental else 0
+            if checkpoint == 0:
+                conn.execute("DELETE FROM ledger_cumuls")
+
+            last_id = conn.execute("SELECT COALESCE(MAX(id_trans), 0) FROM transactions").fetchone()[0]
+            if last_id > checkpoint:
+                conn.execute("""
+                    INSERT INTO ledger_cumuls (id_client, total)
+                    SELECT id_client, SUM(montant)
+                    FROM transactions
+                    WHERE id_trans > ? AND id_trans <= ?
+                    GROUP BY id_client
+                    ON CONFLICT(id_client) DO UPDATE SET total = total + excluded.total
+                """, (checkpoint, last_id))
+            self.db.set_meta(conn, self.CHECKPOINT_KEY, last_id)
+
+            # 2. Comparaison solde vs ouverture + cumul (une seule passe sur les clients)
+            drift_sql = """
+                SELECT c.id_client, c.nom,
+                       COALESCE(c.solde, 0) AS solde,
+                       COALESCE(c.solde_ouverture, 0) + COALESCE(l.total, 0) AS solde_attendu,
+                       COALESCE(c.solde, 0) - COALESCE(c.solde_ouverture, 0) - COALESCE(l.total, 0) AS ecart
+                FROM clients_base c
+                LEFT JOIN ledger_cumuls l ON l.id_client = c.id_client
+            """
+            nb_clients, nb_ecarts, ecart_total = conn.execute(f"""
+                SELECT COUNT(*),
+                       COALESCE(SUM(ABS(ecart) > :tol), 0),
+                       COALESCE(SUM(CASE WHEN ABS(ecart) > :tol THEN ecart ELSE 0 END), 0)
+                FROM ({drift_sql})
+            """, {"tol": self.tolerance}).fetchone()
+
+            details = [dict(row) for row in conn.execute(f"""
+                SELECT * FROM ({drift_sql})
+                WHERE ABS(ecart) > ?
+                ORDER BY ABS(ecart) DESC
+                LIMIT ?
+            """, (self.tolerance, max_report)).fetchall()]
+
+            # 3. Réparation optionnelle (ensembliste)
+            repaired = 0
+            ledger_total = "COALESCE((SELECT l.total FROM ledger_cumuls l WHERE l.id_client = clients_base.id_client), 0)"
+            drifting = f"ABS(COALESCE(solde, 0) - COALESCE(solde_ouverture, 0) - {ledger_total}) > ?"
+            if repair == 'solde':
+                repaired = conn.execute(f"""
+                    UPDATE clients_base SET solde = COALESCE(solde_ouverture, 0) + {ledger_total}
+                    WHERE {drifting}
+                """, (self.tolerance,)).rowcount
+            elif repair == 'ouverture':
+                repaired = conn.execute(f"""
+                    UPDATE clients_base SET solde_ouverture = COALESCE(solde, 0) - {ledger_total}
+                    WHERE {drifting}
+                """, (self.tolerance,)).rowcount
+
+            conn.commit()
+            if repaired:
+                self.db.publish(("clients",))
+            return {
+                "clients_verifies": nb_clients,
+                "ecarts": nb_ecarts,
+                "ecart_total": ecart_total,
+                "corriges": repaired,
+                "dernier_id_trans": last_id,
+                "details": details
+            }
+        except Exception as e:
+            conn.rollback()
+            print(f"Erreur Réconciliation: {e}")
+            raise
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    # Usage : python -m core.reconciliation [--full] [--repair solde|ouverture]
+    from core.data_manager import DataManager
+
+    parser = argparse.ArgumentParser(description="Réconciliation soldes clients / grand livre")
+    parser.add_argument("--db", default="clients.db")
+    parser.add_argument("--full", action="store_true", help="Recalcul complet (ignore le point de contrôle)")
+    parser.add_argument("--repair", choices=["solde", "ouverture"], default=None)
+    args = parser.parse_args()
+
+    report = BalanceReconciler(DataManager(args.db)).run(incremental=not args.full, repair=args.repair)
+    print(f"{report['clients_verifies']} clients vérifiés, {report['ecarts']} écarts "
+          f"({report['ecart_total']:,.2f} €), {report['corriges']} corrigés.")
+    for d in report['details']:
+        print(f"  #{d['id_client']} {d['nom']} : solde {d['solde']:.2f} / attendu {d['solde_attendu']:.2f}")
@@ -1,5 +1,7 @@
 import math
 from datetime import datetime
+import numpy as np
+from core.query_profiler import profiled
 
 class ScoringModel:
     """
@@ -7,6 +9,9 @@ class ScoringModel:
     Calcule le Risque Client et met à jour la table 'scoring'.
     """
 
+    # Au-delà, les changements sont signalés sans liste d'id (relecture complète plus rapide)
+    CHANGED_IDS_LIMIT = 10000
+
     def __init__(self, data_manager):
         self.db = data_manager
         
@@ -16,44 +21,58 @@ class ScoringModel:
         self.coef_anciennete = 1.2
         self.age_ref = 60
 
+    @profiled
     def calculate_all_scores(self):
         """
         Fonction principale appelée par le Dashboard.
-        Récupère tous les clients, recalcule les scores et met à jour la BDD.
+        Recalcule tous les scores d'un bloc sur les colonnes de l'instantané colonnaire
+        (NumPy, sans objet Python par client) puis met à jour la BDD en deux executemany.
+        Seuls les clients dont le score ou le risque change sont écrits et signalés : un
+        recalcul sans effet ne touche pas la base, un petit changement ne patche que ces lignes
+        de l'instantané et du cache client. Retourne le nombre de scores écrits.
         """
-        clients = self.db.get_all_clients()
+        snapshot = self.db.columnar_snapshot()
+        columns = snapshot.columns()
+        ids = columns.get('id_client')
+        if ids is None or not len(ids):
+            return 0
+
+        # 1. Calcul mathématique (vectorisé)
+        scores = self.compute_scores(columns)
+        risks = self.classify_risks(scores)
+
+        # 2. Diff avec l'instantané : il sait déjà qui a un score, et lequel
+        exists = ~np.isnan(columns['score'])
+        positions = {label: i for i, label in enumerate(snapshot.labels('niveau_risque'))}
+        labels, inverse = np.unique(risks, return_inverse=True)
+        risk_codes = np.array([positions.get(label, -2) for label in labels.tolist()])[inverse]
+        changed = ~exists | (scores != columns['score']) | (risk_codes != columns['niveau_risque'])
+        if not changed.any():
+            return 0
+
+        # 3. Mise à jour BDD (Table 'scoring') des seuls clients changés
         conn = self.db.connect()
+        # Niveaux de risque codés (dim_risque) : écriture directe dans la table, sans la vue
+        codes = self.db.dimension_codes(conn, "niveau_risque", np.unique(risks[changed]).tolist())
+        risk_ids = [codes[r] for r in risks[changed].tolist()]
+        changed_ids = ids[changed].astype(np.int64).tolist()
+        rows = list(zip(scores[changed].tolist(), risk_ids, changed_ids))
         cursor = conn.cursor()
-        
-        count = 0
-        for client in clients:
-            # 1. Calcul mathématique
-            score = self.compute_score(client)
-            risk = self.classify_risk(score)
-            
-            # 2. Mise à jour BDD (Table 'scoring')
-            # On vérifie d'abord si un score existe déjà pour ce client
-            cursor.execute("SELECT id_score FROM scoring WHERE id_client = ?", (client['id_client'],))
-            exists = cursor.fetchone()
-            
-            if exists:
-                # Mise à jour
-                cursor.execute("""
-                    UPDATE scoring 
-                    SET score_final = ?, niveau_risque = ?, date_calcul = CURRENT_DATE
-                    WHERE id_client = ?
-                """, (score, risk, client['id_client']))
-            else:
-                # Insertion
-                cursor.execute("""
-                    INSERT INTO scoring (id_client, score_final, niveau_risque, date_calcul)
-                    VALUES (?, ?, ?, CURRENT_DATE)
-                """, (client['id_client'], score, risk))
-            
-            count += 1
+        cursor.executemany("""
+            UPDATE scoring_base 
+            SET score_final = ?, risque_id = ?, date_calcul = CURRENT_DATE
+            WHERE id_client = ?
+        """, (row for row, e in zip(rows, exists[changed]) if e))
+        # Insertion (un client supprimé entre-temps est ignoré)
+        cursor.executemany("""
+            INSERT INTO scoring_base (id_client, score_final, risque_id, date_calcul)
+            SELECT ?3, ?1, ?2, CURRENT_DATE WHERE EXISTS (SELECT 1 FROM clients_base WHERE id_client = ?3)
+        """, (row for row, e in zip(rows, exists[changed]) if not e))
+        count = len(rows)
             
         conn.commit()
         conn.close()
+        self.db.publish(("scoring",), changed_ids if count <= self.CHANGED_IDS_LIMIT else None)
         return count
 
     def compute_score(self, client):
@@ -76,6 +95,24 @@ class ScoringModel:
         # Bornage entre 0 et 1000 (Standard Scoring type FICO)
         return max(0, min(1000, int(score)))
 
+    def compute_scores(self, columns):
+        """Version vectorisée de compute_score sur des colonnes NumPy (NaN = NULL)."""
+        def value(name, default):
+            # Même règle que compute_score : NULL ou 0 -> valeur par défaut
+            x = np.asarray(columns[name], dtype=float)
+            return np.where(np.isnan(x) | (x == 0), default, x)
+
+        points_age = self.coef_age * (self.age_ref - value('age', 30))
+        points_solde = self.coef_solde * np.log(1 + np.maximum(value('solde', 0), 0))
+        points_anciennete = self.coef_anciennete * value('anciennete', 0)
+
+        score = value('score_initial', 500) + points_age + points_solde + points_anciennete
+        return np.clip(np.trunc(score), 0, 1000).astype(int)
+
+    def classify_risks(self, scores):
+        """Version vectorisée de classify_risk."""
+        return np.select([scores >= 750, scores >= 500], ["Faible", "Moyen"], "Élevé")
+
     def classify_risk(self, score):
         """Classification selon le PDF"""
         # Échelle inversée standard : Score haut = Risque faible
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from core.downsampling import POINT_BUDGET, reduce_scatter
+from core.query_profiler import profiled
 
 class StatEngine:
     """
@@ -11,15 +13,16 @@ class StatEngine:
         self.db = data_manager
 
     def get_dataframe(self):
-        """Récupère les données SQL et les convertit en DataFrame Pandas optimisé."""
-        data = self.db.get_all_clients()
-        if not data:
-            return pd.DataFrame()
-        return pd.DataFrame(data)
-
-    def get_kpis(self):
-        """Calcule les 4 chiffres clés du Dashboard en temps réel."""
-        df = self.get_dataframe()
+        """
+        Clients + scores en DataFrame Pandas, lus dans l'instantané colonnaire du DataManager
+        (colonnes NumPy mappées en mémoire : ni relecture SQL complète, ni objet Python par ligne).
+        """
+        return self.db.columnar_snapshot().to_dataframe()
+
+    def get_kpis(self, df=None):
+        """Calcule les 4 chiffres clés du Dashboard en temps réel (depuis le cube client sans DataFrame)."""
+        if df is None:
+            return self.get_kpis_from_cube()
         
         # Gestion du cas vide (au tout début)
         if df.empty:
@@ -55,81 +58,134 @@ class StatEngine:
             "anomalies": nb_anomalies
         }
 
+    def get_kpis_from_cube(self):
+        """Mêmes chiffres que get_kpis, lus dans le cube client (aucune ligne client chargée)."""
+        cells = self.db.query_cube(("risque",))
+        nb = sum(c['nb'] for c in cells)
+        encours = sum(c['solde_total'] for c in cells)
+        scored = [c for c in cells if c['score_moyen'] is not None]
+        n_scores = sum(c['nb'] for c in scored)
+        score_moyen = sum(c['score_moyen'] * c['nb'] for c in scored) / n_scores if n_scores else 0
+        return {
+            "total_clients": nb,
+            "total_encours": f"{encours:,.2f} €",
+            "score_moyen": int(score_moyen),
+            "anomalies": sum(c['nb'] for c in cells if c['risque'] == "Élevé")
+        }
+
+    def get_risk_summary(self):
+        """Synthèse par niveau de risque (clients scorés uniquement), depuis le cube client."""
+        return [
+            {"niveau_risque": r['risque'], "clients": r['nb'], "solde": r['solde_moyen'],
+             "revenu": r['revenu_moyen'], "score_moyen": r['score_moyen'], "score_ecart_type": r['score_ecart_type']}
+            for r in self.db.query_cube(("risque",)) if r['risque'] != 'N/A'
+        ]
+
     # --- Données pour les Graphiques ---
 
-    def get_age_dist(self):
-        """Pour l'Histogramme des âges"""
-        df = self.get_dataframe()
-        return df['age'].dropna().tolist() if not df.empty and 'age' in df.columns else []
+    def get_age_dist(self, df=None, bins=10):
+        """
+        Pour l'Histogramme des âges : (effectifs, bornes) déjà classés (np.histogram), ou None.
+        Le thread Tk ne reçoit que 'bins' valeurs, quelle que soit la taille de la base.
+        """
+        df = self.get_dataframe() if df is None else df
+        if df.empty or 'age' not in df.columns:
+            return None
+        ages = df['age'].dropna().to_numpy(dtype=float)
+        if not ages.size:
+            return None
+        counts, edges = np.histogram(ages, bins=bins)
+        return counts.tolist(), edges.tolist()
 
-    def get_segment_dist(self):
+    def get_segment_dist(self, df=None):
         """Pour le Camembert (Répartition par Segment ou Sexe)"""
-        df = self.get_dataframe()
+        df = self.get_dataframe() if df is None else df
         col = 'segment' if 'segment' in df.columns else 'sexe' 
         
         if df.empty or col not in df.columns: 
             return [], []
             
         counts = df[col].value_counts()
+        counts = counts[counts > 0] # Catégories sans client (Categorical)
         return counts.index.tolist(), counts.values.tolist()
     
-    def get_scatter_data(self):
-        """Pour le Scatter Plot (Corrélation Age vs Solde)"""
-        df = self.get_dataframe()
+    def get_scatter_data(self, df=None, budget=POINT_BUDGET):
+        """
+        Pour le Scatter Plot (Corrélation Age vs Solde), réduit à un coût de dessin borné :
+        dict de core.downsampling.reduce_scatter (stratégie 'complet', 'echantillon' ou 'densite').
+        Sans DataFrame, la réduction est faite en SQL (rien n'est chargé en entier).
+        """
+        if df is None:
+            return self.db.get_scatter_points("age", "solde", budget=budget)
         if df.empty or 'age' not in df.columns or 'solde' not in df.columns: 
-            return [], []
-        
-        # On filtre les données aberrantes pour un joli graphique
-        return df['age'].tolist(), df['solde'].tolist()
+            return reduce_scatter([], [], budget)
+
+        # Échantillon stratifié par segment : chaque segment reste représenté
+        points = df[['age', 'solde']].dropna()
+        strata = df.loc[points.index, 'segment'].astype(object).fillna('-').to_numpy() if 'segment' in df.columns else None
+        return reduce_scatter(points['age'].to_numpy(), points['solde'].to_numpy(), budget, strata)
 
-    def get_time_series(self):
+    def get_time_series(self, months=12, region=None, segment=None):
         """
-        Pour le graphique de tendance.
-        Utilise la date de création ou simule une évolution basée sur l'ancienneté.
+        Pour le graphique de tendance : flux net mensuel réel des transactions.
+        Lu dans les agrégats 'rollup_mois' (maintenus incrémentalement par le DataManager),
+        donc instantané quelle que soit la taille du grand livre.
+        Retourne (mois 'AAAA-MM', flux nets).
         """
-        df = self.get_dataframe()
-        if df.empty: return [], []
-        
-        # Astuce Expert : On groupe par ancienneté pour voir l'évolution du solde moyen
-        if 'anciennete' in df.columns and 'solde' in df.columns:
-            # On trie par ancienneté décroissante (les plus anciens à gauche)
-            # Pour simuler une chronologie
-            df_sorted = df.sort_values('anciennete', ascending=False).head(12) # 12 derniers mois simulés
-            return df_sorted['anciennete'].tolist(), df_sorted['solde'].tolist()
-            
-        return [], []
+        flows = self.db.get_monthly_flows(months=months, region=region, segment=segment)
+        return [f['mois'] for f in flows], [f['net'] for f in flows]
     
     # Méthode d'Export Excel Avancée
 
-    def generate_excel_report(self, filepath="Rapport_Financier_SIGASC.xlsx"):
+    EXCEL_MAX_ROWS = 1048576 # Lignes par feuille Excel (en-tête compris)
+
+    @profiled
+    def generate_excel_report(self, filepath="Rapport_Financier_SIGASC.xlsx", progress=None, chunk_size=10000):
         """
-        Génère un rapport Excel multi-onglets complet.
+        Génère un rapport Excel multi-onglets complet, en mémoire constante.
         Onglet 1 : Résumé Exécutif (KPIs)
         Onglet 2 : Détail des Risques
+        Onglet 3+ : Données Complètes, écrites lot par lot (openpyxl en write_only) ;
+        une nouvelle feuille est ouverte à chaque limite de lignes Excel.
+        progress(lignes écrites, total) est appelé après chaque lot, sur le thread appelant.
         """
         try:
-            df = self.get_dataframe()
-            if df.empty: return False
+            total = self.db.count_clients()
+            if not total: return False
+
+            from openpyxl import Workbook
+            wb = Workbook(write_only=True)
 
-            # Préparation des données KPIs
+            # Synthèse et risques : agrégats du cube, quelques lignes
             kpis = self.get_kpis()
-            df_kpi = pd.DataFrame([kpis])
-
-            # Préparation des données Risques
-            if 'niveau_risque' in df.columns:
-                df_risk = df.groupby('niveau_risque')[['solde', 'revenu']].mean().reset_index()
-            else:
-                df_risk = pd.DataFrame()
-
-            # Écriture Excel Multi-Feuilles
-            with pd.ExcelWriter(filepath) as writer:
-                df_kpi.to_excel(writer, sheet_name='Synthèse Exécutive', index=False)
-                df_risk.to_excel(writer, sheet_name='Analyse des Risques', index=False)
-                # On met aussi les données brutes dans un onglet à part
-                df.to_excel(writer, sheet_name='Données Complètes', index=False)
-            
+            ws = wb.create_sheet('Synthèse Exécutive')
+            ws.append(list(kpis))
+            ws.append(list(kpis.values()))
+
+            risks = self.get_risk_summary()
+            ws = wb.create_sheet('Analyse des Risques')
+            if risks:
+                ws.append(list(risks[0]))
+                for r in risks:
+                    ws.append(list(r.values()))
+
+            # Données brutes : jamais plus d'un lot en mémoire
+            sheet, sheet_rows, sheets, written = None, 0, 0, 0
+            for batch in self.db.iter_clients(chunk_size):
+                for row in batch:
+                    if sheet is None or sheet_rows >= self.EXCEL_MAX_ROWS:
+                        sheets += 1
+                        sheet = wb.create_sheet('Données Complètes' if sheets == 1 else f'Données Complètes ({sheets})')
+                        sheet.append(list(row.keys()))
+                        sheet_rows = 1
+                    sheet.append(tuple(row))
+                    sheet_rows += 1
+                written += len(batch)
+                if progress:
+                    progress(written, total)
+
+            wb.save(filepath)
             return True
         except Exception as e:
             print(f"Erreur Rapport: {e}")
             return False
-
@@ -1,9 +1,7 @@
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pandas as pd
 import numpy as np
 from core.statistics import StatEngine
+from gui.task_runner import LoadingOverlay
 from tkinter import filedialog, messagebox
 
 class AnalyticsView(ctk.CTkScrollableFrame):
@@ -11,19 +9,23 @@ class AnalyticsView(ctk.CTkScrollableFrame):
     Vue Analytique Avancée.
     Tableaux croisés, Heatmaps et Storytelling statistique.
     """
-    def __init__(self, master, data_manager, **kwargs):
+    WATCHED_TABLES = frozenset({"clients", "scoring"}) # Bus de changements
+
+    def __init__(self, master, data_manager, task_runner, renderer, **kwargs):
         super().__init__(master, **kwargs)
         self.data_manager = data_manager
+        self.tasks = task_runner
+        self.renderer = renderer   # RenderService : graphiques rendus hors du thread Tk
+        self.loaded_generation = 0 # Génération d'écriture des données affichées
         self.stats = StatEngine(self.data_manager)
+        self.stat_cards = [] # (label valeur, label insight) par carte
+        self.charts = {}     # titre -> CTkLabel affichant l'image rendue
         self.build_ui()
 
     def build_ui(self):
+        """Construit la page UNE fois ; refresh() ne fait ensuite que mettre à jour les données."""
         self.grid_columnconfigure((0, 1), weight=1)
 
-        # Remove any existing children before building
-        for w in self.winfo_children():
-            w.destroy()
-
         self.create_header()
 
         # Sections
@@ -36,11 +38,57 @@ class AnalyticsView(ctk.CTkScrollableFrame):
         self.create_section("🧠 Analyse Croisée (Région vs Segment)", 5)
         self.create_advanced_charts(6)
 
+        self.loading = LoadingOverlay(self)
+        # Les données sont chargées à l'affichage (show_view -> refresh)
+
     def refresh(self):
-        """Public: rebuild the analytics UI to reflect current DB state."""
-        # Recreate StatEngine to pick up new data source
-        self.stats = StatEngine(self.data_manager)
-        self.build_ui()
+        """Public: met à jour cartes et graphiques avec l'état courant de la BDD."""
+        self.update_data()
+
+    def update_data(self):
+        self.loaded_generation = self.data_manager.generation
+        self.loading.show()
+        self.tasks.submit(self.compute_data, key="analytics",
+                          on_done=self.apply_data, on_error=self.on_load_error)
+
+    def compute_data(self):
+        """Thread de fond : statistiques pandas pour les cartes, croisements lus dans le cube client."""
+        # Version des graphiques : lue avant les données (au pire un rendu de trop, jamais une image périmée)
+        version = self.data_manager.data_stamp()
+        df = self.stats.get_dataframe()
+        data = {"empty": df.empty, "segments": self.stats.get_segment_dist(df), "version": version}
+        if df.empty:
+            return data
+
+        data["smart"] = (
+            df['score'].mean() if 'score' in df else 0,
+            df['score'].var() if 'score' in df else 0,
+            df['age'].median() if 'age' in df else 0
+        )
+        # Région (ordre alphabétique stable) et tableau croisé : agrégats précalculés du cube
+        regions = self.data_manager.query_cube(("region",))
+        data["regions"] = ([r['region'] for r in regions], [r['nb'] for r in regions]) if regions else None
+        rows, cols, matrix = self.data_manager.get_crosstab("region", "segment")
+        data["crosstab"] = (matrix, rows, cols) if rows else None
+        # Histogramme classé ici : seuls les 10 effectifs partent vers le rendu
+        data["anciennete"] = None
+        if 'anciennete' in df:
+            values = df['anciennete'].dropna().to_numpy(dtype=float)
+            if values.size:
+                counts, edges = np.histogram(values, bins=10)
+                data["anciennete"] = (counts.tolist(), edges.tolist())
+        return data
+
+    def apply_data(self, data):
+        """Thread Tk : cartes mises à jour en place, graphiques confiés au RenderService."""
+        self.update_smart_stats(data)
+        self.update_demo_charts(data)
+        self.update_advanced_charts(data)
+        self.loading.hide()
+
+    def on_load_error(self, error):
+        self.loading.hide()
+        print(f"Erreur Analyses: {error}")
 
     def create_header(self):
         header = ctk.CTkFrame(self, fg_color="transparent")
@@ -64,11 +112,25 @@ class AnalyticsView(ctk.CTkScrollableFrame):
                                                 filetypes=[("Excel Workbook", "*.xlsx")],
                                                 initialfile="Rapport_Financier_2026.xlsx")
         if filename:
-            success = self.stats.generate_excel_report(filename)
-            if success:
-                messagebox.showinfo("Rapport Généré", "Le rapport financier complet a été généré avec succès.\nIl contient 3 onglets d'analyse.")
-            else:
-                messagebox.showerror("Erreur", "Impossible de générer le rapport (Vérifiez que le fichier n'est pas déjà ouvert).")
+            # Génération en tâche de fond ; la progression est relayée sur le thread Tk
+            self.btn_report.configure(state="disabled", text="⏳ Rapport 0 %")
+            self.tasks.submit(self.stats.generate_excel_report, filename,
+                              progress=lambda done, total: self.tasks.post(self.on_report_progress, done, total),
+                              on_done=self.on_report_done, on_error=self.on_report_error)
+
+    def on_report_progress(self, done, total):
+        self.btn_report.configure(text=f"⏳ Rapport {done * 100 // max(total, 1)} %")
+
+    def on_report_done(self, success):
+        self.btn_report.configure(state="normal", text="📄 Générer Rapport Financier")
+        if success:
+            messagebox.showinfo("Rapport Généré", "Le rapport financier complet a été généré avec succès.\nIl contient 3 onglets d'analyse.")
+        else:
+            messagebox.showerror("Erreur", "Impossible de générer le rapport (Vérifiez que le fichier n'est pas déjà ouvert).")
+
+    def on_report_error(self, error):
+        print(f"Erreur Rapport: {error}")
+        self.on_report_done(False)
 
     def create_section(self, title, row):
         lbl = ctk.CTkLabel(self, text=title, font=("Roboto Medium", 18), text_color="#0A84FF")
@@ -79,111 +141,113 @@ class AnalyticsView(ctk.CTkScrollableFrame):
         frame = ctk.CTkFrame(self, fg_color="transparent")
         frame.grid(row=row, column=0, columnspan=2, sticky="ew", padx=10)
         frame.grid_columnconfigure((0, 1, 2), weight=1)
-        
-        # Récupération données via Pandas (StatEngine)
-        df = self.stats.get_dataframe()
-        if df.empty: return
-
-        # Calculs
-        avg_score = df['score'].mean() if 'score' in df else 0
-        var_score = df['score'].var() if 'score' in df else 0
-        med_age = df['age'].median() if 'age' in df else 0
-
-        # Cartes
-        self.add_stat_card(frame, 0, "Score Moyen", f"{avg_score:.1f}", 
-                           "Performance correcte" if avg_score > 500 else "Performance faible", "#0A84FF")
-        self.add_stat_card(frame, 1, "Variance Score", f"{var_score:.0f}", 
-                           "Forte disparité" if var_score > 15000 else "Clientèle homogène", "#FF9500")
-        self.add_stat_card(frame, 2, "Âge Médian", f"{med_age:.0f} ans", 
-                           "Cœur de cible jeune" if med_age < 35 else "Clientèle mature", "#34C759")
-
-    def add_stat_card(self, parent, col, title, value, insight, color):
+
+        # Cartes (valeurs remplies par update_smart_stats)
+        self.add_stat_card(frame, 0, "Score Moyen", "#0A84FF")
+        self.add_stat_card(frame, 1, "Variance Score", "#FF9500")
+        self.add_stat_card(frame, 2, "Âge Médian", "#34C759")
+
+    def update_smart_stats(self, data):
+        if data["empty"]:
+            for value, insight in self.stat_cards:
+                value.configure(text="-")
+                insight.configure(text="💡 Aucune donnée")
+            return
+
+        # Calculs (faits dans compute_data)
+        avg_score, var_score, med_age = data["smart"]
+
+        cards = [
+            (f"{avg_score:.1f}", "Performance correcte" if avg_score > 500 else "Performance faible"),
+            (f"{var_score:.0f}", "Forte disparité" if var_score > 15000 else "Clientèle homogène"),
+            (f"{med_age:.0f} ans", "Cœur de cible jeune" if med_age < 35 else "Clientèle mature"),
+        ]
+        for (value, insight), (text, tip) in zip(self.stat_cards, cards):
+            value.configure(text=text)
+            insight.configure(text=f"💡 {tip}")
+
+    def add_stat_card(self, parent, col, title, color):
         card = ctk.CTkFrame(parent, corner_radius=10, fg_color="#FFFFFF", border_width=1, border_color="#E5E5EA")
         card.grid(row=0, column=col, sticky="nsew", padx=10)
         
         ctk.CTkLabel(card, text=title.upper(), font=("Roboto", 11, "bold"), text_color=color).pack(anchor="w", padx=15, pady=(15,5))
-        ctk.CTkLabel(card, text=value, font=("Roboto Medium", 28), text_color="#1C1C1E").pack(anchor="w", padx=15)
+        value = ctk.CTkLabel(card, text="-", font=("Roboto Medium", 28), text_color="#1C1C1E")
+        value.pack(anchor="w", padx=15)
         
         # Bulle Insight
         box = ctk.CTkFrame(card, fg_color="#F5F5F5", corner_radius=6)
         box.pack(fill="x", padx=15, pady=15)
-        ctk.CTkLabel(box, text=f"💡 {insight}", font=("Roboto", 11), text_color="#1C1C1E").pack(padx=10, pady=5, anchor="w")
+        insight = ctk.CTkLabel(box, text="💡", font=("Roboto", 11), text_color="#1C1C1E")
+        insight.pack(padx=10, pady=5, anchor="w")
+        self.stat_cards.append((value, insight))
 
     def create_demo_charts(self, row):
+        self.create_chart(row, 0, "Répartition Sexe")
+        self.create_chart(row, 1, "Répartition Région")
+
+    def update_demo_charts(self, data):
         # Sexe (Pie)
-        f1 = self.create_chart_frame(row, 0, "Répartition Sexe")
-        labels, sizes = self.stats.get_segment_dist() # Utilise get_segment_dist qui gère sexe/segment
-        
-        fig, ax = plt.subplots(figsize=(5, 3.5), dpi=100)
-        self.setup_fig(fig, ax)
+        labels, sizes = data["segments"] # Gère sexe/segment
         if sizes:
-            ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=['#0A84FF', '#FF3B30'], 
-                   textprops={'color':"#1C1C1E"}, startangle=90)
-        self.embed(fig, f1)
+            self.draw_chart(data, "Répartition Sexe", "pie", sizes, labels, ['#0A84FF', '#FF3B30'], autopct='%1.1f%%',
+                            textprops={'color':"#1C1C1E"}, startangle=90)
+        else:
+            self.draw_chart(data, "Répartition Sexe", "clear")
 
         # Région (Bar)
-        f2 = self.create_chart_frame(row, 1, "Répartition Région")
-        df = self.stats.get_dataframe()
-        if not df.empty and 'region' in df:
-            counts = df['region'].value_counts()
-            fig, ax = plt.subplots(figsize=(5, 3.5), dpi=100)
-            self.setup_fig(fig, ax)
-            ax.bar(counts.index, counts.values, color="#34C759")
-            plt.xticks(rotation=15, fontsize=8)
-            self.embed(fig, f2)
+        regions = data.get("regions")
+        if regions is not None:
+            self.draw_chart(data, "Répartition Région", "bars", *regions,
+                            color="#34C759", rotation=15, fontsize=8)
+        else:
+            self.draw_chart(data, "Répartition Région", "clear")
 
     def create_advanced_charts(self, row):
+        self.create_chart(row, 0, "Heatmap (Région vs Segment)")
+        self.create_chart(row, 1, "Fidélité (Ancienneté)")
+
+    def update_advanced_charts(self, data):
         # Heatmap (Tableau croisé)
-        f1 = self.create_chart_frame(row, 0, "Heatmap (Région vs Segment)")
-        df = self.stats.get_dataframe()
-        
-        if not df.empty and 'region' in df and 'segment' in df:
-            ct = pd.crosstab(df['region'], df['segment'])
-            fig, ax = plt.subplots(figsize=(5, 3.5), dpi=100)
-            self.setup_fig(fig, ax)
-            ax.grid(False) # Pas de grille sur heatmap
-            
-            im = ax.imshow(ct.values, cmap="viridis", aspect='auto')
-            
-            # Labels axes
-            ax.set_xticks(np.arange(len(ct.columns)))
-            ax.set_yticks(np.arange(len(ct.index)))
-            ax.set_xticklabels(ct.columns, color="#1C1C1E", fontsize=8)
-            ax.set_yticklabels(ct.index, color="#1C1C1E", fontsize=8)
-            
-            # Annotations
-            for i in range(len(ct.index)):
-                for j in range(len(ct.columns)):
-                    ax.text(j, i, ct.values[i, j], ha="center", va="center", color="white", fontweight="bold")
-            
-            self.embed(fig, f1)
+        ct = data.get("crosstab")
+        if ct is not None:
+            self.draw_chart(data, "Heatmap (Région vs Segment)", "heatmap", *ct)
+        else:
+            self.draw_chart(data, "Heatmap (Région vs Segment)", "clear")
 
         # Histogramme Ancienneté
-        f2 = self.create_chart_frame(row, 1, "Fidélité (Ancienneté)")
-        if not df.empty and 'anciennete' in df:
-            fig, ax = plt.subplots(figsize=(5, 3.5), dpi=100)
-            self.setup_fig(fig, ax)
-            ax.hist(df['anciennete'], bins=10, color="#FF9500", alpha=0.8)
-            ax.set_xlabel("Années d'ancienneté", color="#8E8E93")
-            self.embed(fig, f2)
+        if data.get("anciennete") is not None:
+            self.draw_chart(data, "Fidélité (Ancienneté)", "binned", *data['anciennete'], color="#FF9500",
+                            alpha=0.8, rwidth=1.0, xlabel="Années d'ancienneté")
+        else:
+            self.draw_chart(data, "Fidélité (Ancienneté)", "clear")
 
     # --- Utils ---
-    def create_chart_frame(self, row, col, title):
+    CHART_SIZE = (5, 3.5) # Pouces, à 100 dpi
+    CHART_DPI = 100
+
+    def create_chart(self, row, col, title):
         frame = ctk.CTkFrame(self, fg_color="#FFFFFF", border_width=1, border_color="#E5E5EA")
         frame.grid(row=row, column=col, sticky="nsew", padx=10, pady=10)
         ctk.CTkLabel(frame, text=title, font=("Roboto Medium", 13), text_color="#1C1C1E").pack(anchor="w", padx=15, pady=10)
-        return frame
-
-    def setup_fig(self, fig, ax):
-        bg = "#FFFFFF"
-        fig.patch.set_facecolor(bg)
-        ax.set_facecolor(bg)
-        for s in ax.spines.values(): s.set_visible(False)
-        ax.tick_params(colors="#8E8E93")
-
-    def embed(self, fig, parent):
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-
+        # L'image rendue hors écran remplace le placeholder à son arrivée
+        width, height = (int(v * self.CHART_DPI) for v in self.CHART_SIZE)
+        self.charts[title] = ctk.CTkLabel(frame, text="⏳", width=width, height=height, text_color="#8E8E93")
+        self.charts[title].pack(padx=5, pady=5)
+        return self.charts[title]
+
+    def draw_chart(self, data, title, kind, *args, **kwargs):
+        """
+        Rendu par le RenderService (processus séparés, en parallèle). Clé de cache : empreinte
+        des données (data_stamp) + titre, calculée en tâche de fond : rien n'est haché ici.
+        """
+        self.renderer.render(kind, *args, key=(id(self), title), version=(data["version"], title),
+                             figsize=self.CHART_SIZE, dpi=self.CHART_DPI, style="clean",
+                             on_done=lambda image: self.show_chart(title, image),
+                             on_error=lambda error: self.show_chart_error(title), **kwargs)
+
+    def show_chart(self, title, image):
+        ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+        self.charts[title].configure(image=ctk_image, text="")
+
+    def show_chart_error(self, title):
+        self.charts[title].configure(image=None, text="⚠ Graphique indisponible", text_color="#FF3B30")
@@ -0,0 +1,290 @@
+import io
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+from core.downsampling import POINT_BUDGET, lttb
+
+
+def clean_style(fig, ax):
+    """Thème blanc épuré (sans bordures, graduations grises) ; utilisable hors du thread Tk."""
+    bg = "#FFFFFF"
+    fig.patch.set_facecolor(bg)
+    ax.set_facecolor(bg)
+    for s in ax.spines.values(): s.set_visible(False)
+    ax.tick_params(colors="#8E8E93")
+
+
+# Thèmes désignés par leur nom (transmissibles à un processus de rendu)
+STYLES = {"clean": clean_style}
+
+
+class ChartCanvas:
+    """
+    Graphique réutilisable pour les vues.
+    La Figure et le canvas Tk sont créés UNE seule fois ; chaque rafraîchissement met à
+    jour les artistes existants (hauteurs de barres, points, courbe, parts, cellules)
+    puis appelle draw_idle. On utilise Figure et non pyplot : aucune figure n'est
+    retenue par l'état global, la mémoire reste stable d'une visite à l'autre.
+    Sans parent, le graphique est rendu hors écran (Agg) : voir to_png et RenderService.
+    """
+
+    TEXT_COLOR = "#1C1C1E"
+
+    def __init__(self, parent=None, figsize=(4, 2.5), dpi=100, style=None):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.fig.patch.set_facecolor("#FFFFFF")
+        self.ax = self.fig.add_subplot(111)
+        self.style = style # Callback (fig, ax) : thème de la vue appelante
+        if style:
+            style(self.fig, self.ax)
+
+        self.offscreen = parent is None
+        if self.offscreen:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.fig)
+        else:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.fig, master=parent)
+            self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.kind = None
+        self.artists = {}
+        self._note = None
+
+    # --- OUTILS ---
+
+    def _reset(self, kind):
+        """Repart d'un axe vierge (première utilisation ou changement de structure)."""
+        self.ax.clear()
+        if self.style:
+            self.style(self.fig, self.ax)
+        self.kind = kind
+        self.artists = {}
+        self._note = None # Supprimée par ax.clear()
+
+    def set_note(self, text):
+        """Mention discrète en haut à droite (ex. stratégie de réduction des données)."""
+        if self._note is None:
+            self._note = self.ax.text(0.99, 0.98, "", transform=self.ax.transAxes, ha="right", va="top",
+                                      fontsize=6, color="#8E8E93")
+        self._note.set_text(text or "")
+
+    def draw(self):
+        self.fig.tight_layout()
+        if not self.offscreen: # Hors écran, le rendu a lieu dans to_png
+            self.canvas.draw_idle()
+
+    def to_png(self):
+        """Image PNG du graphique (rendu Agg)."""
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format="png", dpi=self.fig.dpi, facecolor=self.fig.get_facecolor())
+        return buffer.getvalue()
+
+    def clear(self):
+        """Graphique vide (pas de données)."""
+        self._reset(None)
+        self.draw()
+
+    # --- BARRES / HISTOGRAMME ---
+
+    def bars(self, labels, heights, color="#34C759", rotation=0, fontsize=8):
+        """Diagramme en barres catégoriel ; mise à jour en place si les catégories sont les mêmes."""
+        labels = [str(l) for l in labels]
+        if self.kind != "bars" or self.artists.get("labels") != labels:
+            self._reset("bars")
+            self.artists["bars"] = self.ax.bar(range(len(labels)), heights, color=color)
+            self.artists["labels"] = labels
+            self.ax.set_xticks(range(len(labels)))
+            self.ax.set_xticklabels(labels, rotation=rotation, fontsize=fontsize)
+        else:
+            for bar, h in zip(self.artists["bars"], heights):
+                bar.set_height(h)
+        self._rescale_y(heights)
+        self.draw()
+
+    def histogram(self, data, bins=10, color="#0A84FF", alpha=0.8, rwidth=0.9, xlabel=None):
+        """Histogramme : les classes sont recalculées, les rectangles existants déplacés."""
+        data = np.asarray(data, dtype=float)
+        data = data[~np.isnan(data)]
+        if data.size == 0:
+            return self.clear()
+
+        counts, edges = np.histogram(data, bins=bins)
+        self.binned(counts, edges, color=color, alpha=alpha, rwidth=rwidth, xlabel=xlabel)
+
+    def binned(self, counts, edges, color="#0A84FF", alpha=0.8, rwidth=0.9, xlabel=None):
+        """Histogramme déjà classé (np.histogram) : seuls les effectifs voyagent jusqu'au rendu."""
+        counts = np.asarray(counts)
+        edges = np.asarray(edges, dtype=float)
+        if counts.size == 0:
+            return self.clear()
+        widths = np.diff(edges) * rwidth
+        lefts = edges[:-1] + (np.diff(edges) - widths) / 2
+
+        if self.kind != "histogram" or len(self.artists["bars"]) != len(counts):
+            self._reset("histogram")
+            self.artists["bars"] = self.ax.bar(lefts, counts, width=widths, align="edge",
+                                               color=color, alpha=alpha)
+            if xlabel:
+                self.ax.set_xlabel(xlabel, color="#8E8E93")
+        else:
+            for bar, x, w, h in zip(self.artists["bars"], lefts, widths, counts):
+                bar.set_x(x)
+                bar.set_width(w)
+                bar.set_height(h)
+
+        self.ax.set_xlim(edges[0], edges[-1])
+        self._rescale_y(counts)
+        self.draw()
+
+    def _rescale_y(self, values):
+        top = max(values) if len(values) else 1
+        self.ax.set_ylim(0, (top or 1) * 1.05)
+
+    # --- COURBE ---
+
+    def line(self, x, y, color="#34C759", fill=True, xticklabels=None, rotation=45, max_points=POINT_BUDGET):
+        """
+        Courbe (+ aire) : set_data sur la Line2D existante, l'aire est redessinée.
+        Au-delà de max_points, la série est réduite par LTTB (forme conservée, coût borné).
+        """
+        if len(x) > max_points:
+            x, y = lttb(x, y, max_points)
+            xticklabels = None # Les libellés ne correspondent plus aux points gardés
+        if self.kind != "line":
+            self._reset("line")
+            (self.artists["line"],) = self.ax.plot([], [], color=color, linewidth=2)
+            self.artists["fill"] = None
+
+        self.artists["line"].set_data(x, y)
+        if self.artists["fill"] is not None:
+            self.artists["fill"].remove()
+            self.artists["fill"] = None
+        if fill and len(x):
+            self.artists["fill"] = self.ax.fill_between(x, y, color=color, alpha=0.1)
+
+        if xticklabels is not None:
+            self.ax.set_xticks(list(x))
+            self.ax.set_xticklabels(xticklabels, rotation=rotation)
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.draw()
+
+    # --- NUAGE DE POINTS ---
+
+    def scatter(self, x, y, color="#FF9500", alpha=0.6, size=15):
+        """Nuage de points : set_offsets sur la collection existante."""
+        if self.kind != "scatter":
+            self._reset("scatter")
+            self.artists["points"] = self.ax.scatter([], [], color=color, alpha=alpha, s=size, edgecolors='none')
+
+        points = np.column_stack([x, y]) if len(x) else np.empty((0, 2))
+        self.artists["points"].set_offsets(points)
+        if len(x):
+            # Les collections ne sont pas prises en compte par relim : limites calculées ici
+            self._set_limits(self.ax.set_xlim, np.min(x), np.max(x))
+            self._set_limits(self.ax.set_ylim, np.min(y), np.max(y))
+        self.draw()
+
+    def density(self, counts, xedges, yedges, cmap="Oranges"):
+        """
+        Nuage agrégé (histogramme 2D) : une image de taille fixe, quel que soit le nombre
+        de points ; set_data sur l'image existante si la grille a la même forme.
+        """
+        counts = np.asarray(counts, dtype=float)
+        extent = (xedges[0], xedges[-1], yedges[0], yedges[-1])
+        # Cases vides transparentes : seul le nuage ressort
+        values = np.ma.masked_equal(counts.T, 0)
+        if self.kind != "density" or self.artists["image"].get_array().shape != values.shape:
+            self._reset("density")
+            self.artists["image"] = self.ax.imshow(values, origin="lower", aspect="auto",
+                                                   extent=extent, cmap=cmap, interpolation="nearest")
+        else:
+            self.artists["image"].set_data(values)
+            self.artists["image"].set_extent(extent)
+        if counts.max() > 0:
+            self.artists["image"].set_clim(1, counts.max())
+        self.ax.set_xlim(extent[0], extent[1])
+        self.ax.set_ylim(extent[2], extent[3])
+        self.draw()
+
+    def _set_limits(self, setter, low, high):
+        margin = (high - low) * 0.05 or 1
+        setter(low - margin, high + margin)
+
+    # --- CAMEMBERT / DONUT ---
+
+    def pie(self, sizes, labels, colors, autopct='%1.0f%%', startangle=90, donut=False,
+            textprops=None, pctdistance=0.6):
+        """
+        Camembert : si le nombre de parts est inchangé, les angles des secteurs et la
+        position des textes sont recalculés sur les artistes existants.
+        """
+        labels = [str(l) for l in labels]
+        total = float(sum(sizes))
+        if not total:
+            return self.clear()
+
+        if self.kind != "pie" or len(self.artists["wedges"]) != len(sizes):
+            self._reset("pie")
+            wedges, texts, autotexts = self.ax.pie(sizes, labels=labels, autopct=autopct, startangle=startangle,
+                                                   colors=colors, textprops=textprops, pctdistance=pctdistance)
+            self.artists.update(wedges=wedges, texts=texts, autotexts=autotexts)
+            if donut:
+                self.ax.add_artist(Circle((0, 0), 0.60, fc='#FFFFFF')) # Trou central
+        else:
+            theta1 = startangle
+            for i, size in enumerate(sizes):
+                frac = size / total
+                theta2 = theta1 + 360 * frac
+                wedge = self.artists["wedges"][i]
+                wedge.set_theta1(theta1)
+                wedge.set_theta2(theta2)
+
+                # Même placement que Axes.pie
+                mid = np.deg2rad((theta1 + theta2) / 2)
+                cx, cy = np.cos(mid), np.sin(mid)
+                text = self.artists["texts"][i]
+                text.set_text(labels[i])
+                text.set_position((1.1 * cx, 1.1 * cy))
+                text.set_horizontalalignment("left" if cx > 0 else "right")
+                pct = self.artists["autotexts"][i]
+                pct.set_text(autopct % (100 * frac))
+                pct.set_position((pctdistance * cx, pctdistance * cy))
+                theta1 = theta2
+        self.draw()
+
+    # --- HEATMAP ---
+
+    def heatmap(self, values, row_labels, col_labels, cmap="viridis", fontsize=8):
+        """Heatmap annotée : set_data sur l'image et set_text sur les annotations existantes."""
+        values = np.asarray(values)
+        if values.size == 0:
+            return self.clear()
+        row_labels = [str(l) for l in row_labels]
+        col_labels = [str(l) for l in col_labels]
+        shape_labels = (row_labels, col_labels)
+
+        if self.kind != "heatmap" or self.artists["shape_labels"] != shape_labels:
+            self._reset("heatmap")
+            self.ax.grid(False) # Pas de grille sur heatmap
+            self.artists["image"] = self.ax.imshow(values, cmap=cmap, aspect='auto')
+            self.artists["shape_labels"] = shape_labels
+            self.ax.set_xticks(np.arange(len(col_labels)))
+            self.ax.set_yticks(np.arange(len(row_labels)))
+            self.ax.set_xticklabels(col_labels, color=self.TEXT_COLOR, fontsize=fontsize)
+            self.ax.set_yticklabels(row_labels, color=self.TEXT_COLOR, fontsize=fontsize)
+            self.artists["cells"] = [
+                [self.ax.text(j, i, "", ha="center", va="center", color="white", fontweight="bold")
+                 for j in range(len(col_labels))]
+                for i in range(len(row_labels))
+            ]
+        else:
+            self.artists["image"].set_data(values)
+
+        self.artists["image"].set_clim(values.min(), values.max())
+        for i, row in enumerate(self.artists["cells"]):
+            for j, cell in enumerate(row):
+                cell.set_text(f"{values[i, j]:g}")
+        self.draw()
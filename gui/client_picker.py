@@ -0,0 +1,120 @@
+import threading
+import customtkinter as ctk
+
+
+class ClientPicker(ctk.CTkFrame):
+    """
+    Sélecteur de client avec recherche : champ de saisie + liste chargée par pages
+    (DataManager.search_clients, pagination par curseur) au lieu d'un menu contenant
+    toute la base. Les lectures passent par le TaskRunner ; une frappe plus récente
+    interrompt la recherche en cours (même mécanique que les vues).
+    """
+
+    PAGE_SIZE = 30
+    SEARCH_DELAY_MS = 150
+    ROW_COLORS = ("#FFFFFF", "#F9F9FB")
+    SELECTED_COLOR = "#E0F2FE"
+
+    def __init__(self, master, data_manager, task_runner, on_select=None, height=180, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.data_manager = data_manager
+        self.tasks = task_runner
+        self.on_select = on_select
+        self.selected = None      # (id_client, nom)
+        self.search = ""
+        self.token = threading.Event()
+        self.search_job = None
+        self.cursor = None        # Dernier id_client affiché
+        self.buttons = {}         # id_client -> bouton de la liste
+        self.btn_more = None
+
+        self.entry = ctk.CTkEntry(self, placeholder_text="🔍 Nom ou n° de client...")
+        self.entry.pack(fill="x")
+        self.entry.bind("<KeyRelease>", self.schedule_search)
+
+        self.list_frame = ctk.CTkScrollableFrame(self, height=height, fg_color="#FFFFFF",
+                                                 border_width=1, border_color="#E5E5EA")
+        self.list_frame.pack(fill="x", pady=(5, 0))
+
+        self.lbl_status = ctk.CTkLabel(self, text="", text_color="gray", font=("Roboto", 11))
+        self.lbl_status.pack(anchor="w")
+
+        self.reload()
+
+    def schedule_search(self, event=None):
+        """Debounce : seule la dernière frappe déclenche une lecture."""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY_MS, self.on_search)
+
+    def on_search(self):
+        self.search_job = None
+        if self.entry.get() != self.search:
+            self.reload()
+
+    def reload(self):
+        for w in self.list_frame.winfo_children():
+            w.destroy()
+        self.buttons = {}
+        self.btn_more = None
+        self.cursor = None
+        self.search = self.entry.get()
+        self.token.set() # Recherche précédente interrompue côté SQLite
+        self.token = threading.Event()
+        self.lbl_status.configure(text="Recherche...")
+        self.load_page()
+
+    def load_page(self):
+        token = self.token
+        self.tasks.submit(self.data_manager.search_clients, self.search, before=self.cursor,
+                          limit=self.PAGE_SIZE, cancel=token, key="client_picker",
+                          on_done=lambda rows: self.append_page(token, rows),
+                          on_error=self.on_error)
+
+    def append_page(self, token, rows):
+        if token is not self.token or not self.winfo_exists():
+            return # Recherche remplacée entre-temps, ou dialogue fermé
+        if self.btn_more is not None:
+            self.btn_more.destroy()
+            self.btn_more = None
+
+        for id_client, nom in rows:
+            idx = len(self.buttons)
+            btn = ctk.CTkButton(self.list_frame, text=f"{id_client} - {nom}", anchor="w", height=28,
+                                fg_color=self.ROW_COLORS[idx % 2], text_color="#1C1C1E", hover_color="#F2F2F7",
+                                command=lambda c=(id_client, nom): self.select(c))
+            btn.pack(fill="x", pady=1)
+            self.buttons[id_client] = btn
+
+        if rows:
+            self.cursor = rows[-1][0]
+        if len(rows) == self.PAGE_SIZE:
+            # Page pleine : la suite n'est lue qu'à la demande
+            self.btn_more = ctk.CTkButton(self.list_frame, text="Afficher plus...", height=26,
+                                          fg_color="transparent", text_color="#0A84FF", hover_color="#F2F2F7",
+                                          command=self.load_page)
+            self.btn_more.pack(fill="x", pady=2)
+
+        if not self.buttons:
+            self.lbl_status.configure(text="Aucun client trouvé.")
+        else:
+            self.lbl_status.configure(text=f"{len(self.buttons)} client(s) affiché(s)")
+
+    def on_error(self, error):
+        self.lbl_status.configure(text="")
+        print(f"Erreur recherche client: {error}")
+
+    def select(self, client):
+        previous = self.selected and self.buttons.get(self.selected[0])
+        if previous:
+            idx = list(self.buttons).index(self.selected[0])
+            previous.configure(fg_color=self.ROW_COLORS[idx % 2])
+        self.selected = client
+        self.buttons[client[0]].configure(fg_color=self.SELECTED_COLOR)
+        self.lbl_status.configure(text=f"Sélection : {client[0]} - {client[1]}")
+        if self.on_select:
+            self.on_select(client)
+
+    def get(self):
+        """(id_client, nom) du client choisi, ou None."""
+        return self.selected
@@ -1,6 +1,9 @@
 import customtkinter as ctk
+import threading
 from tkinter import messagebox
 from core.anomaly import AnomalyDetector
+from gui.virtual_grid import VirtualGrid
+from gui.task_runner import LoadingOverlay
 
 # --- CLASSE FORMULAIRE (POP-UP) ---
 class ClientFormDialog(ctk.CTkToplevel):
@@ -93,11 +96,23 @@ class ClientFormDialog(ctk.CTkToplevel):
 
 # --- VUE PRINCIPALE ---
 class ClientManagerView(ctk.CTkFrame):
-    def __init__(self, master, data_manager, **kwargs):
+    SEARCH_DELAY_MS = 150 # Recherche lancée après une courte pause de frappe
+    WATCHED_TABLES = frozenset({"clients", "scoring"}) # Bus de changements
+
+    def __init__(self, master, data_manager, task_runner, **kwargs):
         super().__init__(master, **kwargs)
         self.data_manager = data_manager
+        self.tasks = task_runner
+        self.loaded_generation = 0 # Génération d'écriture des données affichées
         self.selected_client_id = None
-        self.page_size = 10
+        # Filtres figés au moment de la demande (lus par les threads de fond, jamais les widgets)
+        # + jeton levé dès qu'une requête plus récente les remplace (SQL abandonné)
+        self.filters = {"region": "Toutes", "risque": "Tous", "recherche": ""}
+        self.query = (self.filters, threading.Event())
+        self.search_job = None
+        self.total = 0 # Nombre de clients correspondant aux filtres (grille)
+        # Index clairsemé par filtres : id_client au début de chaque bloc de la grille (lecture par clé)
+        self.bookmarks = {}
         
         # Initialisation Moteur ML
         self.ai_engine = AnomalyDetector()
@@ -112,12 +127,14 @@ class ClientManagerView(ctk.CTkFrame):
         self.create_filters()
         # 3. HEADER TABLEAU
         self.create_grid_header()
-        # 4. GRILLE (SCROLLABLE)
-        self.scroll_frame = ctk.CTkScrollableFrame(self, fg_color="transparent")
-        self.scroll_frame.grid(row=3, column=0, sticky="nsew", padx=20, pady=(0, 20))
-        
-        # Chargement initial
-        self.refresh_list()
+        # 4. GRILLE VIRTUALISÉE (pool fixe de lignes, données lues à la demande)
+        self.grid_view = VirtualGrid(self, n_columns=7, fetch_window=self.fetch_window,
+                                     count_rows=self.count_rows, format_row=self.format_row,
+                                     on_select=self.on_select, on_total=self.on_total,
+                                     runner=self.tasks)
+        self.grid_view.grid(row=3, column=0, sticky="nsew", padx=20, pady=(0, 20))
+        self.loading = LoadingOverlay(self)
+        # Les données sont chargées à l'affichage (show_view -> refresh_list)
 
     def create_toolbar(self):
         toolbar = ctk.CTkFrame(self, height=60, fg_color="#FFFFFF", border_width=1, border_color="#E5E5EA", corner_radius=10) # Fond style iOS
@@ -157,14 +174,13 @@ class ClientManagerView(ctk.CTkFrame):
         self.entry_search = ctk.CTkEntry(filter_frame, placeholder_text="🔍 Rechercher (Nom)...", width=250)
         self.entry_search.pack(side="right")
         self.entry_search.bind("<Return>", self.apply_filters_event) 
+        self.entry_search.bind("<KeyRelease>", self.schedule_search) # Recherche à la frappe
         
         ctk.CTkButton(filter_frame, text="Go", width=50, command=self.apply_filters).pack(side="right", padx=5)
 
-        # Sélecteur du nombre de lignes à afficher (Pagination simple)
-        ctk.CTkLabel(filter_frame, text="Lignes:", text_color="#1C1C1E").pack(side="right", padx=(10,5))
-        self.page_size_menu = ctk.CTkOptionMenu(filter_frame, values=["10", "15", "20", "30"], width=80, command=self.on_pagesize_change)
-        self.page_size_menu.set(str(self.page_size))
-        self.page_size_menu.pack(side="right")
+        # Nombre de clients correspondant aux filtres
+        self.lbl_count = ctk.CTkLabel(filter_frame, text="", text_color="#8E8E93")
+        self.lbl_count.pack(side="right", padx=10)
 
     def create_grid_header(self):
         header = ctk.CTkFrame(self, height=40, fg_color="#F5F5F5", corner_radius=5, border_width=1, border_color="#E5E5EA")
@@ -177,68 +193,81 @@ class ClientManagerView(ctk.CTkFrame):
 
     # --- LOGIQUE MÉTIER ---
 
-    def refresh_list(self, clients=None):
-        """Recharge la liste (soit tout, soit filtré)"""
-        if clients is None:
-            clients = self.data_manager.get_all_clients()
-        
-        # Entraînement rapide de l'IA sur les données actuelles
-        self.ai_engine.train_model(clients)
-
-        # Nettoyage affichage
-        for widget in self.scroll_frame.winfo_children(): widget.destroy()
-        self.selected_client_id = None
-        self.update_buttons()
-
-        # Appliquer limitation du nombre de lignes (pagination simple)
-        try:
-            limit = int(self.page_size)
-        except Exception:
-            limit = 10
-
-        for idx, client in enumerate(clients[:limit]):
-            self.create_row(client, idx)
-
-    def create_row(self, client, index):
-        bg_color = "#FFFFFF" if index % 2 == 0 else "#F9F9FB"
-        
-        # Détection Fraude IA
-        is_anomaly, _ = self.ai_engine.predict_risk(client)
-        border_color = "#FF3B30" if is_anomaly else "transparent"
-        border_width = 2 if is_anomaly else 0
-
-        row = ctk.CTkFrame(self.scroll_frame, corner_radius=5, fg_color=bg_color, border_width=1, border_color="#E5E5EA")
-        row.pack(fill="x", pady=2)
-        row.grid_columnconfigure((0, 1, 2, 3, 4, 5, 6), weight=1)
-
-        # Interaction
-        row.bind("<Button-1>", lambda e, cid=client['id_client'], r=row: self.on_select(cid, r))
-
-        values = [
-            str(client['id_client']),
-            client['nom'],
-            f"{client['age']} ans" if client['age'] else "N/A",
-            client['region'] if client['region'] else "-",
-            f"{client['revenu']:.2f} €" if client['revenu'] else "0 €",
-            client['niveau_risque'] if client['niveau_risque'] else "N/A", 
-            str(int(client['score'])) if client['score'] else "-"
-        ]
-
+    def refresh_list(self):
+        """Recharge la liste (avec les filtres courants)"""
+        self.loaded_generation = self.data_manager.generation
+        self.loading.show()
+        self.tasks.submit(self.train_detector, key="clients_ia",
+                          on_done=self.on_detector_ready, on_error=self.on_load_error)
+
+    def train_detector(self):
+        """Thread de fond : entraînement de l'IA sur un échantillon borné (indépendant de la taille de la base)."""
+        engine = AnomalyDetector()
+        engine.train_model(self.data_manager.columnar_snapshot().sample())
+        return engine
+
+    def on_detector_ready(self, engine):
+        # Remplacement atomique : les blocs en cours utilisent encore l'ancien modèle
+        self.ai_engine = engine
+        self.grid_view.clear_cache() # Données (et annotations IA) potentiellement changées
+        self.bookmarks = {}
+        self.apply_filters(force=True)
+
+    def on_load_error(self, error):
+        self.loading.hide()
+        print(f"Erreur chargement clients: {error}")
+
+    def current_filters(self):
+        return {
+            "region": self.filter_region.get(),
+            "risque": self.filter_risk.get(),
+            "recherche": self.entry_search.get()
+        }
+
+    def count_rows(self):
+        """Total + index clairsemé des blocs, en un seul parcours des id (thread de fond)."""
+        filters, token = self.query
+        total, ids = self.data_manager.get_client_bookmarks(self.grid_view.block_size, **filters, cancel=token)
+        bookmarks = dict(self.bookmarks)
+        bookmarks[tuple(sorted(filters.items()))] = ids
+        while len(bookmarks) > self.grid_view.cache_size:
+            del bookmarks[next(iter(bookmarks))]
+        self.bookmarks = bookmarks # Remplacement atomique : lu par d'autres tâches
+        return total
+
+    def on_total(self, total):
+        self.loading.hide()
+        self.total = total
+        self.lbl_count.configure(text=f"{total:,} clients".replace(",", " "))
+
+    def fetch_window(self, offset, limit):
+        """Bloc de clients pour la grille, annoté par l'IA en un seul appel vectorisé (thread de fond)."""
+        filters, token = self.query
+        # Début du bloc connu : lecture par clé depuis ce client (coût constant, même en fin de liste)
+        ids = self.bookmarks.get(tuple(sorted(filters.items())))
+        block, skip = divmod(offset, self.grid_view.block_size)
+        if ids is not None and block < len(ids):
+            clients = self.data_manager.get_clients_window(skip, limit, **filters, start=ids[block], cancel=token)
+        else:
+            clients = self.data_manager.get_clients_window(offset, limit, **filters, cancel=token)
+        for client, is_anomaly in zip(clients, self.ai_engine.predict_batch(clients)):
+            client['anomalie'] = is_anomaly
+        return clients
+
+    def format_row(self, client):
+        """Cellules (texte, couleur) d'une ligne + bordure rouge si fraude suspectée."""
+        values = client.display_row() # ClientRecord (DataManager.get_clients_window)
+
+        cells = []
         for i, val in enumerate(values):
-            lbl = ctk.CTkLabel(row, text=val, font=("Roboto", 12), text_color="#1C1C1E")
-            lbl.grid(row=0, column=i, sticky="w", padx=10, pady=10)
-            lbl.bind("<Button-1>", lambda e, cid=client['id_client'], r=row: self.on_select(cid, r))
-            
             # Couleur rouge pour risque élevé ou solde négatif
-            if (i == 4 and client.get('solde', 0) < 0) or (i == 5 and val == "Élevé"):
-                lbl.configure(text_color="#FF453A")
+            alert = (i == 4 and (client.get('solde') or 0) < 0) or (i == 5 and val == "Élevé")
+            cells.append((val, "#FF453A" if alert else "#1C1C1E"))
 
-    def on_select(self, cid, row_widget):
-        for widget in self.scroll_frame.winfo_children():
-            widget.configure(fg_color="#FFFFFF") 
-        
-        row_widget.configure(fg_color="#E0F2FE") 
-        self.selected_client_id = cid
+        return cells, "#FF3B30" if client.get('anomalie') else None
+
+    def on_select(self, client):
+        self.selected_client_id = client['id_client']
         self.update_buttons()
 
     def update_buttons(self):
@@ -251,23 +280,31 @@ class ClientManagerView(ctk.CTkFrame):
     def apply_filters_event(self, event):
         self.apply_filters()
 
-    def on_pagesize_change(self, value):
-        """Callback when page size OptionMenu changes."""
-        try:
-            self.page_size = int(value)
-        except Exception:
-            self.page_size = 10
-        # Re-apply current filters to refresh the view with the new page size
-        self.apply_filters()
+    def schedule_search(self, event=None):
+        """Debounce : chaque frappe repousse la recherche ; seule la dernière part."""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY_MS, self.apply_filters)
 
-    def apply_filters(self):
-        # Appel au Backend DataManager
-        results = self.data_manager.filtrer_clients(
-            region=self.filter_region.get(),
-            risque=self.filter_risk.get(),
-            recherche=self.entry_search.get()
-        )
-        self.refresh_list(results)
+    def apply_filters(self, force=False):
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+
+        filters = self.current_filters()
+        if filters == self.filters and not force:
+            return # Touche sans effet sur le texte (flèches, Maj...)
+
+        # La requête précédente, si elle tourne encore, est interrompue côté SQLite
+        self.query[1].set()
+        self.filters = filters
+        self.query = (filters, threading.Event())
+
+        # La grille relit le total puis seulement les blocs visibles (DataManager),
+        # ou réaffiche directement une requête récente (cache par filtres)
+        self.selected_client_id = None
+        self.update_buttons()
+        self.grid_view.reload(cache_key=tuple(sorted(filters.items())))
 
     def action_add(self):
         dialog = ClientFormDialog(self, "Nouveau Client")
@@ -279,12 +316,11 @@ class ClientManagerView(ctk.CTkFrame):
 
     def action_edit(self):
         if not self.selected_client_id: return
-        # Récupérer données fraîches
-        clients = self.data_manager.get_all_clients()
-        client = next((c for c in clients if c['id_client'] == self.selected_client_id), None)
+        # Données fraîches : une lecture par clé (ou le cache, invalidé à chaque écriture)
+        client = self.data_manager.get_client(self.selected_client_id)
         
         if client:
-            # Conversion Row -> Dict pour l'édition
+            # Copie modifiable pour l'édition (l'enregistrement du cache est partagé)
             c_dict = dict(client)
             dialog = ClientFormDialog(self, "Modifier Client", client_data=c_dict)
             self.wait_window(dialog)
@@ -301,31 +337,34 @@ class ClientManagerView(ctk.CTkFrame):
     # Méthode d'Export CSV
 
     def action_export(self):
-        # 1. On récupère les filtres actuels pour savoir quoi exporter
-        current_region = self.filter_region.get()
-        current_risk = self.filter_risk.get()
-        current_search = self.entry_search.get()
-
-        # 2. On demande au DataManager les données correspondantes
-        data_to_export = self.data_manager.filtrer_clients(
-            region=current_region, 
-            risque=current_risk, 
-            recherche=current_search
-        )
-
-        if not data_to_export:
+        # 1. Les filtres appliqués à la grille déterminent ce qui est exporté
+        if not self.total:
             messagebox.showwarning("Export vide", "Aucune donnée à exporter avec les filtres actuels.")
             return
 
-        # 3. Boite de dialogue "Enregistrer sous"
+        # 2. Boite de dialogue "Enregistrer sous" (le format suit l'extension)
         from tkinter import filedialog
         filename = filedialog.asksaveasfilename(defaultextension=".csv", 
-                                                filetypes=[("Fichier CSV", "*.csv")],
+                                                filetypes=[("Fichier CSV", "*.csv"), ("CSV compressé", "*.csv.gz"),
+                                                           ("Parquet", "*.parquet"), ("Feather", "*.feather")],
                                                 initialfile="Clients_Filtrés.csv")
         
         if filename:
-            success = self.data_manager.export_data_to_csv(data_to_export, filename)
-            if success:
-                messagebox.showinfo("Export Réussi", f"Fichier généré :\n{filename}")
-            else:
-                messagebox.showerror("Erreur", "Échec de l'exportation.")
+            # 3. Export en flux dans un thread de fond, progression sur le bouton
+            self.btn_export.configure(state="disabled", text="⏳ Export...")
+            self.tasks.submit(self.data_manager.export_clients, filename, **self.filters,
+                              progress=lambda done: self.tasks.post(self.on_export_progress, done),
+                              on_done=lambda count: self.on_export_done(filename, count),
+                              on_error=self.on_export_error)
+
+    def on_export_progress(self, done):
+        self.btn_export.configure(text=f"⏳ {done * 100 // max(self.total, 1)} %")
+
+    def on_export_done(self, filename, count):
+        self.btn_export.configure(state="normal", text="⬇️ Export CSV")
+        messagebox.showinfo("Export Réussi", f"{count:,} clients exportés :\n{filename}".replace(",", " "))
+
+    def on_export_error(self, error):
+        self.btn_export.configure(state="normal", text="⬇️ Export CSV")
+        print(f"Erreur Export: {error}")
+        messagebox.showerror("Erreur", f"Échec de l'exportation.\n{error}")
@@ -1,21 +1,28 @@
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
 from core.statistics import StatEngine
+from core.scoring_model import ScoringModel
+from gui.charts import ChartCanvas
+from gui.task_runner import LoadingOverlay
 
 class DashboardView(ctk.CTkFrame):
     """
     Vue Dashboard Exécutif.
     Affiche les KPIs et graphiques compacts sans défilement.
     """
-    def __init__(self, master, data_manager, **kwargs):
+    WATCHED_TABLES = frozenset({"clients", "scoring", "transactions"}) # Bus de changements
+
+    def __init__(self, master, data_manager, task_runner, **kwargs):
         super().__init__(master, **kwargs)
         self.data_manager = data_manager
-        # Connexion au Moteur Statistique
+        self.tasks = task_runner
+        # Connexion au Moteur Statistique et au Scoring
         self.stats = StatEngine(self.data_manager)
-        # Conteneurs pour les frames de graphiques (permet actualisation)
-        self.chart_frames = {}
+        self.scorer = ScoringModel(self.data_manager)
+        self.loaded_generation = 0 # Génération d'écriture des données affichées
+        self.live = True           # Mode LIVE : rafraîchi dès qu'une écriture arrive
+        # Graphiques créés une seule fois, mis à jour en place (titre -> ChartCanvas)
+        self.charts = {}
+        self.kpi_labels = []
         
         # Grille Principale (2 colonnes, 4 lignes)
         self.grid_rowconfigure(0, weight=0) # Header
@@ -31,65 +38,100 @@ class DashboardView(ctk.CTkFrame):
         self.kpi_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.kpi_frame.grid(row=1, column=0, columnspan=2, sticky="ew", padx=10, pady=(0, 10))
         self.kpi_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        
-        # Chargement Initial
-        self.load_kpis()
-        
-        # 3. GRAPHIQUES
-        self.plot_histogram(row=2, col=0)
-        self.plot_donut(row=2, col=1)
-        self.plot_trend(row=3, col=0)
-        self.plot_scatter(row=3, col=1)
+
+        self.create_kpi_card(0, "Clients Totaux", "#0A84FF")
+        self.create_kpi_card(1, "Encours Global", "#34C759")
+        self.create_kpi_card(2, "Score Moyen", "#FF9500")
+        self.create_kpi_card(3, "Anomalies", "#FF3B30")
+
+        # 3. GRAPHIQUES (vides jusqu'à l'arrivée des données)
+        self.get_chart("Distribution Âge", 2, 0)
+        self.get_chart("Segmentation", 2, 1, styled=False)
+        self.get_chart("Flux Net Mensuel (Transactions)", 3, 0)
+        self.get_chart("Corrélation Âge/Solde", 3, 1)
+        self.loading = LoadingOverlay(self)
+        # Les données sont chargées à l'affichage (show_view -> load_kpis)
 
     def create_header(self):
         header = ctk.CTkFrame(self, fg_color="transparent", height=40)
         header.grid(row=0, column=0, columnspan=2, sticky="ew", padx=20, pady=10)
         
         ctk.CTkLabel(header, text="🚀 Tableau de Bord Exécutif", font=("Roboto Medium", 20), text_color="#1C1C1E").pack(side="left")
-        ctk.CTkLabel(header, text="● LIVE DATA", text_color="#34C759", font=("Roboto Medium", 10)).pack(side="right")
-
-    def load_kpis(self):
-        # Récupération données réelles via StatEngine
-        kpis = self.stats.get_kpis()
-        
-        # Nettoyage
-        for w in self.kpi_frame.winfo_children(): w.destroy()
-            
-        self.create_kpi_card(0, "Clients Totaux", str(kpis['total_clients']), "#0A84FF")
-        self.create_kpi_card(1, "Encours Global", kpis['total_encours'], "#34C759")
-        self.create_kpi_card(2, "Score Moyen", str(kpis['score_moyen']), "#FF9500")
-        self.create_kpi_card(3, "Anomalies", str(kpis['anomalies']), "#FF3B30")
+        self.switch_live = ctk.CTkSwitch(header, text="● LIVE DATA", text_color="#34C759", font=("Roboto Medium", 10),
+                                         progress_color="#34C759", command=self.toggle_live)
+        self.switch_live.select()
+        self.switch_live.pack(side="right")
+
+    def toggle_live(self):
+        self.live = bool(self.switch_live.get())
+        self.switch_live.configure(text_color="#34C759" if self.live else "#8E8E93")
+
+    def load_kpis(self, rescore=False):
+        """Recalcule (optionnellement les scores) puis les KPIs et graphiques, hors du thread Tk."""
+        self.loading.show()
+        self.tasks.submit(self.fetch_data, rescore, key="dashboard",
+                          on_done=self.apply_data, on_error=self.on_load_error)
+
+    def fetch_data(self, rescore):
+        """Thread de fond : SQL + pandas uniquement, aucun widget."""
+        if rescore:
+            self.scorer.calculate_all_scores()
+        # Lue APRÈS le scoring : nos propres écritures ne rendent pas la vue périmée
+        generation = self.data_manager.generation
+        # Une seule lecture SQL pour tous les indicateurs
+        df = self.stats.get_dataframe()
+        return {
+            "generation": generation,
+            "kpis": self.stats.get_kpis(df),
+            "ages": self.stats.get_age_dist(df),
+            "segments": self.stats.get_segment_dist(df),
+            "trend": self.stats.get_time_series(),
+            "scatter": self.stats.get_scatter_data(df)
+        }
+
+    def apply_data(self, data):
+        """Thread Tk : mise à jour des valeurs (les cartes existent déjà) et des graphiques."""
+        self.loaded_generation = data['generation']
+        kpis = data['kpis']
+        values = [str(kpis['total_clients']), kpis['total_encours'], str(kpis['score_moyen']), str(kpis['anomalies'])]
+        for lbl, value in zip(self.kpi_labels, values):
+            lbl.configure(text=value)
         # Actualiser graphiques avec les données fraîches
-        self.refresh_plots()
+        self.refresh_plots(data)
+        self.loading.hide()
+
+    def on_load_error(self, error):
+        self.loading.hide()
+        print(f"Erreur Dashboard: {error}")
 
-    def create_kpi_card(self, col, title, value, color):
+    def create_kpi_card(self, col, title, color):
         card = ctk.CTkFrame(self.kpi_frame, fg_color="#FFFFFF", border_width=1, border_color="#E5E5EA", corner_radius=8)
         card.grid(row=0, column=col, padx=5, sticky="nsew")
         card.grid_columnconfigure(0, weight=1)
         
         ctk.CTkLabel(card, text=title.upper(), font=("Roboto", 10, "bold"), text_color="#8E8E93").pack(pady=(10, 0))
-        ctk.CTkLabel(card, text=value, font=("Roboto Medium", 22), text_color="#1C1C1E").pack(pady=5)
+        value = ctk.CTkLabel(card, text="-", font=("Roboto Medium", 22), text_color="#1C1C1E")
+        value.pack(pady=5)
         ctk.CTkFrame(card, height=3, fg_color=color).pack(fill="x", side="bottom")
+        self.kpi_labels.append(value)
 
     # --- FACTORY GRAPHIQUES ---
 
-    def create_chart_frame(self, title, row, col):
-        # Si un ancien frame existe pour ce titre, le détruire pour éviter les duplications
-        if title in self.chart_frames:
-            try:
-                self.chart_frames[title].destroy()
-            except Exception:
-                pass
+    def get_chart(self, title, row, col, styled=True):
+        """Cadre + graphique créés au premier appel, réutilisés ensuite."""
+        if title in self.charts:
+            return self.charts[title]
 
         frame = ctk.CTkFrame(self, fg_color="#FFFFFF", border_width=1, border_color="#E5E5EA", corner_radius=10)
         frame.grid(row=row, column=col, padx=8, pady=8, sticky="nsew")
-        self.chart_frames[title] = frame
 
         header = ctk.CTkFrame(frame, fg_color="transparent", height=20)
         header.pack(fill="x", padx=10, pady=5)
         ctk.CTkLabel(header, text=title, font=("Roboto", 12, "bold"), text_color="#1C1C1E").pack(side="left")
 
-        return frame
+        chart = ChartCanvas(frame, figsize=(4, 2.5), dpi=100, style=self.setup_fig if styled else None)
+        self.charts[title] = chart
+        return chart
 
     def setup_fig(self, fig, ax):
         # Thème Blanc "Apple"
@@ -108,74 +150,45 @@ class DashboardView(ctk.CTkFrame):
 
     # --- PLOTS (Données Réelles) ---
 
-    def plot_histogram(self, row, col):
-        frame = self.create_chart_frame("Distribution Âge", row, col)
-        data = self.stats.get_age_dist() 
-        
-        fig, ax = plt.subplots(figsize=(4, 2.5), dpi=100)
-        self.setup_fig(fig, ax)
-        
-        if data:
-            ax.hist(data, bins=10, color="#0A84FF", alpha=0.8, rwidth=0.9, edgecolor=None)
-        
-        plt.tight_layout()
-        self.embed(fig, frame)
+    def plot_histogram(self, data):
+        """Effectifs déjà classés en tâche de fond (StatEngine.get_age_dist) : coût fixe ici."""
+        chart = self.charts["Distribution Âge"]
+        if data is None:
+            chart.clear()
+        else:
+            chart.binned(*data, color="#0A84FF", alpha=0.8, rwidth=0.9)
 
-    def plot_donut(self, row, col):
-        frame = self.create_chart_frame("Segmentation", row, col)
-        labels, sizes = self.stats.get_segment_dist() 
-        
-        fig, ax = plt.subplots(figsize=(4, 2.5), dpi=100)
-        fig.patch.set_facecolor("#FFFFFF")
+    def plot_donut(self, labels, sizes):
+        chart = self.charts["Segmentation"]
         
         if sizes:
             colors = ['#0A84FF', '#FF9500', '#34C759', '#FF3B30']
-            ax.pie(sizes, labels=labels, autopct='%1.0f%%', startangle=90, colors=colors,
-                   textprops={'color':"#1C1C1E", 'fontsize': 7}, pctdistance=0.8)
-            # Trou central
-            fig.gca().add_artist(plt.Circle((0,0), 0.60, fc='#FFFFFF'))
-        
-        plt.tight_layout()
-        self.embed(fig, frame)
-
-    def plot_trend(self, row, col):
-        frame = self.create_chart_frame("Tendance Solde (Ancienneté)", row, col)
-        x, y = self.stats.get_time_series() 
-        
-        fig, ax = plt.subplots(figsize=(4, 2.5), dpi=100)
-        self.setup_fig(fig, ax)
-        
-        if x:
-            ax.plot(x, y, color="#34C759", linewidth=2)
-            ax.fill_between(x, y, color="#34C759", alpha=0.1)
-        
-        plt.tight_layout()
-        self.embed(fig, frame)
-
-    def plot_scatter(self, row, col):
-        frame = self.create_chart_frame("Corrélation Âge/Solde", row, col)
-        x, y = self.stats.get_scatter_data() 
-        
-        fig, ax = plt.subplots(figsize=(4, 2.5), dpi=100)
-        self.setup_fig(fig, ax)
-        
-        if x:
-            ax.scatter(x, y, color="#FF9500", alpha=0.6, s=15, edgecolors='none')
-        
-        plt.tight_layout()
-        self.embed(fig, frame)
-
-    def embed(self, fig, parent):
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-
-    def refresh_plots(self):
-        """Reconstruit les 4 graphiques avec les données actuelles."""
-        # Appel aux factories de plots — les frames existants seront détruits dans create_chart_frame
-        self.plot_histogram(row=2, col=0)
-        self.plot_donut(row=2, col=1)
-        self.plot_trend(row=3, col=0)
-        self.plot_scatter(row=3, col=1)
-
-        
\ No newline at end of file
+            chart.pie(sizes, labels, colors, autopct='%1.0f%%', startangle=90, donut=True,
+                      textprops={'color':"#1C1C1E", 'fontsize': 7}, pctdistance=0.8)
+        else:
+            chart.clear()
+
+    def plot_trend(self, months, net):
+        chart = self.charts["Flux Net Mensuel (Transactions)"]
+
+        # Libellés courts MM/AA
+        chart.line(list(range(len(months))), net, color="#34C759",
+                   xticklabels=[f"{m[5:7]}/{m[2:4]}" for m in months])
+
+    def plot_scatter(self, data):
+        """Nuage déjà réduit par StatEngine : points (complet/échantillon) ou grille de densité."""
+        chart = self.charts["Corrélation Âge/Solde"]
+        if data["strategy"] == "densite":
+            chart.density(data["counts"], data["xedges"], data["yedges"])
+        else:
+            chart.scatter(data["x"], data["y"], color="#FF9500", alpha=0.6, size=15)
+        # Stratégie affichée sur le graphique (redessinée au prochain draw_idle)
+        chart.set_note(data["label"])
+        chart.draw()
+
+    def refresh_plots(self, data):
+        """Met à jour les 4 graphiques avec les données chargées (sans recréer les figures)."""
+        self.plot_histogram(data['ages'])
+        self.plot_donut(*data['segments'])
+        self.plot_trend(*data['trend'])
+        self.plot_scatter(data['scatter'])
@@ -1,6 +1,5 @@
 import customtkinter as ctk
 from tkinter import filedialog
-import threading
 import time
 from core.data_cleaner import DataCleaner
 
@@ -9,10 +8,12 @@ class ImportView(ctk.CTkFrame):
     Console ETL (Extract Transform Load) - Version Connectée.
     Pilote le module DataCleaner avec un retour visuel temps réel.
     """
-    def __init__(self, master, data_manager, **kwargs):
+    def __init__(self, master, data_manager, task_runner, **kwargs):
         super().__init__(master, **kwargs)
         self.data_manager = data_manager
+        self.tasks = task_runner
         self.file_path = None
+        self.import_kind = "clients"
         
         # Layout
         self.grid_columnconfigure(0, weight=1)
@@ -52,6 +53,11 @@ class ImportView(ctk.CTkFrame):
         panel = ctk.CTkFrame(self.main_area, corner_radius=10, fg_color="#FFFFFF", border_width=1, border_color="#E5E5EA")
         panel.grid(row=0, column=0, sticky="nsew", padx=(0, 10))
         
+        # Type de données importées
+        self.seg_kind = ctk.CTkSegmentedButton(panel, values=["Clients", "Transactions"], command=self.on_kind_change)
+        self.seg_kind.set("Clients")
+        self.seg_kind.pack(fill="x", padx=20, pady=(20, 0))
+
         # Zone Drop
         self.btn_select = ctk.CTkButton(panel, text="📂\n\nSÉLECTIONNER FICHIER (CSV/XLSX)", 
                                         font=("Roboto Medium", 14), fg_color="transparent", border_width=2, 
@@ -102,8 +108,13 @@ class ImportView(ctk.CTkFrame):
 
     # --- LOGIQUE ETL CONNECTÉE ---
 
+    def on_kind_change(self, value):
+        self.import_kind = value.lower()
+        self.log(f"Mode d'import : {value}")
+        self.btn_clean.configure(state="disabled")
+
     def select_file(self):
-        path = filedialog.askopenfilename(filetypes=[("Data Files", "*.csv *.xlsx")])
+        path = filedialog.askopenfilename(filetypes=[("Data Files", "*.csv *.csv.gz *.xlsx *.parquet *.feather")])
         if path:
             self.file_path = path
             self.lbl_file.configure(text=f"📄 {path.split('/')[-1]}")
@@ -114,15 +125,19 @@ class ImportView(ctk.CTkFrame):
     def run_audit(self):
         self.update_step(1)
         self.log("Démarrage Audit...", "WARN")
-        # Thread pour ne pas geler l'UI
-        threading.Thread(target=self._thread_audit).start()
+        # Tâche de fond pour ne pas geler l'UI ; le résultat revient sur le thread Tk
+        self.tasks.submit(self._task_audit, self.file_path, self.import_kind, key="import",
+                          on_done=self._on_audit, on_error=self._on_task_error)
 
-    def _thread_audit(self):
+    def _task_audit(self, file_path, kind):
         # Utilisation du VRAI DataCleaner
         cleaner = DataCleaner(self.data_manager)
-        df, report = cleaner.audit_file(self.file_path)
-        
-        if df is None:
+        df, report = cleaner.audit_file(file_path, kind=kind)
+        return df is not None, report
+
+    def _on_audit(self, result):
+        ok, report = result
+        if not ok:
             self.log(f"Echec lecture : {report}", "ERROR")
             return
 
@@ -139,23 +154,51 @@ class ImportView(ctk.CTkFrame):
         
         self.lbl_audit_res.configure(text=txt)
 
+    def _on_task_error(self, error):
+        self.log(f"Erreur : {error}", "ERROR")
+
     def run_clean(self):
         self.update_step(2)
         self.log("Nettoyage & Injection...", "WARN")
-        threading.Thread(target=self._thread_clean).start()
+        self.btn_clean.configure(state="disabled") # Pas de double injection
+        self.tasks.submit(self._task_clean, self.file_path, self.import_kind, key="import",
+                          on_error=self._on_task_error)
 
-    def _thread_clean(self):
+    # Les méthodes suivantes tournent hors du thread Tk : les retours visuels
+    # (log, étapes) y sont programmés via tasks.post.
+
+    def _task_clean(self, file_path, kind):
         cleaner = DataCleaner(self.data_manager)
+        if kind == "transactions":
+            self._import_transactions(cleaner, file_path)
+            return
+
         # On relit (ou on pourrait passer le DF, mais plus simple de relire pour thread safety)
-        df, _ = cleaner.audit_file(self.file_path)
+        df, _ = cleaner.audit_file(file_path)
         
-        self.log("Application filtre IQR (Outliers)...")
-        self.log("Imputation valeurs manquantes...")
+        self.tasks.post(self.log, "Application filtre IQR (Outliers)...")
+        self.tasks.post(self.log, "Imputation valeurs manquantes...")
         
         # Injection
-        self.update_step(3)
+        self.tasks.post(self.update_step, 3)
         count = cleaner.clean_and_inject(df)
         
-        self.log(f"COMMIT BDD : {count} clients insérés.", "SUCCESS")
-        self.update_step(4)
+        self.tasks.post(self.log, f"COMMIT BDD : {count} clients insérés.", "SUCCESS")
+        self.tasks.post(self.update_step, 4)
+
+    def _import_transactions(self, cleaner, file_path):
+        # Lecture par blocs + injection ensembliste (une seule mise à jour des soldes)
+        self.tasks.post(self.log, "Normalisation montants / dates...")
+        self.tasks.post(self.update_step, 3)
+        try:
+            inserted, rejected = cleaner.import_transactions_file(file_path)
+        except Exception as e:
+            # Import annulé en bloc (ROLLBACK) : aucune transaction écrite
+            self.tasks.post(self.log, f"ROLLBACK BDD : import annulé, aucune transaction enregistrée ({e}).", "ERROR")
+            self.tasks.post(lambda: self.btn_clean.configure(state="normal")) # Nouvel essai possible
+            return
 
+        self.tasks.post(self.log, f"COMMIT BDD : {inserted} transactions enregistrées, soldes mis à jour.", "SUCCESS")
+        if rejected:
+            self.tasks.post(self.log, f"{rejected} transactions rejetées (client inconnu, montant ou date invalide).", "WARN")
+        self.tasks.post(self.update_step, 4)
@@ -0,0 +1,74 @@
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+
+
+class ProfilerPanel(ctk.CTkToplevel):
+    """
+    Fenêtre du profileur de requêtes (DataManager.enable_profiling) : requêtes les plus
+    coûteuses, appels de haut niveau et dernières requêtes lentes avec leur plan.
+    Rafraîchie à la demande ; export JSON pour comparer deux versions.
+    """
+
+    TOP_N = 15
+    SORT_KEYS = {"Temps total": "total_ms", "Temps max": "max_ms", "Exécutions": "count", "Lignes": "rows"}
+
+    def __init__(self, master, profiler):
+        super().__init__(master)
+        self.profiler = profiler
+        self.title("Profil des requêtes SQL")
+        self.geometry("980x680")
+
+        toolbar = ctk.CTkFrame(self, fg_color="transparent")
+        toolbar.pack(fill="x", padx=15, pady=(15, 5))
+        self.sort = ctk.CTkSegmentedButton(toolbar, values=list(self.SORT_KEYS), command=lambda _: self.refresh())
+        self.sort.set("Temps total")
+        self.sort.pack(side="left")
+        ctk.CTkButton(toolbar, text="Exporter JSON", width=120, command=self.export).pack(side="right", padx=(5, 0))
+        ctk.CTkButton(toolbar, text="Réinitialiser", width=110, fg_color="#8E8E93", command=self.reset).pack(side="right", padx=5)
+        ctk.CTkButton(toolbar, text="Rafraîchir", width=100, command=self.refresh).pack(side="right", padx=5)
+
+        self.text = ctk.CTkTextbox(self, font=("Consolas", 12), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+        self.refresh()
+
+    def refresh(self):
+        key = self.SORT_KEYS[self.sort.get()]
+        lines = [f"REQUÊTES (top {self.TOP_N}, tri : {self.sort.get()})",
+                 f"{'total ms':>10} {'max ms':>9} {'moy ms':>8} {'exéc.':>7} {'lignes':>9}  requête"]
+        for q in self.profiler.top(self.TOP_N, key):
+            lines.append(f"{q['total_ms']:>10.1f} {q['max_ms']:>9.1f} {q['avg_ms']:>8.2f} {q['count']:>7} "
+                         f"{q['rows']:>9}  {q['sql'][:140]}")
+            if q['calls']:
+                lines.append(f"{'':>47}appelée par : {', '.join(q['calls'])}")
+
+        lines += ["", "APPELS DE HAUT NIVEAU",
+                  f"{'total ms':>10} {'dont SQL':>9} {'appels':>7} {'requêtes':>9} {'lignes':>9}  appel"]
+        for c in self.profiler.calls(key if key != "max_ms" else "total_ms"):
+            lines.append(f"{c['total_ms']:>10.1f} {c['sql_ms']:>9.1f} {c['count']:>7} {c['statements']:>9} "
+                         f"{c['rows']:>9}  {c['call']}")
+
+        lines += ["", f"REQUÊTES LENTES (≥ {self.profiler.slow_ms} ms, plus récentes d'abord)"]
+        for s in reversed(self.profiler.slow_queries()[-20:]):
+            lines.append(f"{s['ms']:>10.1f} ms  {s['rows']} lignes  [{s['call'] or '-'}]  {s['sql'][:140]}")
+            for step in s['plan'] or []:
+                lines.append(f"{'':>14}└ {step}")
+
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state="disabled")
+
+    def reset(self):
+        self.profiler.reset()
+        self.refresh()
+
+    def export(self):
+        filename = filedialog.asksaveasfilename(parent=self, defaultextension=".json",
+                                                initialfile="profil_requetes.json",
+                                                filetypes=[("JSON", "*.json")])
+        if filename:
+            try:
+                self.profiler.dump(filename)
+                messagebox.showinfo("Export", f"Profil enregistré :\n{filename}", parent=self)
+            except OSError as e:
+                messagebox.showerror("Erreur", f"Export impossible : {e}", parent=self)
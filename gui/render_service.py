@@ -0,0 +1,98 @@
+import io
+import os
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+
+def render_chart(kind, args, kwargs, figsize, dpi, style):
+    """
+    Exécuté dans un processus de rendu : dessine le graphique avec Agg (aucun Tk)
+    et renvoie le PNG. kind est une méthode de ChartCanvas (bars, pie, heatmap...).
+    """
+    from gui.charts import ChartCanvas, STYLES
+    chart = ChartCanvas(None, figsize=figsize, dpi=dpi, style=STYLES.get(style))
+    getattr(chart, kind)(*args, **kwargs)
+    return chart.to_png()
+
+
+class RenderService:
+    """
+    Service de rendu de graphiques hors du thread Tk.
+    - Les graphiques sont dessinés en parallèle dans un pool de processus (matplotlib
+      est CPU-bound et garde le GIL : des threads ne suffiraient pas).
+    - Les images sont mises en cache par (type, taille, thème, version) : la version est
+      fournie par l'appelant (ex : DataManager.data_stamp() lu en tâche de fond), jamais
+      dérivée des données sur le thread Tk. Sans version, pas de cache.
+    - Les callbacks sont livrés sur la boucle Tk via le TaskRunner.
+    """
+
+    def __init__(self, task_runner, max_workers=None, cache_size=64):
+        self.tasks = task_runner
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cache_size = cache_size
+        self._cache = OrderedDict() # clé -> PIL.Image
+        self._latest = {}           # clé d'emplacement -> dernière image demandée
+        self._pool = None
+
+    def render(self, kind, *args, on_done, on_error=None, figsize=(5, 3.5), dpi=100, style="clean",
+               key=None, version=None, **kwargs):
+        """
+        Demande le rendu de ChartCanvas.<kind>(*args, **kwargs).
+        on_done(PIL.Image) est appelé sur le thread Tk (immédiatement si l'image est en cache),
+        on_error(exception) si le rendu échoue.
+        key : emplacement d'affichage ; seule la dernière demande d'un emplacement est livrée.
+        version : identifie le contenu (mêmes kind/version => même image) ; None = pas de cache.
+        """
+        cache_key = (kind, tuple(figsize), dpi, style, version) if version is not None else None
+        request = cache_key if cache_key is not None else object()
+        if key is not None:
+            self._latest[key] = request
+
+        image = self._cache.get(cache_key) if cache_key is not None else None
+        if image is not None:
+            self._cache.move_to_end(cache_key)
+            on_done(image)
+            return
+
+        future = self._executor().submit(render_chart, kind, args, kwargs, tuple(figsize), dpi, style)
+        future.add_done_callback(
+            lambda f: self.tasks.post(self._deliver, f, kind, cache_key, key, request, on_done, on_error))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # --- INTERNE ---
+
+    def _executor(self):
+        if self._pool is None:
+            # 'spawn' : un fork d'un processus Tk (threads, connexions X) n'est pas sûr
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _deliver(self, future, kind, cache_key, key, request, on_done, on_error):
+        """Thread Tk : décodage du PNG, mise en cache puis affichage (ou état d'erreur)."""
+        if future.cancelled():
+            return
+        superseded = key is not None and self._latest.get(key) is not request
+        try:
+            image = Image.open(io.BytesIO(future.result()))
+            image.load()
+        except Exception as e:
+            print(f"Erreur rendu graphique ({kind}): {e}")
+            if on_error is not None and not superseded:
+                on_error(e)
+            return
+
+        if cache_key is not None:
+            self._cache[cache_key] = image
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if superseded:
+            return # Une demande plus récente a remplacé celle-ci
+        on_done(image)
@@ -0,0 +1,131 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import customtkinter as ctk
+
+
+class Task:
+    """Poignée d'une tâche de fond (annulable)."""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Annule la tâche : non démarrée, elle ne tourne pas ; terminée, son résultat est ignoré."""
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class TaskRunner:
+    """
+    Exécuteur de tâches de fond de l'application.
+    - Le travail (SQL, pandas, sklearn) tourne dans un pool de threads.
+    - Les callbacks sont TOUJOURS exécutés sur la boucle Tk : les threads ne touchent
+      jamais aux widgets, ils déposent leurs résultats dans une file que la boucle
+      principale vide régulièrement via after().
+    - Une clé optionnelle annule la tâche précédente de même clé (résultat périmé ignoré).
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tkfinance-task")
+        self._inbox = queue.Queue()
+        self._latest = {} # clé -> dernière Task soumise
+        self._closed = False
+        self.root.after(self.POLL_MS, self._drain)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """
+        Lance fn(*args, **kwargs) dans le pool.
+        on_done(résultat) / on_error(exception) sont appelés sur le thread Tk.
+        """
+        task = Task(key)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = task
+
+        task.future = self.executor.submit(self._run, task, fn, args, kwargs, on_done, on_error)
+        return task
+
+    def cancel(self, key):
+        """Annule la tâche en cours pour cette clé (son résultat ne sera pas livré)."""
+        task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def post(self, callback, *args):
+        """Programme callback(*args) sur la boucle Tk (utilisable depuis n'importe quel thread)."""
+        self._inbox.put((None, callback, args))
+
+    def shutdown(self):
+        self._closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- INTERNE ---
+
+    def _run(self, task, fn, args, kwargs, on_done, on_error):
+        if task.cancelled:
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._inbox.put((task, on_error or self._default_error, (e,)))
+            return
+        if on_done is not None:
+            self._inbox.put((task, on_done, (result,)))
+        else:
+            self._inbox.put((task, None, ()))
+
+    def _default_error(self, error):
+        print(f"Erreur tâche de fond: {error}")
+
+    def _drain(self):
+        """Boucle Tk : exécute les callbacks livrés par les threads."""
+        while True:
+            try:
+                task, callback, args = self._inbox.get_nowait()
+            except queue.Empty:
+                break
+
+            if task is not None:
+                stale = task.key is not None and self._latest.get(task.key) is not task
+                if task.key is not None and not stale:
+                    del self._latest[task.key]
+                if task.cancelled or stale:
+                    continue
+
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Erreur callback: {e}")
+
+        if not self._closed:
+            self.root.after(self.POLL_MS, self._drain)
+
+
+class LoadingOverlay:
+    """Bandeau 'Chargement...' posé au centre d'une vue pendant une tâche de fond."""
+
+    def __init__(self, parent, text="⏳ Chargement..."):
+        self.label = ctk.CTkLabel(parent, text=text, font=("Roboto Medium", 14), text_color="#8E8E93",
+                                  fg_color="#FFFFFF", corner_radius=8, width=180, height=40)
+
+    def show(self):
+        self.label.place(relx=0.5, rely=0.5, anchor="center")
+        self.label.lift()
+
+    def hide(self):
+        self.label.place_forget()
@@ -1,17 +1,20 @@
 import customtkinter as ctk
+import threading
+from collections import OrderedDict
 from tkinter import messagebox
 from datetime import datetime
+from gui.task_runner import LoadingOverlay
+from gui.client_picker import ClientPicker
 
 class TransactionDialog(ctk.CTkToplevel):
     """Fenêtre pour ajouter une opération financière"""
-    def __init__(self, parent, client_list):
+    def __init__(self, parent, data_manager, task_runner):
         super().__init__(parent)
         self.title("Nouvelle Transaction")
-        self.geometry("400x450")
+        self.geometry("400x640")
         self.resizable(False, False)
         self.grab_set()
         
-        self.client_map = {f"{c['id_client']} - {c['nom']}": c['id_client'] for c in client_list}
         self.result = None
 
         # Titre
@@ -19,8 +22,9 @@ class TransactionDialog(ctk.CTkToplevel):
 
         # 1. Sélection Client
         ctk.CTkLabel(self, text="Client concerné", text_color="gray").pack(anchor="w", padx=40)
-        self.combo_client = ctk.CTkOptionMenu(self, values=list(self.client_map.keys()))
-        self.combo_client.pack(fill="x", padx=40, pady=(5, 15))
+        # Recherche + liste paginée : la base n'est jamais chargée en entier
+        self.picker = ClientPicker(self, data_manager, task_runner, height=160)
+        self.picker.pack(fill="x", padx=40, pady=(5, 15))
 
         # 2. Type d'opération (Visuel seulement, influe sur le signe)
         self.type_var = ctk.StringVar(value="Depot")
@@ -59,12 +63,16 @@ class TransactionDialog(ctk.CTkToplevel):
             # Appliquer le signe selon le type
             final_montant = montant if "Dépôt" in self.type_var.get() else -montant
             
-            client_str = self.combo_client.get()
-            id_client = self.client_map[client_str]
+            client = self.picker.get()
+            if client is None:
+                messagebox.showerror("Erreur", "Choisissez un client.")
+                return
+            id_client, nom = client
             date_trans = self.entry_date.get()
 
             self.result = {
                 "id_client": id_client,
+                "nom": nom,
                 "montant": final_montant,
                 "date": date_trans
             }
@@ -78,9 +86,27 @@ class TransactionsView(ctk.CTkFrame):
     Vue 'Livre de Comptes'.
     Affiche l'historique et permet d'ajouter des mouvements.
     """
-    def __init__(self, master, data_manager, **kwargs):
+    PAGE_SIZE = 50 # Transactions chargées par page (les plus récentes d'abord)
+    MAX_ROWS = 1000 # Lignes affichées au plus (widgets bornés) ; au-delà, affiner la recherche
+    SEARCH_DELAY_MS = 150 # Recherche lancée après une courte pause de frappe
+    SEARCH_CACHE_SIZE = 16
+    WATCHED_TABLES = frozenset({"clients", "transactions"}) # Bus de changements
+
+    def __init__(self, master, data_manager, task_runner, **kwargs):
         super().__init__(master, **kwargs)
         self.data_manager = data_manager
+        self.tasks = task_runner
+        self.loaded_generation = 0 # Génération d'écriture des données affichées
+        self.search = ""         # Filtre figé au lancement du chargement
+        self.search_token = threading.Event() # Levé quand une recherche plus récente arrive
+        self.search_job = None
+        self.search_cache = OrderedDict() # filtre -> (totaux, première page)
+        self.cursor = None       # (date_trans, id_trans) de la dernière ligne chargée
+        self.head = None         # (date_trans, id_trans) de la première ligne affichée
+        self.shown = set()       # id_trans affichés (une saisie locale ne revient pas par la pagination)
+        self.exhausted = False   # Plus rien à charger
+        self.fetching = False    # Une page est en cours de lecture
+        self.total_volume = 0
         
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(2, weight=1)
@@ -105,7 +131,11 @@ class TransactionsView(ctk.CTkFrame):
         self.scroll_frame = ctk.CTkScrollableFrame(self, fg_color="transparent")
         self.scroll_frame.grid(row=2, column=0, sticky="nsew", padx=20, pady=(0, 20))
 
-        self.refresh_list()
+        # Chargement progressif : on intercepte la position de défilement du canvas interne
+        self._scrollbar_set = self.scroll_frame._scrollbar.set
+        self.scroll_frame._parent_canvas.configure(yscrollcommand=self.on_scroll)
+        self.loading = LoadingOverlay(self)
+        # Les données sont chargées à l'affichage (show_view -> refresh_list)
 
     def create_header(self):
         frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -125,32 +155,129 @@ class TransactionsView(ctk.CTkFrame):
         # Recherche
         self.entry_search = ctk.CTkEntry(toolbar, placeholder_text="🔍 Filtrer par client...", width=200)
         self.entry_search.pack(side="left", padx=10)
-        self.entry_search.bind("<Return>", lambda e: self.refresh_list())
+        self.entry_search.bind("<Return>", lambda e: self.refresh_list(use_cache=True))
+        self.entry_search.bind("<KeyRelease>", self.schedule_search) # Recherche à la frappe
         
         # Bouton Nouveau
         ctk.CTkButton(toolbar, text="+ Nouvelle Opération", fg_color="#0A84FF", 
                       command=self.action_add).pack(side="left")
 
-    def refresh_list(self):
+    def schedule_search(self, event=None):
+        """Debounce : chaque frappe repousse la recherche ; seule la dernière part."""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY_MS, self.on_search)
+
+    def on_search(self):
+        self.search_job = None
+        if self.entry_search.get() != self.search:
+            self.refresh_list(use_cache=True)
+
+    def refresh_list(self, use_cache=False):
+        """
+        Recharge la liste pour le filtre courant.
+        use_cache=False (affichage de la vue, nouvelle donnée) : les résultats mémorisés sont oubliés.
+        """
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+        if not use_cache:
+            self.search_cache.clear()
+            self.loaded_generation = self.data_manager.generation
+
         # Nettoyage
         for w in self.scroll_frame.winfo_children(): w.destroy()
-        
-        # Récupération Data
-        search = self.entry_search.get()
-        txs = self.data_manager.get_all_transactions(search)
-        
-        total_vol = 0
-        
-        for idx, tx in enumerate(txs):
-            self.create_row(tx, idx)
-            total_vol += abs(tx['montant']) # Volume absolu échangé
-            
-        self.lbl_volume.configure(text=f"Volume Échangé: {total_vol:,.2f} €")
+        self.search = self.entry_search.get()
+        self.cursor = None
+        self.head = None
+        self.shown = set()
+        self.exhausted = False
+        self.fetching = True
+
+        # La requête précédente, si elle tourne encore, est interrompue côté SQLite
+        self.search_token.set()
+        self.search_token = threading.Event()
+
+        cached = self.search_cache.get(self.search)
+        if cached is not None:
+            self.tasks.cancel("transactions")
+            self.search_cache.move_to_end(self.search)
+            self.on_first_page(self.search, cached)
+            return
+
+        # Même clé que load_more : une page en vol pour l'ancien filtre est abandonnée
+        search = self.search
+        self.loading.show()
+        self.tasks.submit(self.read_first_page, search, self.search_token, key="transactions",
+                          on_done=lambda result: self.on_first_page(search, result),
+                          on_error=self.on_load_error)
 
-    def create_row(self, tx, idx):
+    def read_first_page(self, search, cancel):
+        """Thread de fond : totaux calculés par SQL (pas de somme Python sur tout l'historique) + première page."""
+        totals = self.data_manager.get_transactions_totals(search, cancel=cancel)
+        return totals, self.data_manager.get_transactions_page(search, before=None, limit=self.PAGE_SIZE, cancel=cancel)
+
+    def on_first_page(self, search, result):
+        totals, txs = result
+        self.search_cache[search] = result
+        while len(self.search_cache) > self.SEARCH_CACHE_SIZE:
+            self.search_cache.popitem(last=False)
+        self.loading.hide()
+        self.total_volume = totals['volume']
+        self.update_volume()
+        # Première page seulement, la suite arrive au défilement
+        self.append_page(txs)
+
+    def on_load_error(self, error):
+        self.loading.hide()
+        self.fetching = False
+        print(f"Erreur chargement transactions: {error}")
+
+    def load_more(self):
+        """Demande la page suivante (plus ancienne), ajoutée en bas de la liste à son arrivée."""
+        if self.fetching or self.exhausted:
+            return
+        self.fetching = True
+        self.tasks.submit(self.data_manager.get_transactions_page, self.search, before=self.cursor,
+                          limit=self.PAGE_SIZE, cancel=self.search_token, key="transactions",
+                          on_done=self.append_page, on_error=self.on_load_error)
+
+    def append_page(self, txs):
+        if txs:
+            if self.head is None:
+                self.head = (txs[0]['date_trans'], txs[0]['id_trans'])
+            self.cursor = (txs[-1]['date_trans'], txs[-1]['id_trans'])
+        self.exhausted = len(txs) < self.PAGE_SIZE
+
+        for tx in txs:
+            if tx['id_trans'] in self.shown:
+                continue # Déjà insérée en tête par action_add
+            if len(self.shown) >= self.MAX_ROWS:
+                self.exhausted = True
+                ctk.CTkLabel(self.scroll_frame, text=f"Affichage limité aux {self.MAX_ROWS} dernières opérations : "
+                             "filtrez par client pour remonter plus loin.", text_color="#8E8E93").pack(pady=10)
+                break
+            self.create_row(tx, len(self.shown))
+            self.shown.add(tx['id_trans'])
+        self.fetching = False
+
+    def on_scroll(self, first, last):
+        self._scrollbar_set(first, last)
+        # Proche du bas : on précharge la page suivante
+        if float(last) > 0.9 and not self.exhausted:
+            self.after_idle(self.load_more)
+
+    def update_volume(self):
+        self.lbl_volume.configure(text=f"Volume Échangé: {self.total_volume:,.2f} €")
+
+    def create_row(self, tx, idx, at_top=False):
         bg = "#FFFFFF" if idx % 2 == 0 else "#F9F9FB"
         row = ctk.CTkFrame(self.scroll_frame, fg_color=bg, corner_radius=5, border_width=1, border_color="#E5E5EA")
-        row.pack(fill="x", pady=2)
+        packed = self.scroll_frame.pack_slaves() # Ordre d'affichage réel
+        if at_top and packed:
+            row.pack(fill="x", pady=2, before=packed[0])
+        else:
+            row.pack(fill="x", pady=2)
         row.grid_columnconfigure((0, 1, 2, 3), weight=1)
         
         # Formatage
@@ -174,22 +301,43 @@ class TransactionsView(ctk.CTkFrame):
         badge.grid(row=0, column=3, sticky="w", padx=10)
 
     def action_add(self):
-        # On a besoin de la liste des clients pour le menu déroulant
-        clients = self.data_manager.get_all_clients()
-        if not clients:
+        # Simple test d'existence : le sélecteur du dialogue charge les clients par pages
+        if not self.data_manager.search_clients(limit=1):
             messagebox.showwarning("Attention", "Aucun client dans la base. Importez ou créez des clients d'abord.")
             return
 
-        dialog = TransactionDialog(self, clients)
+        dialog = TransactionDialog(self, self.data_manager, self.tasks)
         self.wait_window(dialog)
         
         if dialog.result:
-            self.data_manager.add_transaction(
+            id_trans = self.data_manager.add_transaction(
                 dialog.result['id_client'], 
                 dialog.result['montant'], 
                 dialog.result['date']
             )
-            self.refresh_list() # Rafraîchir l'affichage
+            if id_trans is None:
+                messagebox.showerror("Erreur", "L'opération n'a pas pu être enregistrée.")
+                return
+            self.search_cache.clear() # Totaux et premières pages mémorisés périmés
+
+            # Le volume compte la transaction si elle correspond au filtre courant
+            search = self.search.lower()
+            if not search or search in dialog.result['nom'].lower():
+                tx = {
+                    "id_trans": id_trans,
+                    "montant": dialog.result['montant'],
+                    "date_trans": dialog.result['date'],
+                    "nom": dialog.result['nom'],
+                    "id_client": dialog.result['id_client']
+                }
+                self.total_volume += abs(tx['montant'])
+                self.update_volume()
+                # Insertion en tête seulement si elle s'y classe (sinon la pagination l'amènera à sa place)
+                key = (tx['date_trans'], id_trans)
+                if (self.head is None and self.exhausted) or (self.head is not None and key >= self.head):
+                    self.create_row(tx, 0, at_top=True)
+                    self.shown.add(id_trans)
+                    self.head = key
             messagebox.showinfo("Succès", "Opération enregistrée et solde mis à jour.")
 
 
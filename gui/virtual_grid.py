@@ -0,0 +1,277 @@
+import customtkinter as ctk
+from collections import OrderedDict
+
+
+class VirtualGrid(ctk.CTkFrame):
+    """
+    Grille virtualisée à recyclage de widgets.
+    Seules les lignes visibles existent : un pool fixe de CTkFrame/CTkLabel est
+    réaffecté aux données pendant le défilement. Les données sont lues par blocs
+    (offset, limit) à la demande et seuls quelques blocs restent en mémoire :
+    le nombre de widgets et la mémoire restent constants, même pour 1M de lignes.
+    Avec un TaskRunner, total et blocs sont lus hors du thread Tk : les lignes d'un
+    bloc pas encore arrivé affichent un indicateur, puis sont liées à la livraison.
+    Les derniers résultats (total + blocs) sont gardés par clé de requête : revenir
+    sur une recherche déjà faite n'interroge pas la base.
+    """
+
+    ROW_COLORS = ("#FFFFFF", "#F9F9FB")
+    SELECTED_COLOR = "#E0F2FE"
+    TEXT_COLOR = "#1C1C1E"
+    PENDING_COLOR = "#8E8E93"
+    PENDING = object() # Ligne dont le bloc est en cours de lecture
+
+    def __init__(self, master, n_columns, fetch_window, count_rows, format_row, on_select=None,
+                 on_total=None, runner=None, key="id_client", row_height=42, block_size=200,
+                 max_blocks=8, cache_size=8, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.n_columns = n_columns
+        self.fetch_window = fetch_window # (offset, limit) -> liste d'enregistrements
+        self.count_rows = count_rows     # () -> nombre total de lignes
+        self.format_row = format_row     # enregistrement -> ([(texte, couleur), ...], couleur_bordure ou None)
+        self.on_select = on_select
+        self.on_total = on_total         # total -> None (appelé sur le thread Tk)
+        self.runner = runner             # TaskRunner optionnel (lecture asynchrone)
+        self.key = key
+        self.row_height = row_height
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.cache_size = cache_size
+
+        self.total = 0
+        self.top = 0 # Index de la première ligne affichée
+        self.visible = 0
+        self.selected_key = None
+        self._blocks = OrderedDict() # Cache LRU des blocs lus
+        self._pending = set()        # Blocs demandés au TaskRunner
+        self._generation = 0         # Invalide les livraisons antérieures à un reload
+        self._cache_key = None       # Clé de la requête affichée
+        self._cache = OrderedDict()  # clé de requête -> (total, blocs), LRU
+        self._pool = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        # Le corps ne s'adapte pas au contenu : c'est sa hauteur qui fixe le nombre de lignes
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.body.pack_propagate(False)
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+    # --- API ---
+
+    def reload(self, cache_key=None):
+        """
+        Relit le total et repart du haut (nouveaux filtres).
+        cache_key : identifiant hachable de la requête ; déjà en cache, elle s'affiche sans relecture.
+        """
+        self.top = 0
+        self.selected_key = None
+        self._load(cache_key)
+
+    def refresh(self):
+        """Relit les données (elles ont changé) en conservant la position de défilement."""
+        self.clear_cache()
+        self._load(self._cache_key)
+
+    def clear_cache(self):
+        """Oublie tous les résultats mémorisés (à appeler après une écriture en base)."""
+        self._cache.clear()
+        self._blocks = OrderedDict()
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, self.total - self.visible))
+        self._render()
+
+    # --- DONNÉES ---
+
+    def _load(self, cache_key=None):
+        self._remember()
+        self._blocks = OrderedDict()
+        self._pending.clear()
+        self._generation += 1
+        self._cache_key = cache_key
+
+        cached = self._cache.pop(cache_key, None) if cache_key is not None else None
+        if cached is not None:
+            total, self._blocks = cached
+            self._set_total(total)
+            return
+
+        if self.runner is None:
+            self._set_total(self.count_rows())
+            return
+
+        # Total + bloc courant en une seule tâche : un seul aller-retour avant l'affichage
+        generation = self._generation
+        self.runner.submit(self._read_total, generation, self.top, key=("grid", id(self)),
+                           on_done=lambda result: self._on_total(generation, result))
+
+    def _remember(self):
+        """Met de côté le résultat de la requête affichée avant d'en changer."""
+        if self._cache_key is None or not self._blocks:
+            return
+        self._cache[self._cache_key] = (self.total, self._blocks)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _read_total(self, generation, top):
+        """Thread de fond : aucun widget."""
+        if generation != self._generation:
+            return None # Requête déjà remplacée : inutile d'interroger la base
+        total = self.count_rows()
+        block_id = top // self.block_size
+        return total, block_id, self.fetch_window(block_id * self.block_size, self.block_size)
+
+    def _on_total(self, generation, result):
+        if generation != self._generation or result is None:
+            return
+        total, block_id, block = result
+        self._store(block_id, block)
+        self._set_total(total)
+
+    def _set_total(self, total):
+        self.total = total
+        if self.on_total:
+            self.on_total(total)
+        self.scroll_to(self.top)
+
+    def _store(self, block_id, block):
+        self._blocks[block_id] = block
+        if len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _request(self, block_id):
+        """Demande un bloc au TaskRunner (une seule fois tant qu'il est en vol)."""
+        if block_id in self._pending:
+            return
+        self._pending.add(block_id)
+        generation = self._generation
+        self.runner.submit(self._read_block, generation, block_id,
+                           on_done=lambda block: self._on_block(generation, block_id, block),
+                           on_error=lambda e: self._pending.discard(block_id))
+
+    def _read_block(self, generation, block_id):
+        """Thread de fond : bloc ignoré si la requête a changé entre-temps."""
+        if generation != self._generation:
+            return None
+        return self.fetch_window(block_id * self.block_size, self.block_size)
+
+    def _on_block(self, generation, block_id, block):
+        if generation != self._generation or block is None:
+            return
+        self._pending.discard(block_id)
+        self._store(block_id, block)
+        self._render()
+
+    def _get(self, index):
+        block_id = index // self.block_size
+        block = self._blocks.get(block_id)
+        if block is None:
+            if self.runner is not None:
+                self._request(block_id)
+                return self.PENDING
+            block = self.fetch_window(block_id * self.block_size, self.block_size)
+            self._store(block_id, block)
+        else:
+            self._blocks.move_to_end(block_id)
+
+        offset = index - block_id * self.block_size
+        return block[offset] if offset < len(block) else None
+
+    # --- RENDU ---
+
+    def _make_row(self):
+        frame = ctk.CTkFrame(self.body, corner_radius=5, height=self.row_height - 4,
+                             border_width=1, border_color="#E5E5EA")
+        frame.grid_columnconfigure(tuple(range(self.n_columns)), weight=1)
+        frame.grid_propagate(False)
+
+        labels = []
+        for i in range(self.n_columns):
+            lbl = ctk.CTkLabel(frame, text="", font=("Roboto", 12), text_color=self.TEXT_COLOR)
+            lbl.grid(row=0, column=i, sticky="w", padx=10, pady=6)
+            labels.append(lbl)
+
+        slot = {"frame": frame, "labels": labels, "record": None, "state": None}
+        for widget in [frame] + labels:
+            widget.bind("<Button-1>", lambda e, s=slot: self._click(s))
+            self._bind_wheel(widget)
+        return slot
+
+    def _on_resize(self, event):
+        visible = max(1, event.height // self.row_height)
+        while len(self._pool) < visible:
+            self._pool.append(self._make_row())
+
+        # Seules les 'visible' premières lignes du pool sont affichées (ordre conservé)
+        for i, slot in enumerate(self._pool):
+            if i < visible and i >= self.visible:
+                slot["frame"].pack(fill="x", pady=2)
+            elif i >= visible and i < self.visible:
+                slot["frame"].pack_forget()
+        self.visible = visible
+        self.scroll_to(self.top)
+
+    def _render(self):
+        for i, slot in enumerate(self._pool[:self.visible]):
+            index = self.top + i
+            record = self._get(index) if index < self.total else None
+            self._bind_slot(slot, record, index)
+
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _bind_slot(self, slot, record, index):
+        """Réaffecte une ligne du pool à un enregistrement (seuls les changements sont appliqués)."""
+        if record is self.PENDING:
+            slot["record"] = None
+            cells = [("…", self.PENDING_COLOR)] + [("", self.TEXT_COLOR)] * (self.n_columns - 1)
+            state = (tuple(cells), self.ROW_COLORS[index % 2], "#E5E5EA", 1)
+        elif record is None:
+            slot["record"] = None
+            state = (None, "transparent", "transparent", 0)
+        else:
+            cells, alert = self.format_row(record)
+            selected = record[self.key] == self.selected_key
+            bg = self.SELECTED_COLOR if selected else self.ROW_COLORS[index % 2]
+            slot["record"] = record
+            state = (tuple(cells), bg, alert or "#E5E5EA", 2 if alert else 1)
+
+        if slot["state"] == state:
+            return
+        cells, bg, border_color, border_width = state
+        slot["frame"].configure(fg_color=bg, border_color=border_color, border_width=border_width)
+        for i, lbl in enumerate(slot["labels"]):
+            text, color = cells[i] if cells else ("", self.TEXT_COLOR)
+            lbl.configure(text=text, text_color=color)
+        slot["state"] = state
+
+    # --- INTERACTIONS ---
+
+    def _click(self, slot):
+        record = slot["record"]
+        if record is None:
+            return
+        self.selected_key = record[self.key]
+        self._render()
+        if self.on_select:
+            self.on_select(record)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * self.total))
+        elif action == "scroll":
+            step = self.visible if unit == "pages" else 3
+            self.scroll_to(self.top + int(value) * step)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_to(self.top + (-3 if e.delta > 0 else 3)))
+        widget.bind("<Button-4>", lambda e: self.scroll_to(self.top - 3)) # Linux
+        widget.bind("<Button-5>", lambda e: self.scroll_to(self.top + 3))
@@ -1,4 +1,8 @@
+import time
+_T0 = time.perf_counter() # Référence de la sonde de démarrage (avant tout import lourd)
+
 import customtkinter as ctk
+import importlib
 import os
 import sys
 from PIL import Image
@@ -6,14 +10,27 @@ from tkinter import messagebox, simpledialog
 
 # Import du Core
 from core.data_manager import DataManager
-from core.scoring_model import ScoringModel
 
-# Import des Vues
-from gui.dashboard_view import DashboardView
-from gui.clients_view import ClientManagerView
-from gui.analytics_view import AnalyticsView
-from gui.import_view import ImportView
-from gui.transactions_view import TransactionsView
+from gui.task_runner import TaskRunner
+from gui.render_service import RenderService
+
+# Vues métier : module importé et vue construite à la première navigation
+# (matplotlib, pandas et sklearn ne sont donc pas chargés au démarrage).
+# Le 3e élément liste les services supplémentaires passés au constructeur.
+VIEW_CLASSES = {
+    "import": ("gui.import_view", "ImportView", ()),
+    "dashboard": ("gui.dashboard_view", "DashboardView", ()),
+    "transactions": ("gui.transactions_view", "TransactionsView", ()),
+    "clients": ("gui.clients_view", "ClientManagerView", ()),
+    "analytics": ("gui.analytics_view", "AnalyticsView", ("renderer",)),
+}
+
+# Sonde de démarrage : `python main.py --startup-probe` (ou TKFINANCE_STARTUP_PROBE=1)
+# affiche le temps jusqu'à la première image de l'accueil puis quitte.
+STARTUP_PROBE = "--startup-probe" in sys.argv or os.environ.get("TKFINANCE_STARTUP_PROBE") == "1"
+# Profil des requêtes SQL : `python main.py --profile-sql` (ou TKFINANCE_PROFILE_SQL=1)
+# ajoute un panneau « Requêtes » et écrit profil_requetes.json en quittant.
+PROFILE_SQL = "--profile-sql" in sys.argv or os.environ.get("TKFINANCE_PROFILE_SQL") == "1"
 
 # --- CONFIGURATION DU THÈME  ---
 ctk.set_appearance_mode("Light") 
@@ -28,12 +45,54 @@ COLOR_ACCENT = "#007AFF"    # Bleu Apple (Boutons)
 COLOR_BORDER = "#E5E5EA"    # Gris très clair pour les bordures
 
 # --- Helpers ---
+ASSETS_DIR = "assets"
+THUMBNAIL_DIR = os.path.join(ASSETS_DIR, ".cache") # Miniatures pré-redimensionnées (régénérables)
+_image_cache = {} # (fichier, taille) -> CTkImage partagée (ou None si absente)
+
 def load_image(filename, size):
-    path = os.path.join("assets", filename)
+    """
+    CTkImage mise en cache par (fichier, taille) : chaque asset est décodé une seule fois,
+    redimensionné à sa taille d'affichage, et la même instance sert aux deux thèmes et à
+    tous les widgets qui l'affichent.
+    """
+    key = (filename, tuple(size))
+    if key in _image_cache:
+        return _image_cache[key]
+
+    path = os.path.join(ASSETS_DIR, filename)
+    image = None
     if os.path.exists(path):
-        return ctk.CTkImage(light_image=Image.open(path), dark_image=Image.open(path), size=size)
-    print(f"Warning: Image {filename} not found.")
-    return None
+        img = load_thumbnail(path, size)
+        image = ctk.CTkImage(light_image=img, dark_image=img, size=size)
+    else:
+        print(f"Warning: Image {filename} not found.")
+    _image_cache[key] = image
+    return image
+
+def load_thumbnail(path, size):
+    """
+    Image PIL déjà à la bonne taille. La miniature sur disque est réutilisée tant
+    qu'elle est plus récente que la source ; sinon la source est décodée, réduite
+    (LANCZOS) puis la miniature réécrite (ignorée si le dossier est en lecture seule).
+    """
+    name, _ = os.path.splitext(os.path.basename(path))
+    thumb_path = os.path.join(THUMBNAIL_DIR, f"{name}_{size[0]}x{size[1]}.png")
+    try:
+        if os.path.getmtime(thumb_path) >= os.path.getmtime(path):
+            with Image.open(thumb_path) as thumb:
+                thumb.load()
+                return thumb
+    except (OSError, ValueError):
+        pass # Pas de miniature (ou illisible) : on la régénère
+
+    with Image.open(path) as source:
+        img = source.resize(size, Image.LANCZOS)
+    try:
+        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+        img.save(thumb_path)
+    except OSError as e:
+        print(f"Warning: miniature non enregistrée ({e}).")
+    return img
 
 class WelcomeView(ctk.CTkFrame):
     """
@@ -156,6 +215,7 @@ class WelcomeView(ctk.CTkFrame):
 
 
 class TkFinanceApp(ctk.CTk):
+    LIVE_DELAY_MS = 300
     def __init__(self):
         super().__init__()
         self.title("Tk-Finance - Manager 2026")
@@ -167,7 +227,12 @@ class TkFinanceApp(ctk.CTk):
 
         # 1. Backend
         self.db = DataManager()
-        self.scorer = ScoringModel(self.db)
+        if PROFILE_SQL:
+            self.db.enable_profiling()
+        # Tâches de fond (SQL, pandas, sklearn) livrées sur la boucle Tk
+        self.tasks = TaskRunner(self)
+        # Rendu des graphiques en processus séparés (pool démarré au premier graphique)
+        self.renderer = RenderService(self.tasks)
 
         # 2. Layout Principal
         self.grid_columnconfigure(1, weight=1)
@@ -200,14 +265,32 @@ class TkFinanceApp(ctk.CTk):
                          command=self.action_clear_db)
         self.btn_clear_db.grid(row=9, column=0, sticky="ew", padx=15, pady=(10,20))
 
+        if PROFILE_SQL:
+            ctk.CTkButton(self.sidebar, text="⏱ Requêtes SQL", fg_color="transparent",
+                          text_color="#515154", hover_color="#F5F5F7",
+                          anchor="w", height=40, font=("Roboto Medium", 13),
+                          command=self.show_profiler).grid(row=10, column=0, sticky="ew", padx=15, pady=(0, 20))
+
+        # Bus de changements : les écritures (quel que soit leur thread) sont relayées sur la
+        # boucle Tk ; une vue n'est rechargée que si des tables qu'elle affiche ont changé
+        self.stale = {} # vue -> (tables modifiées, dernière génération d'écriture)
+        self.current_view = None
+        self.live_job = None
+        self.db.subscribe(lambda event: self.tasks.post(self.on_data_changed, event))
+        # Instantané colonnaire préparé en fond : simplement mappé s'il est à jour sur disque
+        self.after_idle(lambda: self.tasks.submit(lambda: self.db.columnar_snapshot().refresh()))
+
         # --- VUES ---
+        # Seul l'accueil est construit ici ; les autres vues le sont par get_view()
         self.welcome_view = WelcomeView(self, self.show_view, self.quit_app)
-        self.import_view = ImportView(self, self.db)
-        self.dashboard_view = DashboardView(self, self.db)
-        self.clients_view = ClientManagerView(self, self.db)
-        self.analytics_view = AnalyticsView(self, self.db)
-        self.transactions_view = TransactionsView(self, self.db)
-
+        self.views = {"welcome": self.welcome_view}
+        self.nav_buttons = {
+            "welcome": self.btn_home, "import": self.btn_import, "dashboard": self.btn_dash,
+            "transactions": self.btn_trans, "clients": self.btn_clients, "analytics": self.btn_ana
+        }
+
+        if STARTUP_PROBE:
+            self.welcome_view.bind("<Map>", self.on_first_frame)
         self.show_view("welcome")
 
     def create_nav_btn(self, text, name, row):
@@ -220,52 +303,94 @@ class TkFinanceApp(ctk.CTk):
         btn.grid(row=row, column=0, sticky="ew", padx=15, pady=2)
         return btn
 
+    def get_view(self, name):
+        """Vue déjà construite, sinon import du module et construction (première navigation)."""
+        view = self.views.get(name)
+        if view is None:
+            module_name, class_name, services = VIEW_CLASSES[name]
+            view_class = getattr(importlib.import_module(module_name), class_name)
+            view = view_class(self, self.db, self.tasks, *[getattr(self, s) for s in services])
+            self.views[name] = view
+        return view
+
     def show_view(self, name):
-        # 1. Cacher tout
-        for v in [self.welcome_view, self.import_view, self.dashboard_view, 
-                  self.transactions_view, self.clients_view, self.analytics_view]:
+        # 1. Cacher tout (seulement les vues déjà construites)
+        for v in self.views.values():
             v.grid_forget()
         
         # 2. Reset boutons (Style actif vs inactif)
-        for b in [self.btn_home, self.btn_import, self.btn_dash, 
-                  self.btn_trans, self.btn_clients, self.btn_ana]:
+        for b in self.nav_buttons.values():
             b.configure(fg_color="transparent", text_color="#515154")
 
         # 3. Affichage
         btn_active_color = "#E5F1FF" 
         text_active_color = "#007AFF" 
 
-        if name == "welcome":
-            self.welcome_view.grid(row=0, column=1, sticky="nsew")
-            self.btn_home.configure(fg_color=btn_active_color, text_color=text_active_color)
-        
-        elif name == "import":
-            self.import_view.grid(row=0, column=1, sticky="nsew")
-            self.btn_import.configure(fg_color=btn_active_color, text_color=text_active_color)
-            
-        elif name == "dashboard":
-            self.scorer.calculate_all_scores() 
-            self.dashboard_view.load_kpis()
-            self.dashboard_view.grid(row=0, column=1, sticky="nsew")
-            self.btn_dash.configure(fg_color=btn_active_color, text_color=text_active_color)
-
-        elif name == "transactions":
-            self.transactions_view.refresh_list()
-            self.transactions_view.grid(row=0, column=1, sticky="nsew")
-            self.btn_trans.configure(fg_color=btn_active_color, text_color=text_active_color)
-            
-        elif name == "clients":
-            self.clients_view.refresh_list()
-            self.clients_view.grid(row=0, column=1, sticky="nsew")
-            self.btn_clients.configure(fg_color=btn_active_color, text_color=text_active_color)
-            
+        first_visit = name not in self.views
+        view = self.get_view(name)
+        self.current_view = name
+        self.reload_view(name, first_visit)
+
+        view.grid(row=0, column=1, sticky="nsew")
+        self.nav_buttons[name].configure(fg_color=btn_active_color, text_color=text_active_color)
+
+    def reload_view(self, name, first_visit=False):
+        """Recharge une vue à sa première visite ou si ses données ont changé depuis son chargement."""
+        view = self.views[name]
+        changed, generation = self.stale.pop(name, (set(), 0))
+        if not first_visit and generation <= getattr(view, "loaded_generation", 0):
+            return # Rien de nouveau : affichage instantané
+
+        if name == "dashboard":
+            # Re-scoring seulement si les clients ont changé (scoring + KPIs en tâche de fond)
+            view.load_kpis(rescore=first_visit or "clients" in changed)
+        elif name in ("transactions", "clients"):
+            view.refresh_list()
         elif name == "analytics":
-            try: self.analytics_view.refresh() # Si méthode existe
+            try: view.refresh() # Si méthode existe
             except: pass
-            self.analytics_view.grid(row=0, column=1, sticky="nsew")
-            self.btn_ana.configure(fg_color=btn_active_color, text_color=text_active_color)
+
+    def on_data_changed(self, event):
+        """Thread Tk : marque les vues concernées ; la vue affichée en mode LIVE se met à jour."""
+        for name, view in self.views.items():
+            tables = getattr(view, "WATCHED_TABLES", frozenset()) & event.tables
+            if tables:
+                changed, _ = self.stale.get(name, (set(), 0))
+                self.stale[name] = (changed | tables, event.generation)
+
+        view = self.views.get(self.current_view)
+        if self.current_view in self.stale and getattr(view, "live", False) and self.live_job is None:
+            # Regroupe les rafales d'écritures (saisie, écrivain groupé) en un seul rafraîchissement
+            self.live_job = self.after(self.LIVE_DELAY_MS, self.refresh_live)
+
+    def refresh_live(self):
+        self.live_job = None
+        if getattr(self.views.get(self.current_view), "live", False):
+            self.reload_view(self.current_view)
+
+    def on_first_frame(self, event):
+        """Sonde de démarrage : l'accueil vient d'être affiché pour la première fois."""
+        self.welcome_view.unbind("<Map>")
+        # after_idle : on mesure après le premier passage de dessin
+        self.after_idle(self.report_startup)
+
+    def report_startup(self):
+        elapsed = time.perf_counter() - _T0
+        heavy = [m for m in ("pandas", "matplotlib", "sklearn") if m in sys.modules]
+        print(f"Démarrage : accueil affiché en {elapsed:.3f} s "
+              f"(modules lourds chargés : {', '.join(heavy) or 'aucun'})")
+        self.quit_app()
+
+    def show_profiler(self):
+        from gui.profiler_panel import ProfilerPanel
+        ProfilerPanel(self, self.db.profiler)
 
     def quit_app(self):
+        if self.db.profiler is not None:
+            print(f"Profil SQL : {self.db.profiler.dump()}")
+        self.renderer.shutdown()
+        self.tasks.shutdown()
+        self.db.close() # Vide la file d'écriture groupée avant de quitter
         self.destroy()
         sys.exit()
 